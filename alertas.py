@@ -0,0 +1,402 @@
+# alertas.py
+# ==========================================
+# ALERTAS: REGLAS EN LA INGESTA, AVISOS POR WEBHOOK / LOG / CORREO
+# ==========================================
+# Antes "LLENO" y "COLA" solo existían en la pantalla: si nadie tenía el
+# dashboard abierto, nadie se enteraba. Ahora el hilo de ingesta le pasa
+# cada evento al Motor, que revisa las reglas ahí mismo y manda los avisos
+# a los destinos configurados, haya o no pestañas abiertas.
+#
+# Tres tipos de regla:
+#   ocupacion -> la ocupación está en X% o más hace Y segundos
+#   cola      -> hay COLA seguida hace Z segundos o más
+#   silencio  -> una puerta no manda nada (ni latidos) hace N minutos
+# Cada alerta (regla + puerta) se avisa UNA vez cuando se dispara y otra
+# cuando se resuelve: mientras siga activa no se repite. Si la ocupación
+# baja del X% antes de los Y segundos, no se avisa nada. Y con histéresis:
+# la disparada recién se resuelve cuando baja de X% - histeresis, y la
+# cola recién se da por terminada tras unos segundos sin COLA. Así no llegan
+# 20 avisos porque la gente anda justo en el límite.
+#
+# Lo que cuesta cada evento NO depende de cuántas reglas ni puertas haya:
+#   - las reglas de ocupación están ordenadas por umbral: un cambio de gente
+#     solo mira (con bisect) las que cruzó
+#   - lo que tiene que "durar" (Y, Z, N) es un plazo en un heap: revisar()
+#     solo saca los que vencieron. Las reglas de cola y de silencio van
+#     encadenadas (de la más corta a la más larga): vence una y recién ahí
+#     se agenda la siguiente
+#   - las puertas están en orden de última noticia (OrderedDict): cada
+#     evento mueve la suya al final y revisar() solo mira la primera
+# Mandar es lento (HTTP, SMTP): lo hace otro hilo con su cola, así la
+# ingesta nunca espera a la red (y cada destino va por su lado).
+#
+# La configuración es un JSON (AFORO_ALERTAS, por defecto alertas.json):
+#   {"reglas": [{"nombre": "lleno", "tipo": "ocupacion", "porcentaje": 100, "segundos": 10},
+#               {"nombre": "cola_larga", "tipo": "cola", "segundos": 60},
+#               {"nombre": "sensor_mudo", "tipo": "silencio", "minutos": 5}],
+#    "destinos": [{"tipo": "log", "archivo": "alertas.log"},
+#                 {"tipo": "webhook", "url": "http://..."},
+#                 {"tipo": "smtp", "servidor": "localhost", "puerto": 25, "para": ["a@b.c"]}],
+#    "margen_cola": 5}
+import heapq
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
+import urllib.request
+from bisect import bisect_right
+from collections import Counter, OrderedDict, namedtuple
+from email.message import EmailMessage
+
+HISTERESIS = 5      # Puntos de porcentaje que tiene que bajar la ocupación para resolverse
+MARGEN_COLA = 5     # Segundos sin COLA (además de COLA_TIMEOUT) para dar la cola por terminada
+TIPOS = ("ocupacion", "cola", "silencio")
+
+# Si no hay archivo: avisar cuando se llena y cuando hay cola larga, por consola
+REGLAS_POR_DEFECTO = [
+    {"nombre": "lleno", "tipo": "ocupacion", "porcentaje": 100, "segundos": 10},
+    {"nombre": "cola_larga", "tipo": "cola", "segundos": 60},
+]
+DESTINOS_POR_DEFECTO = [{"tipo": "log"}]
+
+# umbral: % para "ocupacion" (para las otras no se usa); segundos: lo que tiene que durar
+Regla = namedtuple("Regla", "nombre tipo umbral segundos histeresis")
+
+
+def armar_regla(datos):
+    tipo = datos.get("tipo")
+    if tipo not in TIPOS:
+        raise ValueError(f"Regla con tipo desconocido: {tipo!r} (puede ser {', '.join(TIPOS)})")
+    segundos = float(datos.get("segundos", 0)) + float(datos.get("minutos", 0)) * 60
+    return Regla(
+        nombre=str(datos.get("nombre") or f"{tipo}_{segundos:g}"),
+        tipo=tipo,
+        umbral=float(datos.get("porcentaje", 100)),
+        segundos=segundos,
+        histeresis=float(datos.get("histeresis", HISTERESIS)),
+    )
+
+
+# ==========================================
+# 1. EL MOTOR (CORRE EN EL HILO DE INGESTA)
+# ==========================================
+class Motor:
+    # avisar(alerta) recibe cada alerta disparada o resuelta (ej. un Despachador).
+    # cola_timeout: lo mismo que usa la pantalla para decir "hay COLA"
+    def __init__(self, reglas, avisar, cola_timeout=1.5, margen_cola=MARGEN_COLA):
+        nombres = Counter(r.nombre for r in reglas)
+        repetidos = [n for n, veces in nombres.items() if veces > 1]
+        if repetidos:
+            raise ValueError(f"Reglas con el mismo nombre: {', '.join(repetidos)}")
+        self.reglas = list(reglas)
+        self.avisar = avisar
+        self.fin_cola = cola_timeout + margen_cola
+        self._candado = threading.Lock() # Aforo y puertas se cambian desde otros hilos
+
+        # Ocupación: ordenadas por dónde se disparan y por dónde se resuelven
+        por_umbral = sorted((r for r in reglas if r.tipo == "ocupacion"), key=lambda r: r.umbral)
+        self._suben = [r.umbral for r in por_umbral]
+        self._reglas_suben = por_umbral
+        por_piso = sorted(por_umbral, key=lambda r: r.umbral - r.histeresis)
+        self._bajan = [r.umbral - r.histeresis for r in por_piso]
+        self._reglas_bajan = por_piso
+        self.porcentaje = 0.0
+
+        # Cola y silencio: de la más corta a la más larga (van encadenadas)
+        self._cadenas = {
+            tipo: sorted((r for r in reglas if r.tipo == tipo), key=lambda r: r.segundos)
+            for tipo in ("cola", "silencio")
+        }
+        self._siguiente = {}
+        for cadena in self._cadenas.values():
+            for anterior, regla in zip(cadena, cadena[1:]):
+                self._siguiente[anterior.nombre] = regla
+
+        self.alertas = {}     # (regla, puerta) -> [fase ("espera"/"activa"), número, desde]
+        self._plazos = []     # heap de (vence, número, regla, puerta)
+        self._numero = 0      # Cada espera tiene el suyo: si ya no coincide, el plazo quedó viejo
+        self.cola_desde = None
+        self.ultima_cola = 0.0
+        self.vistas = OrderedDict() # puerta -> última noticia (de la más callada a la más nueva)
+        self.mudas = {}       # puerta -> última noticia (las que ya pasaron el silencio más corto)
+        self.disparadas = Counter() # regla -> veces (para /metrics)
+
+    # Cuántas alertas están disparadas ahora
+    def activas(self):
+        return sum(1 for fase, _, _ in list(self.alertas.values()) if fase == "activa")
+
+    # --- Lo que llama la ingesta ---
+
+    # Llegó algo de una puerta (cualquier cosa: evento, latido, basura)
+    def actividad(self, ts, puerta):
+        with self._candado:
+            if puerta in self.mudas:
+                del self.mudas[puerta]
+                self._resolver_cadena("silencio", puerta, ts, 0.0)
+            self.vistas[puerta] = ts
+            self.vistas.move_to_end(puerta)
+
+    def ocupacion(self, ts, personas, aforo):
+        porcentaje = personas * 100 / aforo if aforo else 0.0
+        with self._candado:
+            antes, self.porcentaje = self.porcentaje, porcentaje
+            if porcentaje > antes:
+                # Las que cruzó para arriba: antes < umbral <= ahora
+                for regla in self._reglas_suben[bisect_right(self._suben, antes):bisect_right(self._suben, porcentaje)]:
+                    self._esperar(regla, None, ts, ts + regla.segundos)
+            elif porcentaje < antes:
+                # Bajó del umbral antes de cumplir los Y segundos: no se avisa
+                for regla in self._reglas_suben[bisect_right(self._suben, porcentaje):bisect_right(self._suben, antes)]:
+                    estado = self.alertas.get((regla.nombre, None))
+                    if estado and estado[0] == "espera":
+                        del self.alertas[(regla.nombre, None)]
+                # Las disparadas se resuelven recién debajo de umbral - histeresis
+                for regla in self._reglas_bajan[bisect_right(self._bajan, porcentaje):bisect_right(self._bajan, antes)]:
+                    self._cancelar(regla, None, ts, porcentaje)
+
+    # Llegó un COLA
+    def cola(self, ts):
+        with self._candado:
+            if self.cola_desde is not None and ts - self.ultima_cola > self.fin_cola:
+                self._terminar_cola(self.ultima_cola + self.fin_cola)
+            if self.cola_desde is None:
+                self.cola_desde = ts
+                cadena = self._cadenas["cola"]
+                if cadena:
+                    self._esperar(cadena[0], None, ts, ts + cadena[0].segundos)
+            self.ultima_cola = ts
+
+    # Dispara lo que venció. La ingesta la llama seguido (con o sin eventos)
+    def revisar(self, ts):
+        with self._candado:
+            if self.cola_desde is not None and ts - self.ultima_cola > self.fin_cola:
+                self._terminar_cola(self.ultima_cola + self.fin_cola)
+
+            cadena = self._cadenas["silencio"]
+            if cadena:
+                primera = cadena[0]
+                while self.vistas:
+                    puerta, visto = next(iter(self.vistas.items()))
+                    if ts - visto < primera.segundos:
+                        break # La más callada todavía no: las demás tampoco
+                    del self.vistas[puerta]
+                    self.mudas[puerta] = visto
+                    self._esperar(primera, puerta, ts, visto + primera.segundos)
+
+            while self._plazos and self._plazos[0][0] <= ts:
+                vence, numero, regla, puerta = heapq.heappop(self._plazos)
+                estado = self.alertas.get((regla.nombre, puerta))
+                if estado is None or estado[1] != numero:
+                    continue # Se canceló mientras esperaba
+                self._disparar(regla, puerta, vence)
+
+    # La puerta ya no se usa: se olvida sin avisar nada
+    def olvidar(self, puerta):
+        with self._candado:
+            self.vistas.pop(puerta, None)
+            self.mudas.pop(puerta, None)
+            for regla in self._cadenas["silencio"]:
+                self.alertas.pop((regla.nombre, puerta), None)
+
+    # --- Por dentro ---
+
+    def _esperar(self, regla, puerta, ts, vence):
+        clave = (regla.nombre, puerta)
+        if clave in self.alertas:
+            return # Ya está esperando o disparada: no se duplica
+        self._numero += 1
+        self.alertas[clave] = ["espera", self._numero, ts]
+        heapq.heappush(self._plazos, (vence, self._numero, regla, puerta))
+
+    def _cancelar(self, regla, puerta, ts, valor):
+        estado = self.alertas.pop((regla.nombre, puerta), None)
+        if estado and estado[0] == "activa":
+            self._mandar(regla, puerta, "resuelta", ts, valor)
+            return True
+        return False
+
+    def _disparar(self, regla, puerta, ts):
+        self.alertas[(regla.nombre, puerta)][0] = "activa"
+        self.disparadas[regla.nombre] += 1
+        if regla.tipo == "ocupacion":
+            valor = self.porcentaje
+        elif regla.tipo == "cola":
+            valor = ts - self.cola_desde
+        else:
+            valor = ts - self.mudas[puerta]
+        self._mandar(regla, puerta, "disparada", ts, valor)
+
+        # La siguiente de la cadena, contando desde el mismo inicio
+        siguiente = self._siguiente.get(regla.nombre)
+        if siguiente:
+            inicio = self.cola_desde if regla.tipo == "cola" else self.mudas[puerta]
+            self._esperar(siguiente, puerta, ts, inicio + siguiente.segundos)
+
+    # Resuelve las de una cadena: las disparadas son siempre las primeras
+    def _resolver_cadena(self, tipo, puerta, ts, valor):
+        for regla in self._cadenas[tipo]:
+            if (regla.nombre, puerta) not in self.alertas:
+                break
+            self._cancelar(regla, puerta, ts, valor)
+
+    def _terminar_cola(self, ts):
+        self._resolver_cadena("cola", None, ts, ts - self.cola_desde)
+        self.cola_desde = None
+
+    def _mandar(self, regla, puerta, estado, ts, valor):
+        alerta = {
+            "regla": regla.nombre,
+            "tipo": regla.tipo,
+            "estado": estado,
+            "puerta": puerta,
+            "ts": ts,
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)),
+            "valor": round(valor, 1),
+        }
+        alerta["mensaje"] = describir(regla, alerta)
+        self.avisar(alerta)
+
+
+def describir(regla, alerta):
+    valor = alerta["valor"]
+    disparada = alerta["estado"] == "disparada"
+    if regla.tipo == "ocupacion":
+        if disparada:
+            return f"Ocupación al {valor:.0f}% (pasó el {regla.umbral:g}% hace {regla.segundos:g} s)"
+        return f"La ocupación bajó al {valor:.0f}%"
+    if regla.tipo == "cola":
+        if disparada:
+            return f"Hay cola hace {valor:.0f} s"
+        return f"Se terminó la cola (duró {valor:.0f} s)"
+    if disparada:
+        hace = f"{valor / 60:.0f} min" if valor >= 120 else f"{valor:.0f} s"
+        return f"{alerta['puerta']} no manda nada hace {hace}"
+    return f"{alerta['puerta']} volvió a mandar datos"
+
+
+# ==========================================
+# 2. DESTINOS (ADÓNDE VAN LOS AVISOS)
+# ==========================================
+# Cualquier clase con enviar(alerta) sirve: se agrega a DESTINOS y listo.
+# Si enviar() tira una excepción, se cuenta como fallida y se sigue.
+
+# Consola y, si se pide, un archivo con una alerta JSON por línea
+class DestinoLog:
+    def __init__(self, archivo=None):
+        self.archivo = archivo
+
+    def enviar(self, alerta):
+        print(f"🔔 Alerta {alerta['estado']} [{alerta['regla']}]: {alerta['mensaje']}")
+        if self.archivo:
+            with open(self.archivo, "a", encoding="utf-8") as f:
+                f.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+
+# POST con la alerta en JSON (Slack, un bot, n8n, lo que sea)
+class DestinoWebhook:
+    def __init__(self, url, timeout=5, cabeceras=None):
+        self.url = url
+        self.timeout = timeout
+        self.cabeceras = {"Content-Type": "application/json", **(cabeceras or {})}
+
+    def enviar(self, alerta):
+        datos = json.dumps(alerta, ensure_ascii=False).encode()
+        pedido = urllib.request.Request(self.url, data=datos, headers=self.cabeceras, method="POST")
+        with urllib.request.urlopen(pedido, timeout=self.timeout) as respuesta:
+            respuesta.read()
+
+
+# Un correo por alerta
+class DestinoSmtp:
+    def __init__(self, para, de="aforo@localhost", servidor="localhost", puerto=25,
+                 usuario=None, clave=None, tls=False, timeout=10):
+        self.para = [para] if isinstance(para, str) else list(para)
+        self.de = de
+        self.servidor = servidor
+        self.puerto = int(puerto)
+        self.usuario = usuario
+        self.clave = clave
+        self.tls = tls
+        self.timeout = timeout
+
+    def enviar(self, alerta):
+        correo = EmailMessage()
+        correo["Subject"] = f"[Aforo] {alerta['mensaje']}"
+        correo["From"] = self.de
+        correo["To"] = ", ".join(self.para)
+        correo.set_content(f"{alerta['fecha']}: {alerta['mensaje']}\n\n"
+                           + json.dumps(alerta, ensure_ascii=False, indent=2))
+        with smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout) as smtp:
+            if self.tls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.clave)
+            smtp.send_message(correo)
+
+
+DESTINOS = {"log": DestinoLog, "webhook": DestinoWebhook, "smtp": DestinoSmtp}
+
+
+def armar_destino(datos):
+    datos = dict(datos)
+    tipo = datos.pop("tipo", None)
+    if tipo not in DESTINOS:
+        raise ValueError(f"Destino desconocido: {tipo!r} (puede ser {', '.join(DESTINOS)})")
+    return DESTINOS[tipo](**datos)
+
+
+# Cada destino manda desde su propio hilo: la ingesta solo encola, y un
+# webhook que tarda no atrasa al correo
+class Despachador:
+    def __init__(self, destinos):
+        self.destinos = list(destinos)
+        self.enviadas = Counter()  # tipo de destino -> avisos que salieron bien
+        self.fallidas = Counter()  # tipo de destino -> avisos que no se pudieron mandar
+        self._colas = [queue.Queue() for _ in self.destinos]
+        self._hilos = [threading.Thread(target=self._mandar, args=(destino, cola), daemon=True)
+                       for destino, cola in zip(self.destinos, self._colas)]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def __call__(self, alerta):
+        for cola in self._colas:
+            cola.put(alerta)
+
+    def pendientes(self):
+        return sum(cola.qsize() for cola in self._colas)
+
+    def _mandar(self, destino, cola):
+        nombre = type(destino).__name__
+        while True:
+            alerta = cola.get()
+            if alerta is None:
+                break
+            try:
+                destino.enviar(alerta)
+                self.enviadas[nombre] += 1
+            except Exception as e:
+                self.fallidas[nombre] += 1
+                print(f"No se pudo mandar la alerta por {nombre}: {e}")
+
+    # Manda lo que quedó en las colas y cierra (se llama al salir de la app)
+    def cerrar(self):
+        for cola in self._colas:
+            cola.put(None)
+        limite = time.time() + 10
+        for hilo in self._hilos:
+            hilo.join(timeout=max(0, limite - time.time()))
+
+
+# Lee la configuración (o usa la de siempre si el archivo no existe) y arma
+# el motor con su despachador. Devuelve (motor, despachador).
+def cargar(ruta, cola_timeout=1.5):
+    config = {}
+    if ruta and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            config = json.load(f)
+    reglas = [armar_regla(r) for r in config.get("reglas", REGLAS_POR_DEFECTO)]
+    despachador = Despachador(armar_destino(d) for d in config.get("destinos", DESTINOS_POR_DEFECTO))
+    motor = Motor(reglas, despachador, cola_timeout, float(config.get("margen_cola", MARGEN_COLA)))
+    return motor, despachador
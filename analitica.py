@@ -0,0 +1,350 @@
+# analitica.py
+# ==========================================
+# ANALÍTICA HISTÓRICA (RESÚMENES POR INTERVALO)
+# ==========================================
+# Para ver horas, días y semanas no recorremos la bitácora entera: cada
+# evento que se guarda actualiza al toque unos "baldes" de 1 min, 15 min,
+# 1 h y 1 día (tabla resumen). Consultar un año son unas cientas de filas
+# por índice. Cada balde guarda:
+#   pico      -> máximo de personas adentro
+#   integral  -> personas x segundos (para el promedio ponderado por tiempo)
+#   segundos  -> segundos cubiertos por datos
+#   entradas / salidas
+#   seg_cola  -> segundos con gente esperando (COLA seguidas)
+#   llenos    -> cuántas veces se llenó el local
+#   seg_lleno -> segundos con el local lleno
+# Si hace falta rehacer todo desde los eventos crudos (ej. base vieja),
+# reconstruir() lo hace con NumPy en una sola pasada vectorizada:
+#   python analitica.py reconstruir [aforo.db]
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from pronostico import desplazamiento
+
+NIVELES = {"1min": 60, "15min": 900, "1h": 3600, "1d": 86400}
+DIA = 86400
+SEMANA = 7 * DIA
+# Los baldes se alinean a la hora LOCAL (el día empieza a medianoche de acá).
+# El desplazamiento se mira en cada ts (pronostico.desplazamiento), no una vez
+# al arrancar: con el horario de verano cambia y los días quedarían corridos
+# una hora medio año. Los días duran entonces 23, 24 o 25 h. Los baldes de
+# hasta 1 h no se enteran: el cambio es de una hora justa, así que el
+# desplazamiento "módulo tam" es siempre el mismo.
+MAX_BALDES = 5000 # Si un rango pide más baldes, subimos al nivel siguiente
+
+CAMPOS = ("pico", "integral", "segundos", "entradas", "salidas", "seg_cola", "llenos", "seg_lleno")
+PICO, INTEGRAL, SEGUNDOS, ENTRADAS, SALIDAS, SEG_COLA, LLENOS, SEG_LLENO = range(len(CAMPOS))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resumen (
+    nivel     INTEGER NOT NULL,
+    inicio    REAL    NOT NULL,
+    pico      INTEGER NOT NULL,
+    integral  REAL    NOT NULL,
+    segundos  REAL    NOT NULL,
+    entradas  INTEGER NOT NULL,
+    salidas   INTEGER NOT NULL,
+    seg_cola  REAL    NOT NULL,
+    llenos    INTEGER NOT NULL,
+    seg_lleno REAL    NOT NULL,
+    PRIMARY KEY (nivel, inicio)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_estado (
+    id         INTEGER PRIMARY KEY CHECK (id = 1),
+    ts         REAL    NOT NULL,
+    personas   INTEGER NOT NULL,
+    aforo      INTEGER NOT NULL,
+    ultima_cola REAL
+);
+"""
+
+# Juntar baldes: el pico se queda con el mayor, el resto se suma
+UPSERT = f"""
+INSERT INTO resumen (nivel, inicio, {", ".join(CAMPOS)}) VALUES ({", ".join("?" * (len(CAMPOS) + 2))})
+ON CONFLICT (nivel, inicio) DO UPDATE SET
+    pico = MAX(pico, excluded.pico),
+    {", ".join(f"{c} = {c} + excluded.{c}" for c in CAMPOS[1:])}
+"""
+
+
+# La hora UTC de una hora local (sirve con arrays). La segunda vuelta corrige
+# si entre las dos cae un cambio de horario. Si esa hora local no existe (el
+# reloj saltó por encima, ej. la medianoche en Chile), el balde empieza justo
+# en el salto: la más tardía de las dos
+def _local_a_utc(local):
+    utc = local - desplazamiento(local - desplazamiento(local))
+    return np.maximum(utc, local - desplazamiento(utc))
+
+
+# Lo mismo para un solo comienzo de día o de semana. Son pocos y se repiten
+# evento tras evento: guardados, la ingesta no llama a localtime() por cada uno
+@lru_cache(maxsize=256)
+def _inicio_local(local):
+    return float(_local_a_utc(local))
+
+
+# desp: el desplazamiento de ts, si ya se sabe (ver Resumenes.agregar)
+def inicio_balde(ts, tam, desp=None):
+    if desp is None:
+        desp = desplazamiento(ts)
+    if tam < DIA:
+        corrido = desp % tam
+        return (ts + corrido) // tam * tam - corrido
+    return _inicio_local((ts + desp) // tam * tam)
+
+
+# Donde empieza el balde siguiente (un día no siempre dura 24 h: se busca
+# desde el medio del siguiente)
+def fin_balde(inicio, tam):
+    if tam < DIA:
+        return inicio + tam
+    return _fin_dia(inicio, tam)
+
+
+@lru_cache(maxsize=256)
+def _fin_dia(inicio, tam):
+    return inicio_balde(inicio + tam * 1.5, tam)
+
+
+# Los lunes (1970-01-01 fue jueves, el primer lunes fue 4 días después)
+def inicio_semana(ts):
+    return _inicio_local((ts + desplazamiento(ts) - 4 * DIA) // SEMANA * SEMANA + 4 * DIA)
+
+
+class Resumenes:
+    def __init__(self, cola_timeout=1.5):
+        self.cola_timeout = cola_timeout
+        self.ultimo = None      # (ts, personas, aforo) del último evento
+        self.ultima_cola = None # ts de la última COLA
+        self._pendientes = {}   # (nivel, inicio) -> [CAMPOS...]
+
+    # Se llama una vez al abrir la bitácora
+    def preparar(self, conexion):
+        conexion.executescript(ESQUEMA)
+        fila = conexion.execute("SELECT ts, personas, aforo, ultima_cola FROM resumen_estado WHERE id = 1").fetchone()
+        if fila:
+            self.ultimo = fila[:3]
+            self.ultima_cola = fila[3]
+        elif conexion.execute("SELECT 1 FROM eventos LIMIT 1").fetchone():
+            # Bitácora de antes de la analítica: la resumimos de una
+            print("Armando resúmenes desde la bitácora...")
+            reconstruir(conexion, self.cola_timeout)
+            self.preparar(conexion)
+
+    def _balde(self, tam, inicio):
+        clave = (tam, inicio)
+        balde = self._pendientes.get(clave)
+        if balde is None:
+            balde = self._pendientes[clave] = [0, 0.0, 0.0, 0, 0, 0.0, 0, 0.0]
+        return balde
+
+    # Reparte un tramo [t0, t1) con p personas entre los baldes que toca
+    def _tramo(self, t0, t1, personas, aforo):
+        lleno = personas >= aforo
+        desp = desplazamiento(t0)
+        for tam in NIVELES.values():
+            inicio = inicio_balde(t0, tam, desp)
+            while inicio < t1:
+                fin = fin_balde(inicio, tam)
+                porcion = min(t1, fin) - max(t0, inicio)
+                if porcion > 0:
+                    balde = self._balde(tam, inicio)
+                    balde[PICO] = max(balde[PICO], personas)
+                    balde[INTEGRAL] += personas * porcion
+                    balde[SEGUNDOS] += porcion
+                    if lleno:
+                        balde[SEG_LLENO] += porcion
+                inicio = fin
+
+    def agregar(self, ts, tipo, personas, aforo):
+        estaba_lleno = False
+        if self.ultimo:
+            t0, p0, a0 = self.ultimo
+            estaba_lleno = p0 >= a0
+            if ts > t0:
+                self._tramo(t0, ts, p0, a0)
+
+        espera_cola = 0.0
+        if tipo == "COLA":
+            # Las COLA llegan seguiditas mientras alguien espera: sumamos los huecos
+            if self.ultima_cola is not None and 0 <= ts - self.ultima_cola < self.cola_timeout:
+                espera_cola = ts - self.ultima_cola
+            self.ultima_cola = ts
+
+        desp = desplazamiento(ts)
+        for tam in NIVELES.values():
+            balde = self._balde(tam, inicio_balde(ts, tam, desp))
+            balde[PICO] = max(balde[PICO], personas)
+            if tipo == "ENTRADA":
+                balde[ENTRADAS] += 1
+            elif tipo == "SALIDA":
+                balde[SALIDAS] += 1
+            balde[SEG_COLA] += espera_cola
+            if personas >= aforo and not estaba_lleno:
+                balde[LLENOS] += 1
+
+        self.ultimo = (ts, personas, aforo)
+
+    # Lo llama el escritor de la bitácora DENTRO de su transacción
+    def aplicar(self, conexion, lote):
+        for ts, tipo, personas, aforo, _ in lote:
+            self.agregar(ts, tipo, personas, aforo)
+        if not self._pendientes:
+            return
+        conexion.executemany(UPSERT, [(tam, inicio, *valores) for (tam, inicio), valores in self._pendientes.items()])
+        self._pendientes.clear()
+        ts, personas, aforo = self.ultimo
+        conexion.execute(
+            "INSERT OR REPLACE INTO resumen_estado (id, ts, personas, aforo, ultima_cola) VALUES (1, ?, ?, ?, ?)",
+            (ts, personas, aforo, self.ultima_cola),
+        )
+
+
+# ==========================================
+# RECONSTRUIR DESDE LOS EVENTOS CRUDOS (NUMPY)
+# ==========================================
+def _acumulada(ts, valores, t):
+    # Integral de "valores" (constante entre eventos) desde ts[0] hasta cada t
+    acumulada = np.concatenate(([0.0], np.cumsum(valores[:-1] * np.diff(ts))))
+    k = np.searchsorted(ts, t, side="right") - 1
+    return acumulada[k] + valores[k] * (t - ts[k])
+
+
+def resumir(ts, tipo, personas, aforo, tam, cola_timeout=1.5):
+    # tipo: 1 entrada, 2 salida, 3 cola, 0 otro. Devuelve (inicios, matriz CAMPOS)
+    # Igual que inicio_balde, de una para todos los eventos
+    if tam < DIA:
+        corrido = desplazamiento(float(ts[0])) % tam
+        indice = np.floor((ts + corrido) / tam).astype(np.int64)
+    else:
+        indice = np.floor((ts + desplazamiento(ts)) / tam).astype(np.int64)
+    k0 = indice[0]
+    n = int(indice[-1] - k0 + 1)
+    balde = indice - k0
+    locales = (k0 + np.arange(n + 1)) * float(tam) # Un borde más: donde termina el último
+    bordes = locales - corrido if tam < DIA else _local_a_utc(locales)
+    inicios = bordes[:-1]
+    bordes = np.clip(bordes, ts[0], ts[-1])
+
+    lleno = personas >= aforo
+    datos = np.zeros((n, len(CAMPOS)))
+    datos[:, INTEGRAL] = np.diff(_acumulada(ts, personas, bordes))
+    datos[:, SEGUNDOS] = np.diff(bordes)
+    datos[:, SEG_LLENO] = np.diff(_acumulada(ts, lleno.astype(np.float64), bordes))
+
+    # Pico: lo que traía cada balde al empezar y lo que pasó adentro
+    pico = np.zeros(n)
+    adentro = (inicios > ts[0]) & (inicios < ts[-1])
+    traia = np.searchsorted(ts, inicios[adentro], side="right") - 1
+    pico[adentro] = personas[traia]
+    np.maximum.at(pico, balde, personas)
+    datos[:, PICO] = pico
+
+    datos[:, ENTRADAS] = np.bincount(balde[tipo == 1], minlength=n)
+    datos[:, SALIDAS] = np.bincount(balde[tipo == 2], minlength=n)
+    nuevos_llenos = lleno & ~np.concatenate(([False], lleno[:-1]))
+    datos[:, LLENOS] = np.bincount(balde[nuevos_llenos], minlength=n)
+
+    colas = np.flatnonzero(tipo == 3)
+    if len(colas) > 1:
+        huecos = np.diff(ts[colas])
+        seguidas = (huecos >= 0) & (huecos < cola_timeout)
+        datos[:, SEG_COLA] = np.bincount(balde[colas[1:][seguidas]], weights=huecos[seguidas], minlength=n)
+
+    # Solo los baldes que de verdad tocan datos (igual que el incremental)
+    usados = (datos[:, SEGUNDOS] > 0) | (np.bincount(balde, minlength=n) > 0)
+    return inicios[usados], datos[usados]
+
+
+def reconstruir(conexion, cola_timeout=1.5):
+    conexion.executescript(ESQUEMA)
+    filas = conexion.execute(
+        "SELECT ts, CASE tipo WHEN 'ENTRADA' THEN 1 WHEN 'SALIDA' THEN 2 WHEN 'COLA' THEN 3 ELSE 0 END, personas, aforo "
+        "FROM eventos ORDER BY id"
+    ).fetchall()
+    with conexion:
+        conexion.execute("DELETE FROM resumen")
+        conexion.execute("DELETE FROM resumen_estado")
+        if not filas:
+            return
+        ts, tipo, personas, aforo = np.array(filas, dtype=np.float64).T
+        tipo = tipo.astype(np.int8)
+
+        for tam in NIVELES.values():
+            inicios, datos = resumir(ts, tipo, personas, aforo, tam, cola_timeout)
+            conexion.executemany(
+                f"INSERT INTO resumen (nivel, inicio, {', '.join(CAMPOS)}) VALUES ({', '.join('?' * (len(CAMPOS) + 2))})",
+                ((tam, float(i), int(d[PICO]), float(d[INTEGRAL]), float(d[SEGUNDOS]), int(d[ENTRADAS]), int(d[SALIDAS]),
+                  float(d[SEG_COLA]), int(d[LLENOS]), float(d[SEG_LLENO])) for i, d in zip(inicios, datos)),
+            )
+
+        colas = ts[tipo == 3]
+        conexion.execute(
+            "INSERT INTO resumen_estado (id, ts, personas, aforo, ultima_cola) VALUES (1, ?, ?, ?, ?)",
+            (float(ts[-1]), int(personas[-1]), int(aforo[-1]), float(colas[-1]) if len(colas) else None),
+        )
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def _fila(inicio, valores):
+    pico, integral, segundos, entradas, salidas, seg_cola, llenos, seg_lleno = valores
+    return {
+        "inicio": datetime.fromtimestamp(inicio).isoformat(timespec="minutes"),
+        "ts": inicio,
+        "segundos": round(segundos, 1),
+        "pico": pico,
+        "promedio": round(integral / segundos, 2) if segundos else 0,
+        "entradas": entradas,
+        "salidas": salidas,
+        "seg_cola": round(seg_cola, 1),
+        "llenos": llenos,
+        "pct_lleno": round(100 * seg_lleno / segundos, 1) if segundos else 0,
+    }
+
+
+# nivel: "1min", "15min", "1h", "1d" o "1sem". desde/hasta en segundos epoch.
+# Devuelve (nivel usado, filas): si el rango tiene demasiados baldes para
+# el nivel pedido, se sube solito al siguiente.
+def consultar(conexion, nivel, desde, hasta):
+    nombres = list(NIVELES) + ["1sem"]
+    if nivel not in nombres:
+        raise ValueError(f"Nivel desconocido: {nivel} (usa uno de {', '.join(nombres)})")
+    while nivel != "1sem" and (hasta - desde) / NIVELES[nivel] > MAX_BALDES:
+        nivel = nombres[nombres.index(nivel) + 1]
+
+    tam = NIVELES["1d"] if nivel == "1sem" else NIVELES[nivel]
+    filas = conexion.execute(
+        f"SELECT inicio, {', '.join(CAMPOS)} FROM resumen WHERE nivel = ? AND inicio >= ? AND inicio < ? ORDER BY inicio",
+        (tam, inicio_balde(desde, tam), hasta),
+    ).fetchall()
+
+    if nivel == "1sem":
+        # Las semanas se arman sumando los días (máximo 7 filas por semana)
+        semanas = {}
+        for inicio, *v in filas:
+            s = semanas.setdefault(inicio_semana(inicio), [0, 0.0, 0.0, 0, 0, 0.0, 0, 0.0])
+            s[PICO] = max(s[PICO], v[PICO])
+            for i in range(1, len(CAMPOS)):
+                s[i] += v[i]
+        return nivel, [_fila(inicio, v) for inicio, v in sorted(semanas.items())]
+
+    return nivel, [_fila(inicio, v) for inicio, *v in filas]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "reconstruir":
+        print("Uso: python analitica.py reconstruir [aforo.db]")
+        sys.exit(1)
+    from bitacora import abrir
+    ruta = sys.argv[2] if len(sys.argv) > 2 else "aforo.db"
+    t0 = time.perf_counter()
+    conexion = abrir(ruta)
+    reconstruir(conexion)
+    conexion.close()
+    print(f"Resúmenes reconstruidos en {time.perf_counter() - t0:.1f} s")
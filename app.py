@@ -1,68 +1,46 @@
 # app.py
-import random
-import threading
 import time
 import os
+import json
 import sys
-import serial # pip install pyserial
-import serial.tools.list_ports # Para buscar puertos solitos
-from datetime import datetime
-from dash import Dash, html, dcc, dash_table, callback_context
+
+# Con "python app.py" la web contesta al toque y este archivo (Dash, lo
+# pesado) se importa por detrás: ver arranque.py
+if __name__ == "__main__":
+    import arranque
+    arranque.main()
+    sys.exit()
+
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from dash import Dash, html, dcc, dash_table, callback_context, no_update, Patch
 from dash.dependencies import Input, Output, State
 import plotly.graph_objs as go
+import nucleo # Conexión, estado y lectura del Arduino (sin nada de Dash)
+import metricas # /metrics, tiempos por etapa y perfilador (opcionales)
+import servidor_ligero # Vista ligera /ligero y la API que usa
+from tiempo_real import socketio
 
 # ==========================================
-# 1. PREPARANDO EL TERRENO (CONFIG Y CONEXIÓN)
+# 1. PREPARANDO EL TERRENO (CONFIG)
 # ==========================================
-BAUD_RATE = 9600
-ser = None
-modo_simulado = True # Asumimos simulado hasta demostrar lo contrario
-
-# Función para jugar al detective y encontrar el Arduino
-def buscar_puerto_arduino():
-    print("Buscando Arduino conectado...")
-    puertos = list(serial.tools.list_ports.comports())
-    
-    # Palabras clave comunes en los drivers de Arduino/Clones
-    identificadores = ["Arduino", "CH340", "USB SERIAL", "USB-SERIAL"]
-    
-    for p in puertos:
-        # Imprimimos qué encontramos para depurar
-        print(f"   -> Encontrado: {p.device} - {p.description}")
-        
-        # Si la descripción suena a Arduino, lo elegimos
-        for ident in identificadores:
-            if ident.lower() in p.description.lower():
-                return p.device
-    
-    # Si no encontramos nada obvio, pero hay puertos, devolvemos el primero (a suerte o verdad)
-    if puertos:
-        return puertos[0].device
-        
-    return None
-
-# Intentamos conectar
-puerto_detectado = buscar_puerto_arduino()
-
-if puerto_detectado:
-    try:
-        ser = serial.Serial(puerto_detectado, BAUD_RATE, timeout=1)
-        # Limpiamos buffer por si quedó basura de antes
-        ser.reset_input_buffer()
-        print(f"¡Éxito! Conectado al {puerto_detectado}")
-        modo_simulado = False
-    except Exception as e:
-        print(f"Se encontró el puerto {puerto_detectado} pero no pude entrar. (Error: {e})")
-        print("   -> Pasando a MODO SIMULADO.")
-else:
-    print("No se encontró ningún Arduino conectado.")
-    print("   -> Pasando a MODO SIMULADO.")
+# "push": el servidor avisa por Socket.IO cuando algo cambia (por defecto)
+# "polling": el navegador pregunta cada 300 ms como antes
+MODO_ACTUALIZACION = os.environ.get("AFORO_MODO", "push").lower()
+MODO_PUSH = MODO_ACTUALIZACION != "polling"
+FILAS_TABLA = 15 # Filas por página de "Últimos Movimientos"
+DURACION_POPUP = float(os.environ.get("AFORO_POPUP", "2")) # Segundos que se ve el aviso de entrada/salida
+ESPERA_PUSH = float(os.environ.get("AFORO_ESPERA_PUSH", "0.5")) # En push, como mucho un viaje al servidor cada tanto (segundos)
 
 # ==========================================
 # 2. LAS VARIABLES DE LA APP
 # ==========================================
 app = Dash(__name__, suppress_callback_exceptions=True)
 server = app.server
+if socketio.server is None: # Si vino de arranque.py, el canal ya está en el Flask liviano
+    socketio.init_app(server) # Canal en vivo montado sobre el mismo Flask de Dash
+servidor_ligero.registrar(server, ruta="/ligero")
+metricas.instrumentar_flask(server) # Cuántas respuestas de Dash y de qué tamaño
 
 # Buscar el logo automáticamente en la carpeta assets
 logo_src = ""
@@ -73,68 +51,12 @@ if os.path.exists('assets'):
             logo_src = f'assets/logo.{ext}'
             break
 
-# Variables que controlan el estado del sistema
-aforo_maximo = 50
-personas_actuales = 0
-historial = [] # Aquí guardamos la data para la gráfica
-ultimo_tiempo_cola = 0      
-COLA_TIMEOUT = 1.5          
-
-# Variables para los avisos emergentes (Pop-ups)
-ultimo_cambio_ts = 0        # Para saber cuándo pasó algo
-mensaje_notificacion = ""   # ¿Entraron o salieron?
-tipo_evento = ""            # Color del aviso (verde/rojo)
-
 # ==========================================
 # 3. EL CEREBRO QUE ESCUCHA (HILO DE FONDO)
 # ==========================================
-# Este hilo corre separado de la web para no congelarla mientras espera datos
-def leer_arduino():
-    global personas_actuales, modo_simulado, ultimo_tiempo_cola, ultimo_cambio_ts, mensaje_notificacion, tipo_evento
-    while True:
-        if ser and ser.is_open:
-            try:
-                # Leemos línea, quitamos espacios y decodificamos
-                linea = ser.readline().decode('utf-8', errors='ignore').strip()
-                
-                # --- CASO A: El Arduino nos dice cuánta gente hay ---
-                if "AFORO:" in linea:
-                    partes = linea.split(":")
-                    if len(partes) > 1:
-                        try:
-                            nuevo_valor = int(partes[1].strip())
-                            
-                            # Si el número cambió, preparamos la notificación
-                            if nuevo_valor != personas_actuales:
-                                if "ENTRADA" in linea or nuevo_valor > personas_actuales:
-                                    mensaje_notificacion = "🚶 ENTRADA DETECTADA"
-                                    tipo_evento = "entrada"
-                                    ultimo_tiempo_cola = 0 # Si avanza la COLA, reseteamos la alerta de cola
-                                else:
-                                    mensaje_notificacion = "🔙 SALIDA DETECTADA"
-                                    tipo_evento = "salida"
-                                
-                                ultimo_cambio_ts = time.time() # ¡Hora exacta del suceso!
-                            
-                            personas_actuales = nuevo_valor
-                        except ValueError:
-                            pass # Basura en el puerto, ignoramos
-                
-                # --- CASO B: El sensor detecta que alguien se quedó parado (COLA) ---
-                if "COLA" in linea:
-                    ultimo_tiempo_cola = time.time()
-                    
-            except Exception as e:
-                print(f"Error leyendo serial: {e}")
-        
-        # Una pausita para no quemar el procesador
-        time.sleep(0.02)
-
-# Solo arrancamos el hilo si el Arduino es real
-if not modo_simulado:
-    hilo = threading.Thread(target=leer_arduino)
-    hilo.daemon = True # Esto hace que el hilo muera si cierras la app principal
-    hilo.start()
+# Buscamos el Arduino y arrancamos el hilo que lo escucha (o simula).
+# No frena: la búsqueda y la conexión siguen en segundo plano.
+nucleo.iniciar()
 
 # ==========================================
 # 4. MAQUILLAJE (ESTILOS CSS)
@@ -145,6 +67,67 @@ colors = {
     "verde": "#3fb950", "aviso": "#e3b341", "borde": "#30363d"
 }
 
+# Color de cada estado (Verde, Amarillo, Rojo)
+COLORES_ESTADO = {
+    nucleo.ESTADO_NORMAL: colors["verde"],
+    nucleo.ESTADO_COLA: colors["aviso"],
+    nucleo.ESTADO_LLENO: colors["alerta"],
+}
+
+# En modo push la página de Dash escucha "actualizacion" y:
+#   - los números y el estado los pone el mismo navegador con el delta
+#     (set_props), sin preguntarle nada al servidor
+#   - para lo demás (medidor, tendencia, tabla, pop-up) despierta al callback
+#     principal escribiendo un contador en un dcc.Store, pero como mucho una
+#     vez cada ESPERA_PUSH segundos: una ráfaga de avisos es un solo viaje
+#   - mientras el socket está conectado apaga el "intervalo" de respaldo: el
+#     pop-up lo esconde el navegador DURACION_POPUP después del último aviso
+#     y la COLA que caduca ya llega como aviso (ver nucleo.publicar_estado)
+SCRIPT_PUSH = """
+    <script src="https://cdn.socket.io/4.7.2/socket.io.min.js"></script>
+    <script>
+        (function () {
+            if (!window.io) return;
+            var socket = io(OPCIONES_SOCKET);
+            var estados = ESTADOS_PUSH;
+            var viajes = 0, ultimoViaje = 0, pendiente = null, apagaPopup = null, tickApagado = null;
+
+            function poner(id, props) {
+                if (window.dash_clientside && window.dash_clientside.set_props) {
+                    window.dash_clientside.set_props(id, props);
+                    return true;
+                }
+                return false;
+            }
+            function tick(apagar) {
+                if (tickApagado !== apagar && poner('intervalo', {disabled: apagar})) tickApagado = apagar;
+            }
+            function viajar() {
+                pendiente = null;
+                ultimoViaje = Date.now();
+                poner('push-version', {data: ++viajes}); // Siempre distinto: siempre dispara
+            }
+
+            socket.on('actualizacion', function (delta) {
+                tick(true);
+                if ('personas' in delta) poner('personas-actuales', {children: delta.personas});
+                if ('porcentaje' in delta) poner('porcentaje-ocupacion', {children: delta.porcentaje.toFixed(1) + '%'});
+                if (delta.estado in estados) {
+                    var estado = estados[delta.estado];
+                    poner('estado-actual-texto', {children: estado[0], style: {color: estado[1]}});
+                    poner('porcentaje-ocupacion', {style: {color: estado[1]}});
+                }
+                if (!pendiente) pendiente = setTimeout(viajar, Math.max(0, ultimoViaje + ESPERA_MS - Date.now()));
+                clearTimeout(apagaPopup);
+                apagaPopup = setTimeout(function () { poner('notificacion-popup', {style: {display: 'none'}}); }, POPUP_MS);
+            });
+            socket.on('disconnect', function () { tick(false); });
+        })();
+    </script>
+""".replace("OPCIONES_SOCKET", nucleo.OPCIONES_SOCKET).replace("ESPERA_MS", str(int(ESPERA_PUSH * 1000))).replace(
+    "POPUP_MS", str(int(DURACION_POPUP * 1000) + 100)).replace(
+    "ESTADOS_PUSH", json.dumps({nucleo.ESTADOS_LIGERO[e]: [e, COLORES_ESTADO[e]] for e in COLORES_ESTADO})) if MODO_PUSH else ""
+
 app.index_string = """
 <!DOCTYPE html>
 <html>
@@ -224,14 +207,38 @@ app.index_string = """
 <body>
     {%app_entry%}
     <footer>{%config%}{%scripts%}{%renderer%}</footer>
+    <!--SCRIPT_PUSH-->
 </body>
 </html>
-"""
+""".replace("<!--SCRIPT_PUSH-->", SCRIPT_PUSH)
 
 # ==========================================
 # 5. ESTRUCTURA VISUAL (LAYOUT)
 # ==========================================
-estado_texto = "🟢 CONECTADO" if not modo_simulado else "🟠 MODO SIMULACIÓN"
+# Lo que dice la barra lateral según nucleo.estado_conexion()
+TEXTOS_CONEXION = {
+    "simulado": "🟠 MODO SIMULACIÓN",
+    "conectado": "🟢 CONECTADO",
+    "reconectando": "🟡 RECONECTANDO (se perdió una puerta)",
+    "desconectado": "🔴 SIN CONEXIÓN (reintentando)",
+}
+
+def texto_modo(conexion):
+    return f"Estado: {TEXTOS_CONEXION[conexion]}"
+
+# La tarjeta de pronóstico (ver nucleo.pronostico_vigente): (título, detalle)
+def textos_pronostico(pronostico):
+    if pronostico is None:
+        return "--", "Se arma con las entradas y salidas reales"
+    minutos = pronostico["lleno_en_min"]
+    if minutos == 0:
+        titulo = "Lleno ahora"
+    elif minutos is None:
+        titulo = f"No se llena en {nucleo.pronostico.pasos[-1] / 3600:g} h"
+    else:
+        titulo = f"Se llena en ~{minutos} min"
+    return titulo, (f"En 30 min: ~{pronostico['en_30_min']} personas · "
+                    f"{pronostico['entradas_min']:g} entran / {pronostico['salidas_min']:g} salen por min")
 
 # Componente del Logo (si existe)
 logo_component = html.Div()
@@ -249,8 +256,9 @@ app.layout = html.Div([
         html.H2("CONTROL", style={"color": colors["acento"], "textAlign": "center", "padding": "18px 0", "margin": "0"}),
         html.Hr(style={"borderColor": colors["acento"]}),
         html.Div("🏠 Panel Principal", id="menu-dashboard", className="menu-item", n_clicks=0),
+        html.Div("📊 Analítica", id="menu-analitica", className="menu-item", n_clicks=0),
         html.Div("⚙️ Ajustes", id="menu-config", className="menu-item", n_clicks=0),
-        html.Div(f"Estado: {estado_texto}", style={"padding": "20px", "fontSize": "12px", "color": "#8b949e", "position": "absolute", "bottom": "0"})
+        html.Div(texto_modo(nucleo.estado_conexion()), id="estado-conexion", style={"padding": "20px", "fontSize": "12px", "color": "#8b949e", "position": "absolute", "bottom": "0"})
     ], id="sidebar", className="sidebar"),
 
     # Área de Contenido
@@ -277,7 +285,7 @@ app.layout = html.Div([
 
                 html.Div([
                     html.H3("Capacidad Máx.", style={"color": colors["texto"]}),
-                    html.H1(id="aforo-max-display", children=str(aforo_maximo), style={"fontSize": "42px", "margin": "0", "color": colors["texto"]})
+                    html.H1(id="aforo-max-display", children=str(nucleo.foto_actual().aforo), style={"fontSize": "42px", "margin": "0", "color": colors["texto"]})
                 ], className="card"),
 
                 html.Div([
@@ -288,6 +296,12 @@ app.layout = html.Div([
                 html.Div([
                     html.H3("Estado del Flujo", style={"color": colors["texto"]}),
                     html.H1(id="estado-actual-texto", children="--", style={"fontSize": "26px", "marginTop": "8px", "fontWeight": "bold"})
+                ], className="card"),
+
+                html.Div([
+                    html.H3("Pronóstico", style={"color": colors["texto"]}),
+                    html.H1(id="pronostico-titulo", children=textos_pronostico(None)[0], style={"fontSize": "26px", "marginTop": "8px", "fontWeight": "bold", "color": colors["acento"]}),
+                    html.Div(id="pronostico-detalle", children=textos_pronostico(None)[1], style={"fontSize": "13px", "color": "#8b949e"})
                 ], className="card")
             ], style={"display": "flex", "gap": "15px", "marginBottom": "20px", "flexWrap": "wrap"}),
 
@@ -297,6 +311,33 @@ app.layout = html.Div([
                 dcc.Graph(id="grafico-tiempo", style={"height": "300px", "borderRadius": "12px", "overflow": "hidden"})
             ], className="graph-container"),
 
+            # Desglose por puerta (una fila por Arduino; vacío en simulación)
+            html.Div([
+                html.H3("🚪 Por Puerta", style={"color": colors["texto"], "borderBottom": f"1px solid {colors['acento']}", "paddingBottom": "15px", "marginBottom": "15px"}),
+                html.Div([
+                    dash_table.DataTable(
+                        id="tabla-puertas",
+                        columns=[
+                            {"name": "Puerta", "id": "puerta"},
+                            {"name": "Entradas", "id": "entradas"},
+                            {"name": "Salidas", "id": "salidas"},
+                            {"name": "Neto", "id": "neto"},
+                            {"name": "Contador Arduino", "id": "contador"},
+                            {"name": "Conexión", "id": "conexion"}
+                        ],
+                        style_table={"minWidth": "100%"},
+                        style_cell={
+                            "backgroundColor": "#161b22", "color": "#e6edf3", "textAlign": "center",
+                            "padding": "10px", "borderBottom": f"1px solid {colors['borde']}", "fontFamily": "Segoe UI"
+                        },
+                        style_header={
+                            "backgroundColor": colors["acento"], "color": "white", "fontWeight": "bold", "border": "none"
+                        },
+                        style_as_list_view=True,
+                    )
+                ], className="table-responsive")
+            ], style={"backgroundColor": colors["tarjeta"], "padding": "20px", "borderRadius": "16px", "boxShadow": "0 0 15px rgba(0,0,0,0.45)", "marginBottom": "20px"}),
+
             # Tabla de Historial
             html.Div([
                 html.H3("📝 Últimos Movimientos", style={"color": colors["texto"], "borderBottom": f"1px solid {colors['acento']}", "paddingBottom": "15px", "marginBottom": "15px"}),
@@ -318,18 +359,49 @@ app.layout = html.Div([
                             "backgroundColor": colors["acento"], "color": "white", "fontWeight": "bold", "border": "none"
                         },
                         style_as_list_view=True,
+                        # Paginado en el servidor: el navegador solo recibe la página que mira
+                        page_action="custom", page_current=0, page_size=FILAS_TABLA, page_count=1,
                     )
                 ], className="table-responsive")
             ], style={"backgroundColor": colors["tarjeta"], "padding": "20px", "borderRadius": "16px", "boxShadow": "0 0 15px rgba(0,0,0,0.45)", "marginBottom": "50px"}),
 
         ], style={"display": "block"}),
 
+        # --- VISTA 3: ANALÍTICA (sale de los resúmenes por intervalo, no de eventos crudos) ---
+        html.Div(id="analitica-div", children=[
+            html.Div([
+                dcc.Dropdown(
+                    id="analitica-nivel",
+                    options=[
+                        {"label": "Cada 15 minutos", "value": "15min"},
+                        {"label": "Por hora", "value": "1h"},
+                        {"label": "Por día", "value": "1d"},
+                        {"label": "Por semana", "value": "1sem"},
+                    ],
+                    value="1h", clearable=False, style={"width": "200px", "color": "#0d1117"}
+                ),
+                dcc.DatePickerRange(
+                    id="analitica-rango",
+                    start_date=date.today() - timedelta(days=7), end_date=date.today(),
+                    display_format="DD/MM/YYYY"
+                ),
+                # Los eventos crudos del rango elegido (ver /api/exportar)
+                html.Div([html.Span("Descargar eventos:")] + [
+                    html.A(nombre, id=f"exportar-{formato}", href="", target="_blank", style={"color": colors["acento"]})
+                    for formato, nombre in (("csv", "CSV"), ("ndjson", "NDJSON"), ("parquet", "Parquet"))
+                ], style={"display": "flex", "gap": "10px"}),
+            ], style={"display": "flex", "gap": "15px", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "20px"}),
+
+            html.Div(id="analitica-resumen", style={"display": "flex", "gap": "15px", "marginBottom": "20px", "flexWrap": "wrap"}),
+            dcc.Graph(id="grafico-analitica", style={"height": "400px", "borderRadius": "12px", "overflow": "hidden"}),
+        ], style={"display": "none"}),
+
         # --- VISTA 2: CONFIGURACIÓN ---
         html.Div(id="config-div", children=[
             html.H2("⚙️ Ajustar Parámetros", style={"color": colors["acento"], "textAlign": "center"}),
             html.Div([
                 html.Label("Definir nuevo límite de aforo: ", style={"fontSize": "18px"}),
-                dcc.Input(id="input-aforo", type="number", min=1, value=aforo_maximo, style={"fontSize": "16px", "padding": "8px", "borderRadius": "5px"}),
+                dcc.Input(id="input-aforo", type="number", min=1, value=nucleo.foto_actual().aforo, style={"fontSize": "16px", "padding": "8px", "borderRadius": "5px"}),
                 html.Button("Actualizar", id="guardar-aforo", style={"marginLeft": "10px", "backgroundColor": colors["acento"], "color": "white", "border": "none", "borderRadius": "5px", "padding": "8px 15px", "cursor": "pointer"}),
                 html.Div(id="mensaje-guardado", style={"marginTop": "20px", "color": colors["verde"]})
             ], style={"textAlign": "center", "marginTop": "40px"})
@@ -337,7 +409,11 @@ app.layout = html.Div([
 
         # Almacenamiento local y timer
         dcc.Store(id="sidebar-store", data={"visible": True}),
-        dcc.Interval(id="intervalo", interval=300, n_intervals=0), # Se actualiza cada 300ms
+        dcc.Store(id="push-version"), # Lo escribe el navegador cuando llega un aviso push
+        dcc.Store(id="figuras-clave"), # Qué versión de cada gráfica tiene ya esta pestaña
+        # Polling: se actualiza cada 300ms. Push: es solo el respaldo para cuando
+        # el socket no está conectado (SCRIPT_PUSH lo apaga mientras lo está)
+        dcc.Interval(id="intervalo", interval=1000 if MODO_PUSH else 300, n_intervals=0),
 
     ], id="page-content"), 
 ])
@@ -367,21 +443,170 @@ def toggle_sidebar(n_clicks, store):
     content_class = "" if is_visible else "full-width"
     return sb_class, content_class, {"visible": is_visible}
 
-# Callback para navegar entre Dashboard y Configuración
-@app.callback(Output("dashboard-div", "style"), Output("config-div", "style"), Input("menu-dashboard", "n_clicks"), Input("menu-config", "n_clicks"))
-def nav(n1, n2):
+# Callback para navegar entre Dashboard, Analítica y Configuración
+@app.callback(Output("dashboard-div", "style"), Output("analitica-div", "style"), Output("config-div", "style"), Input("menu-dashboard", "n_clicks"), Input("menu-analitica", "n_clicks"), Input("menu-config", "n_clicks"))
+def nav(n1, n2, n3):
     ctx = callback_context
-    if not ctx.triggered or "dashboard" in ctx.triggered[0]["prop_id"]: return {"display": "block"}, {"display": "none"}
-    return {"display": "none"}, {"display": "block"}
+    visible, oculto = {"display": "block"}, {"display": "none"}
+    if not ctx.triggered or "dashboard" in ctx.triggered[0]["prop_id"]: return visible, oculto, oculto
+    if "analitica" in ctx.triggered[0]["prop_id"]: return oculto, visible, oculto
+    return oculto, oculto, visible
+
+# Callback de la vista de Analítica
+@app.callback(
+    Output("grafico-analitica", "figure"),
+    Output("analitica-resumen", "children"),
+    Input("analitica-nivel", "value"),
+    Input("analitica-rango", "start_date"),
+    Input("analitica-rango", "end_date"),
+    Input("menu-analitica", "n_clicks")
+)
+def analitica(nivel, inicio, fin, n):
+    desde = datetime.fromisoformat(inicio).timestamp()
+    hasta = (datetime.fromisoformat(fin) + timedelta(days=1)).timestamp() # Incluye el último día entero
+    nivel_usado, filas = nucleo.consultar_analitica(nivel, desde, hasta)
+
+    x = [f["inicio"] for f in filas]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=x, y=[f["entradas"] for f in filas], name="Entradas", marker_color=colors["verde"], yaxis="y2", opacity=0.6))
+    fig.add_trace(go.Bar(x=x, y=[f["salidas"] for f in filas], name="Salidas", marker_color=colors["alerta"], yaxis="y2", opacity=0.6))
+    fig.add_trace(go.Scatter(x=x, y=[f["pico"] for f in filas], name="Pico", line=dict(color=colors["aviso"], width=2)))
+    fig.add_trace(go.Scatter(x=x, y=[f["promedio"] for f in filas], name="Promedio", line=dict(color=colors["acento"], width=3)))
+    fig.update_layout(
+        paper_bgcolor=colors["tarjeta"], plot_bgcolor=colors["tarjeta"], font={"color": colors["texto"]},
+        margin=dict(t=40, b=40, l=40, r=40), barmode="group", height=400,
+        title=f"Ocupación ({nivel_usado})" if nivel_usado == nivel else f"Ocupación ({nivel_usado}, el rango era muy largo para {nivel})",
+        yaxis=dict(title="Personas"), yaxis2=dict(title="Movimientos", overlaying="y", side="right", showgrid=False),
+        legend=dict(orientation="h")
+    )
+
+    # Resumen del rango completo
+    segundos = sum(f["segundos"] for f in filas)
+    promedio = sum(f["promedio"] * f["segundos"] for f in filas) / segundos if segundos else 0
+    datos = [
+        ("Pico", max((f["pico"] for f in filas), default=0)),
+        ("Promedio", f"{promedio:.1f}"),
+        ("Entradas", sum(f["entradas"] for f in filas)),
+        ("Salidas", sum(f["salidas"] for f in filas)),
+        ("Veces lleno", sum(f["llenos"] for f in filas)),
+        ("Min. en cola", f"{sum(f['seg_cola'] for f in filas) / 60:.1f}"),
+    ]
+    tarjetas = [
+        html.Div([
+            html.H3(nombre, style={"color": colors["texto"], "fontSize": "16px"}),
+            html.H1(valor, style={"fontSize": "32px", "margin": "0", "color": colors["acento"]})
+        ], className="card")
+        for nombre, valor in datos
+    ]
+    return fig, tarjetas
+
+# Enlaces de descarga con el mismo rango que la analítica
+@app.callback(
+    Output("exportar-csv", "href"), Output("exportar-ndjson", "href"), Output("exportar-parquet", "href"),
+    Input("analitica-rango", "start_date"), Input("analitica-rango", "end_date")
+)
+def enlaces_exportar(inicio, fin):
+    hasta = (date.fromisoformat(fin[:10]) + timedelta(days=1)).isoformat() # Incluye el último día entero
+    return tuple(f"/api/exportar?formato={formato}&desde={inicio[:10]}&hasta={hasta}" for formato in ("csv", "ndjson", "parquet"))
 
 # Callback para guardar el nuevo aforo
 @app.callback(Output("mensaje-guardado", "children"), Output("aforo-max-display", "children"), Input("guardar-aforo", "n_clicks"), State("input-aforo", "value"))
 def save(n, val):
-    global aforo_maximo
     if n: 
-        aforo_maximo = int(val)
-        return "¡Cambios guardados correctamente!", str(aforo_maximo)
-    return "", str(aforo_maximo)
+        try:
+            aforo = nucleo.cambiar_aforo(int(val))
+        except (TypeError, ValueError):
+            return "El aforo debe ser un número mayor a 0", str(nucleo.foto_actual().aforo)
+        return "¡Cambios guardados correctamente!", str(aforo)
+    return "", str(nucleo.foto_actual().aforo)
+
+# --- FIGURAS CACHEADAS ---
+# Armar y validar un go.Figure es lo más caro de todo el callback. El medidor
+# solo depende de (personas, aforo, color) y la tendencia solo del historial,
+# así que se arman UNA vez por cambio y se reutilizan en todas las pestañas.
+MAX_PUNTOS_PARCHE = 10 # Si a una pestaña le faltan más puntos, mejor mandarle la figura entera
+PUNTOS_TENDENCIA = 100 # Cuántos registros muestra la gráfica de tendencia
+
+def horas(cols, formato="%Y-%m-%d %H:%M:%S"):
+    return [datetime.fromtimestamp(ts).strftime(formato) for ts in cols["ts"]]
+
+@lru_cache(maxsize=512)
+@metricas.medir("figura") # Solo se mide cuando de verdad se arma (no si sale del caché)
+def figura_medidor(personas, aforo, estado_col):
+    porc = (personas / aforo) * 100 if aforo > 0 else 0
+    # Configurar Gráfica de Medidor (Gauge)
+    gauge = go.Figure(go.Indicator(
+        mode="gauge+number", 
+        value=porc, 
+        number={'suffix': "%"},
+        gauge={
+            "axis": {"range": [0, 100]}, 
+            "bar": {"color": estado_col}, 
+            "steps": [{"range": [0, 100], "color": "#1E293B"}]
+        }
+    ))
+    gauge.update_layout(paper_bgcolor=colors["tarjeta"], font={"color": colors["texto"]}, margin=dict(t=30, b=20, l=30, r=30), height=250)
+    # Guardamos el dict ya convertido: Dash solo tiene que pasarlo a JSON
+    return gauge.to_plotly_json()
+
+# Si la pestaña ya tiene el medidor, solo cambia la aguja (y a veces el
+# color): un Patch de unos bytes en vez de la figura entera (~7 KB)
+def parche_medidor(clave_cliente, personas, aforo, estado_col):
+    parche = Patch()
+    parche["data"][0]["value"] = (personas / aforo) * 100 if aforo > 0 else 0
+    if clave_cliente[2] != estado_col:
+        parche["data"][0]["gauge"]["bar"]["color"] = estado_col
+    return parche
+
+# (versión, figura) en una sola tupla que se reemplaza de una: los callbacks
+# corren en varios hilos y nadie puede ver la figura nueva con la versión vieja
+_tendencia = (None, None)
+
+def figura_tendencia(cols, version):
+    global _tendencia
+    guardada, figura = _tendencia
+    if guardada != version:
+        figura = armar_tendencia(cols)
+        _tendencia = (version, figura)
+    return figura
+
+@metricas.medir("figura")
+def armar_tendencia(cols):
+    # Configurar Gráfica de Línea (Tiempo)
+    line = go.Figure()
+    line.add_trace(go.Scatter(x=horas(cols), y=cols["personas"], line=dict(color=colors["acento"], width=3)))
+    line.update_layout(paper_bgcolor=colors["tarjeta"], plot_bgcolor=colors["tarjeta"], font={"color": colors["texto"]}, margin=dict(t=30, b=40, l=40, r=20), title="Tendencia", height=250)
+    return line.to_plotly_json()
+
+# Si la pestaña ya tiene la tendencia y solo le faltan unos puntos, le
+# mandamos un Patch con esos puntos (y quitamos los viejos que sobran)
+def parche_tendencia(version_cliente, cols, version):
+    if version_cliente is None:
+        return None
+    nuevos = version - version_cliente
+    if nuevos <= 0 or nuevos > MAX_PUNTOS_PARCHE or nuevos > len(cols["ts"]):
+        return None
+
+    parche = Patch()
+    traza = parche["data"][0]
+    traza["x"].extend(horas(cols)[-nuevos:])
+    traza["y"].extend(cols["personas"][-nuevos:])
+    sobran = min(PUNTOS_TENDENCIA, version_cliente) + nuevos - PUNTOS_TENDENCIA
+    for _ in range(max(0, sobran)):
+        del traza["x"][0]
+        del traza["y"][0]
+    return parche
+
+# Una página de "Últimos Movimientos" (nucleo.leer_pagina), la más nueva arriba
+def filas_tabla(cols):
+    filas = []
+    for ts, personas, aforo, estado in zip(*(cols[k] for k in ("ts", "personas", "aforo", "estado"))):
+        porc = (personas / aforo) * 100 if aforo > 0 else 0
+        filas.append({"hora": datetime.fromtimestamp(ts).strftime("%d/%m %H:%M:%S"), "evento": nucleo.ESTADOS_POR_CODIGO[estado], "personas": personas, "ocupacion": f"{porc:.1f}%"})
+    return filas[::-1]
+
+def filas_puertas(puertas):
+    return [dict(p, contador="--" if p["contador"] is None else p["contador"], conexion="🟢" if p["conectada"] else "🔴") for p in puertas]
 
 # Callback PRINCIPAL: Actualiza toda la interfaz periódicamente
 @app.callback(
@@ -395,81 +620,105 @@ def save(n, val):
     Output("estado-actual-texto", "style"),
     Output("notificacion-popup", "children"),
     Output("notificacion-popup", "style"),
-    Input("intervalo", "n_intervals")
+    Output("estado-conexion", "children"),
+    Output("tabla-historial", "page_count"),
+    Output("pronostico-titulo", "children"),
+    Output("pronostico-detalle", "children"),
+    Output("figuras-clave", "data"),
+    Output("tabla-puertas", "data"),
+    Input("intervalo", "n_intervals"),
+    Input("push-version", "data"),
+    State("figuras-clave", "data"),
+    Input("tabla-historial", "page_current")
 )
-def update(n):
-    global personas_actuales, historial, ultimo_tiempo_cola, ultimo_cambio_ts, mensaje_notificacion, tipo_evento
-    
-    # --- BLOQUE DE SIMULACIÓN ---
-    # Si no hay Arduino, inventamos datos para probar la interfaz
-    if modo_simulado:
-        prev = personas_actuales
-        # Hacemos que sea más probable que NO pase nada (más ceros) para estabilizar
-        cambio = random.choice([-1, 0, 0, 0, 0, 0, 0, 0, 1]) 
-        personas_actuales = max(0, min(aforo_maximo + 5, personas_actuales + cambio))
-        
-        # Simulamos eventos de notificación
-        if personas_actuales != prev:
-            ultimo_cambio_ts = time.time()
-            if personas_actuales > prev:
-                mensaje_notificacion = "🚶 ENTRADA SIMULADA"
-                tipo_evento = "entrada"
-                ultimo_tiempo_cola = 0
-            else:
-                mensaje_notificacion = "🔙 SALIDA SIMULADA"
-                tipo_evento = "salida"
-        elif personas_actuales == prev and random.random() > 0.98:
-            # A veces simulamos que hay cola
-            ultimo_tiempo_cola = time.time()
+@metricas.medir("callback")
+@metricas.perfilar
+def update(n, version_push=None, claves=None, pagina=0):
+    # Aquí solo LEEMOS el estado: los datos los mueve el hilo de ingesta
+    # (Arduino real o simulado) y el historial lo anota nucleo.publicar_estado().
+    # Una sola foto para todo el callback: la cuenta, el estado y el pop-up
+    # siempre son del mismo momento
+    claves = claves or {}
+    foto = nucleo.foto_actual()
+    personas_actuales = foto.personas
+    aforo_maximo = foto.aforo
 
     # --- CÁLCULOS VISUALES ---
     porc = (personas_actuales / aforo_maximo) * 100 if aforo_maximo > 0 else 0
-    
-    # Determinar estado (Verde, Amarillo, Rojo)
-    estado_txt, estado_col = "🟢 NORMAL", colors["verde"]
-    if personas_actuales >= aforo_maximo: 
-        estado_txt, estado_col = "⛔ LLENO", colors["alerta"]
-    elif (time.time() - ultimo_tiempo_cola) < COLA_TIMEOUT: 
-        estado_txt, estado_col = "⚠️ COLA DETECTADA", colors["aviso"]
-
-    # Guardar historial cada cierto tiempo (no cada tick del reloj para no saturar)
-    if n % 4 == 0:
-        historial.append({"hora": datetime.now().strftime("%H:%M:%S"), "evento": estado_txt, "personas": personas_actuales, "ocupacion": f"{porc:.1f}%"})
-        # Mantenemos solo los últimos 100 registros
-        if len(historial) > 100: historial = historial[-100:]
+    estado_txt = foto.estado
+    estado_col = COLORES_ESTADO[estado_txt]
+
+    # Si la foto es la misma que ya tiene esta pestaña, los textos no cambian
+    if claves.get("foto") == foto.version:
+        textos = (no_update,) * 5
+    else:
+        textos = (personas_actuales, f"{porc:.1f}%", {"color": estado_col}, estado_txt, {"color": estado_col})
+
+    # Medidor: si esta pestaña ya lo tiene igual, no mandamos nada; si lo
+    # tiene con otro valor, solo el parche
+    clave_medidor = [personas_actuales, aforo_maximo, estado_col]
+    if claves.get("medidor") == clave_medidor:
+        gauge = no_update
+    elif claves.get("medidor"):
+        gauge = parche_medidor(claves["medidor"], personas_actuales, aforo_maximo, estado_col)
+    else:
+        gauge = figura_medidor(personas_actuales, aforo_maximo, estado_col)
+
+    # Tendencia: solo si hay registros nuevos desde la última vez
+    version_hist = nucleo.historial.version
+    if claves.get("hist") == version_hist:
+        line = no_update
+    else:
+        cols, version_hist = nucleo.leer_historial(PUNTOS_TENDENCIA)
+        line = parche_tendencia(claves.get("hist"), cols, version_hist)
+        if line is None:
+            line = figura_tendencia(cols, version_hist)
+
+    # Tabla: la página que mira esta pestaña, si cambió la página o hay registros nuevos
+    clave_tabla = [version_hist, pagina or 0]
+    if claves.get("tabla") == clave_tabla:
+        tabla = paginas = no_update
+    else:
+        cols_tabla, total = nucleo.leer_pagina(pagina or 0, FILAS_TABLA)
+        tabla = filas_tabla(cols_tabla)
+        paginas = max(1, -(-total // FILAS_TABLA))
+
+    # Por puerta: solo si alguna cambió
+    cambios_puertas = nucleo.cambios_puertas
+    if claves.get("puertas") == cambios_puertas:
+        puertas = no_update
+    else:
+        puertas = filas_puertas(nucleo.resumen_puertas())
 
-    # Configurar Gráfica de Medidor (Gauge)
-    gauge = go.Figure(go.Indicator(
-        mode="gauge+number", 
-        value=porc, 
-        number={'suffix': "%"}, # <--- AQUÍ ESTÁ EL CAMBIO
-        gauge={
-            "axis": {"range": [0, 100]}, 
-            "bar": {"color": estado_col}, 
-            "steps": [{"range": [0, 100], "color": "#1E293B"}]
+    # --- CONTROL DE NOTIFICACIÓN POP-UP ---
+    # Mostrar solo por DURACION_POPUP segundos después del evento
+    visible = time.time() - foto.ts_cambio < DURACION_POPUP
+    clave_popup = [foto.ts_cambio, visible]
+    if claves.get("popup") == clave_popup:
+        mensaje = estilo_notif = no_update
+    else:
+        mensaje = foto.mensaje
+        estilo_notif = {
+            "display": "block" if visible else "none",
+            "backgroundColor": colors["verde"] if foto.tipo_evento == "entrada" else colors["alerta"],
+            "color": "white"
         }
-    ))
-    gauge.update_layout(paper_bgcolor=colors["tarjeta"], font={"color": colors["texto"]}, margin=dict(t=30, b=20, l=30, r=30), height=250)
+        if visible:
+            estilo_notif["opacity"] = "1"
 
-    # Configurar Gráfica de Línea (Tiempo)
-    line = go.Figure()
-    line.add_trace(go.Scatter(x=[h["hora"] for h in historial], y=[h["personas"] for h in historial], line=dict(color=colors["acento"], width=3)))
-    line.update_layout(paper_bgcolor=colors["tarjeta"], plot_bgcolor=colors["tarjeta"], font={"color": colors["texto"]}, margin=dict(t=30, b=40, l=40, r=20), title="Tendencia", height=250)
+    # Simulado / conectado / reconectando: cambia cuando aparece o se va un Arduino
+    conexion = nucleo.estado_conexion()
+    modo = no_update if claves.get("modo") == conexion else texto_modo(conexion)
 
-    # --- CONTROL DE NOTIFICACIÓN POP-UP ---
-    delta_tiempo = time.time() - ultimo_cambio_ts
-    estilo_notif = {
-        "display": "none", 
-        "backgroundColor": colors["verde"] if tipo_evento == "entrada" else colors["alerta"],
-        "color": "white"
-    }
-    # Mostrar solo por 2 segundos después del evento
-    if delta_tiempo < 2.0:
-        estilo_notif["display"] = "block"
-        estilo_notif["opacity"] = "1"
+    # Pronóstico: el dict mismo hace de clave (es chiquito y ya viene redondeado)
+    pronostico = nucleo.pronostico_vigente(foto)
+    if claves.get("pronostico") == pronostico:
+        pron_titulo = pron_detalle = no_update
+    else:
+        pron_titulo, pron_detalle = textos_pronostico(pronostico)
 
-    # Retornamos toooodos los valores a la interfaz
-    return personas_actuales, f"{porc:.1f}%", {"color": estado_col}, gauge, line, historial[-15:][::-1], estado_txt, {"color": estado_col}, mensaje_notificacion, estilo_notif
+    claves = {"foto": foto.version, "medidor": clave_medidor, "hist": version_hist, "puertas": cambios_puertas, "popup": clave_popup, "modo": conexion, "tabla": clave_tabla, "pronostico": pronostico}
+    personas_txt, porc_txt, porc_estilo, estado_txt, estado_estilo = textos
 
-if __name__ == "__main__":
-    app.run(debug=True, port=8050, use_reloader=False)
\ No newline at end of file
+    # Retornamos toooodos los valores a la interfaz
+    return personas_txt, porc_txt, porc_estilo, gauge, line, tabla, estado_txt, estado_estilo, mensaje, estilo_notif, modo, paginas, pron_titulo, pron_detalle, claves, puertas
@@ -1,3 +1,10 @@
+// Protocolo con la PC:
+//   0 = texto ("ENTRADA AFORO: 7"), 9600 baudios (el de siempre)
+//   1 = tramas binarias de 10 bytes, 115200 baudios, cada una con número de
+//       secuencia, tipo, contador, millis() y CRC-8, así la PC se da cuenta
+//       si se perdió algo (ver protocolo.py). La app reconoce sola cualquiera de los dos.
+#define PROTOCOLO_BINARIO 0
+
 #define TRIG1 2
 #define ECHO1 3
 #define TRIG2 4
@@ -19,6 +26,7 @@ const unsigned long ENTRY_TIMEOUT = 3000;   // ms para completar secuencia 1->2
 const unsigned long EXIT_TIMEOUT  = 3000;   // ms para completar secuencia 2->1
 const unsigned long COOLDOWN_AFTER_EVENT = 800; // ms para evitar COLA justo después de evento
 const unsigned long COLA_PRINT_INTERVAL = 800;  // ms entre impresiones de COLA
+const unsigned long LATIDO_INTERVAL = 1000;     // ms entre latidos (solo tramas binarias)
 
 // Estados / tiempos
 bool lastS1 = false;
@@ -28,6 +36,49 @@ int state = 0; // 0 = idle, 1 = saw S1 (posible entrada), 2 = saw S2 (posible sa
 unsigned long stateStartTime = 0;
 unsigned long lastEventTime = 0;
 unsigned long lastColaPrint = 0;
+unsigned long lastLatido = 0;
+
+// -------- ENVÍO A LA PC --------
+// Tipos de trama (los mismos números que TIPOS_TRAMA en protocolo.py)
+const byte HOLA = 0, ENTRADA = 1, SALIDA = 2, COLA = 3, LATIDO = 4;
+unsigned int secuencia = 0;
+
+// CRC-8, polinomio 0x07 (sin tabla: son 9 bytes cada tanto)
+byte crc8(const byte *datos, byte largo) {
+  byte crc = 0;
+  for (byte i = 0; i < largo; i++) {
+    crc ^= datos[i];
+    for (byte b = 0; b < 8; b++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// A5 | secuencia (2) | tipo | contador | millis (4) | CRC, en little endian
+void enviarTrama(byte tipo) {
+  unsigned long ms = millis();
+  byte trama[10] = {
+    0xA5, (byte)secuencia, (byte)(secuencia >> 8), tipo, (byte)aforo,
+    (byte)ms, (byte)(ms >> 8), (byte)(ms >> 16), (byte)(ms >> 24), 0
+  };
+  trama[9] = crc8(trama, 9);
+  Serial.write(trama, 10);
+  secuencia++;
+}
+
+void enviar(byte tipo) {
+#if PROTOCOLO_BINARIO
+  enviarTrama(tipo);
+#else
+  if (tipo == COLA) {
+    Serial.println("COLA");
+  } else {
+    Serial.print(tipo == ENTRADA ? "ENTRADA AFORO: " : "SALIDA AFORO: ");
+    Serial.println(aforo);
+  }
+#endif
+}
 
 // -------- LECTURA CON RANGO Y FILTRO --------
 bool sensorActivo(int trig, int echo) {
@@ -58,7 +109,12 @@ void setup() {
   pinMode(LED_VERDE, OUTPUT);
   pinMode(LED_ROJO, OUTPUT);
 
+#if PROTOCOLO_BINARIO
+  Serial.begin(115200);
+  enviarTrama(HOLA); // Avisa que arrancó: la PC reinicia su cuenta de esta puerta
+#else
   Serial.begin(9600);
+#endif
 }
 
 void loop() {
@@ -84,8 +140,7 @@ void loop() {
     if (state == 2) {
       // Confirmar salida
       if (aforo > 0) aforo--;
-      Serial.print("SALIDA AFORO: ");
-      Serial.println(aforo);
+      enviar(SALIDA);
       lastEventTime = now;
       state = 0;
       stateStartTime = 0;
@@ -107,8 +162,7 @@ void loop() {
     if (state == 1) {
       // Confirmar entrada
       aforo = min(aforo + 1, AFORO_MAXIMO);
-      Serial.print("ENTRADA AFORO: ");
-      Serial.println(aforo);
+      enviar(ENTRADA);
       lastEventTime = now;
       state = 0;
       stateStartTime = 0;
@@ -131,7 +185,7 @@ void loop() {
     } else {
       // imprimir COLA cada COLA_PRINT_INTERVAL ms (pero evitar imprimir justo después de un evento)
       if ((now - lastColaPrint) >= COLA_PRINT_INTERVAL && (now - lastEventTime) > COOLDOWN_AFTER_EVENT) {
-        Serial.println("COLA");
+        enviar(COLA);
         lastColaPrint = now;
       }
     }
@@ -155,6 +209,14 @@ void loop() {
     digitalWrite(LED_VERDE, HIGH);
   }
 
+#if PROTOCOLO_BINARIO
+  // --------- Latido: la PC sabe que seguimos vivos y corrige la cuenta si perdió tramas ----------
+  if (now - lastLatido >= LATIDO_INTERVAL) {
+    enviarTrama(LATIDO);
+    lastLatido = now;
+  }
+#endif
+
   // pequeña espera para evitar saturar el loop
   delay(25);
 }
@@ -0,0 +1,80 @@
+# arranque.py
+# ==========================================
+# ARRANQUE RÁPIDO (python app.py)
+# ==========================================
+# Importar Dash y armar el layout tarda (en los kioscos, varios segundos), y
+# antes encima se buscaba y se abría el Arduino antes de levantar la web.
+# Ahora `python app.py` hace esto:
+#   1. levanta YA un Flask liviano con la vista ligera (/ligero), la API,
+#      /metrics y Socket.IO: la cuenta se ve desde el primer segundo
+#   2. nucleo.iniciar() busca y abre los Arduinos en otro hilo (mientras
+#      tanto se simula, y si aparece uno se pasa solo a modo real)
+#   3. en otro hilo importa app.py (Dash). Mientras carga, "/" contesta
+#      "cargando" (503) y se refresca sola; cuando termina, todo lo que no
+#      es de la parte liviana lo contesta el Flask de Dash.
+# Con gunicorn (app:server) esto no se usa: se importa app.py entero como siempre.
+import os
+import threading
+import time
+import traceback
+from flask import Flask
+from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.wrappers import Response
+import nucleo
+import servidor_ligero
+from tiempo_real import socketio
+
+PAGINA_CARGANDO = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><meta http-equiv="refresh" content="1">
+<title>Control de Aforo</title></head>
+<body style="background:#0d1117;color:#f0f6fc;font-family:sans-serif;text-align:center;padding-top:20vh">
+<h2>Cargando el dashboard...</h2>
+<p>Mientras tanto, la cuenta en vivo ya está en <a href="/ligero" style="color:#58a6ff">/ligero</a>.</p>
+</body></html>
+"""
+
+
+# WSGI: lo que conoce el Flask liviano lo contesta él; el resto, Dash (o
+# "cargando" si todavía no está)
+class Despachador:
+    def __init__(self, server):
+        self.liviano = server.wsgi_app
+        self.rutas = server.url_map
+        self.tablero = None  # El Flask de Dash, cuando termine de cargar
+
+    def __call__(self, environ, start_response):
+        try:
+            self.rutas.bind_to_environ(environ).match()
+        except NotFound:
+            if self.tablero is not None:
+                return self.tablero(environ, start_response)
+            cargando = Response(PAGINA_CARGANDO, status=503, mimetype="text/html", headers={"Retry-After": "1"})
+            return cargando(environ, start_response)
+        except HTTPException:
+            pass # Es de la parte liviana pero con otro método, una redirección...: que conteste Flask
+        return self.liviano(environ, start_response)
+
+    def cargar(self):
+        t0 = time.perf_counter()
+        try:
+            import app # El dashboard de Dash (lo pesado)
+        except Exception:
+            traceback.print_exc()
+            return
+        self.tablero = app.server
+        print(f"Dashboard listo en {time.perf_counter() - t0:.1f} s "
+              f"(modo de actualización: {app.MODO_ACTUALIZACION.upper()})")
+
+
+def main():
+    server = Flask(__name__)
+    servidor_ligero.registrar(server, ruta="/ligero")
+    despachador = Despachador(server)
+    server.wsgi_app = despachador
+    socketio.init_app(server) # app.py ve que ya hay uno y no arma otro
+    nucleo.iniciar()
+    threading.Thread(target=despachador.cargar, daemon=True).start()
+
+    puerto_web = int(os.environ.get("AFORO_PUERTO_WEB", "8050"))
+    # socketio.run levanta el servidor de Flask pero con WebSocket
+    socketio.run(server, debug=True, port=puerto_web, use_reloader=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,208 @@
+# benchmarks/bench_alertas.py
+# El motor de alertas (alertas.py) en tres cosas:
+#   1. cuánto le cuesta cada evento a la ingesta con 3 ... 3000 reglas y
+#      1 ... 10.000 puertas (tiene que dar más o menos lo mismo)
+#   2. cuántos avisos salen con la ocupación bailando justo en el límite:
+#      sin deduplicar (uno por evento), sin histéresis y con histéresis
+#   3. que los avisos lleguen de verdad a un webhook, un servidor SMTP de
+#      mentira y un archivo de log (todo local), cuánto tardan, y que un
+#      webhook lento no frene a la ingesta
+#
+# Uso: python benchmarks/bench_alertas.py [eventos]
+import email
+import email.policy
+import json
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from alertas import Despachador, DestinoLog, DestinoSmtp, DestinoWebhook, Motor, armar_regla  # noqa: E402
+
+AFORO = 100
+
+
+def reglas_mezcladas(cuantas, azar):
+    reglas = []
+    for i in range(cuantas):
+        tipo = ("ocupacion", "cola", "silencio")[i % 3]
+        if tipo == "ocupacion":
+            datos = {"porcentaje": azar.uniform(50, 150), "segundos": azar.uniform(0, 60)}
+        elif tipo == "cola":
+            datos = {"segundos": azar.uniform(5, 600)}
+        else:
+            datos = {"minutos": azar.uniform(1, 60)}
+        reglas.append(armar_regla({"nombre": f"r{i}", "tipo": tipo, **datos}))
+    return reglas
+
+
+# Eventos de puertas al azar: un evento cada 50 ms, o más seguido si son
+# muchas (cada puerta habla cada ~10 s). La gente va y viene, a veces hay COLA
+def trafico(eventos, puertas, azar):
+    lista = []
+    personas = 0
+    paso = min(0.05, 10 / puertas)
+    for i in range(eventos):
+        if azar.random() < 0.02:
+            personas = -1 # COLA
+        else:
+            personas = max(0, min(160, abs(personas) + (1 if azar.random() < 0.5 else -1)))
+        lista.append((i * paso, f"p{azar.randrange(puertas)}", personas))
+    return lista
+
+
+def medir_costo(eventos):
+    azar = random.Random(1)
+    print(f"{'reglas':>7} {'puertas':>8} {'µs/evento':>10} {'alertas':>8}")
+    for cuantas in (3, 30, 300, 3000):
+        reglas = reglas_mezcladas(cuantas, azar)
+        for puertas in (1, 100, 10000):
+            lista = trafico(eventos, puertas, random.Random(2))
+            avisos = []
+            motor = Motor(reglas, avisos.append)
+            for p in range(puertas):
+                motor.actividad(0.0, f"p{p}")
+            t0 = time.perf_counter()
+            for ts, puerta, personas in lista:
+                motor.actividad(ts, puerta)
+                if personas < 0:
+                    motor.cola(ts)
+                else:
+                    motor.ocupacion(ts, personas, AFORO)
+                motor.revisar(ts) # Lo peor: la ingesta revisa después de cada evento
+            costo = (time.perf_counter() - t0) / eventos * 1e6
+            print(f"{cuantas:>7} {puertas:>8} {costo:>10.2f} {len(avisos):>8}")
+
+
+# Un día con la gente rondando el aforo: una caminata que vuelve hacia 100
+def medir_histeresis():
+    azar = random.Random(5)
+    lista = []
+    personas = AFORO - 10
+    ts = 0.0
+    while ts < 86400:
+        ts += azar.expovariate(1 / 6)
+        paso = 1 if azar.random() < 0.5 + (AFORO - personas) * 0.02 else -1
+        personas = max(0, personas + paso)
+        lista.append((ts, personas))
+
+    arriba = sum(1 for _, p in lista if p >= AFORO)
+    print(f"\n{len(lista):,} eventos en un día, {arriba:,} con la ocupación en 100% o más")
+    print(f"{'sin deduplicar (un aviso por evento lleno)':<46} {arriba:>6} avisos")
+    for nombre, datos in (("sin histéresis ni espera", {"histeresis": 0, "segundos": 0}),
+                          ("sin histéresis, 10 s de espera", {"histeresis": 0, "segundos": 10}),
+                          ("histéresis 5% y 10 s de espera (por defecto)", {"segundos": 10})):
+        avisos = []
+        motor = Motor([armar_regla({"nombre": "lleno", "tipo": "ocupacion", "porcentaje": 100, **datos})], avisos.append)
+        for ts, p in lista:
+            motor.ocupacion(ts, p, AFORO)
+            motor.revisar(ts)
+        disparadas = sum(1 for a in avisos if a["estado"] == "disparada")
+        print(f"{nombre:<46} {disparadas:>6} avisos")
+
+
+# --- Los destinos de mentira ---
+
+recibidos = []  # (destino, cuándo llegó, alerta)
+
+
+class Webhook(BaseHTTPRequestHandler):
+    demora = 0.0
+
+    def do_POST(self):
+        datos = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.demora)
+        recibidos.append(("webhook", time.perf_counter(), json.loads(datos)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+# Lo justo de SMTP para que smtplib mande un correo
+class Smtp(socketserver.StreamRequestHandler):
+    def do(self, texto):
+        self.wfile.write(texto.encode() + b"\r\n")
+
+    def handle(self):
+        self.do("220 local ESMTP")
+        while True:
+            linea = self.rfile.readline().decode().strip()
+            comando = linea[:4].upper()
+            if not linea or comando == "QUIT":
+                self.do("221 chau")
+                return
+            if comando == "EHLO":
+                self.do("250 local")
+            elif comando == "DATA":
+                self.do("354 mandá")
+                cuerpo = []
+                while (linea := self.rfile.readline()) not in (b".\r\n", b""):
+                    cuerpo.append(linea.decode())
+                recibidos.append(("smtp", time.perf_counter(), "".join(cuerpo)))
+                self.do("250 ok")
+            else:
+                self.do("250 ok")
+
+
+def servir(servidor):
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor.server_address[1]
+
+
+def esperar(condicion, limite=10):
+    t0 = time.perf_counter()
+    while not condicion() and time.perf_counter() - t0 < limite:
+        time.sleep(0.001)
+
+
+def medir_destinos():
+    puerto_web = servir(ThreadingHTTPServer(("127.0.0.1", 0), Webhook))
+    puerto_smtp = servir(socketserver.ThreadingTCPServer(("127.0.0.1", 0), Smtp))
+    archivo = os.path.join(tempfile.mkdtemp(), "alertas.log")
+    despachador = Despachador([
+        DestinoLog(archivo),
+        DestinoWebhook(f"http://127.0.0.1:{puerto_web}/alerta"),
+        DestinoSmtp(["encargado@local"], servidor="127.0.0.1", puerto=puerto_smtp),
+    ])
+    motor = Motor([armar_regla({"nombre": "lleno", "tipo": "ocupacion", "porcentaje": 100, "segundos": 10})], despachador)
+
+    print()
+    for demora in (0.0, 2.0):
+        Webhook.demora = demora
+        recibidos.clear()
+        ahora = time.time()
+        t0 = time.perf_counter()
+        motor.ocupacion(ahora, AFORO, AFORO)
+        motor.revisar(ahora + 10) # Se dispara
+        motor.ocupacion(ahora + 20, AFORO - 10, AFORO) # Se resuelve
+        ingesta = (time.perf_counter() - t0) * 1000
+        esperar(lambda: len(recibidos) >= 4)
+        llegadas = {}
+        for destino, cuando, _ in recibidos:
+            llegadas.setdefault(destino, []).append((cuando - t0) * 1000)
+        print(f"webhook que tarda {demora:g} s: la ingesta tardó {ingesta:.2f} ms en disparar y resolver; llegaron "
+              + ", ".join(f"{d} {len(ms)} ({max(ms):.0f} ms)" for d, ms in sorted(llegadas.items())))
+
+    despachador.cerrar()
+    with open(archivo, encoding="utf-8") as f:
+        lineas = [json.loads(linea) for linea in f]
+    print(f"log: {len(lineas)} alertas en {archivo} ({', '.join(a['estado'] for a in lineas)})")
+    correo = next((c for d, _, c in recibidos if d == "smtp"), "")
+    print(f"el primer correo -> {email.message_from_string(correo, policy=email.policy.default)['Subject']}")
+    print(f"enviadas {dict(despachador.enviadas)}  fallidas {dict(despachador.fallidas)}")
+
+
+if __name__ == "__main__":
+    eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    medir_costo(eventos)
+    medir_histeresis()
+    medir_destinos()
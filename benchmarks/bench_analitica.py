@@ -0,0 +1,71 @@
+# benchmarks/bench_analitica.py
+# Un año de eventos en la bitácora: cuánto tarda rearmar los resúmenes con
+# NumPy, cuánto cuesta mantenerlos evento a evento, y cuánto tarda consultar
+# el año completo por día / semana y un mes por hora.
+#
+# Uso: python benchmarks/bench_analitica.py [eventos_en_el_año]
+import os
+import random
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import analitica  # noqa: E402
+from bitacora import Bitacora, abrir  # noqa: E402
+
+AÑO = 365 * 86400
+
+
+def generar(total, inicio, paso=None):
+    random.seed(7)
+    paso = paso or AÑO / total
+    personas = 0
+    for i in range(total):
+        tipo = random.choice(("ENTRADA", "SALIDA", "COLA"))
+        if tipo == "ENTRADA":
+            personas = min(personas + 1, 60)
+        elif tipo == "SALIDA":
+            personas = max(personas - 1, 0)
+        yield (inicio + i * paso, tipo, personas, 50, "")
+
+
+def medir_consulta(conexion, nombre, nivel, desde, hasta, repeticiones=20):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        usado, filas = analitica.consultar(conexion, nivel, desde, hasta)
+    ms = (time.perf_counter() - t0) / repeticiones * 1000
+    print(f"consulta {nombre:<16} nivel={usado:<5} {len(filas):>6} filas  {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    ruta = os.path.join(tempfile.mkdtemp(), "bench_analitica.db")
+    Bitacora(ruta).cerrar()  # Crea las tablas de eventos
+    inicio = time.time() - AÑO
+
+    conexion = abrir(ruta)
+    with conexion:
+        conexion.executemany("INSERT INTO eventos (ts, tipo, personas, aforo, linea) VALUES (?, ?, ?, ?, ?)", generar(total, inicio))
+
+    t0 = time.perf_counter()
+    analitica.reconstruir(conexion)
+    print(f"reconstruir() con NumPy: {total:,} eventos en {time.perf_counter() - t0:.2f} s")
+
+    # Incremental: lo que hace el escritor de la bitácora en cada lote
+    resumenes = analitica.Resumenes()
+    lote = list(generar(50_000, time.time(), paso=2.0))  # Una puerta movida: un evento cada 2 s
+    t0 = time.perf_counter()
+    with conexion:
+        for i in range(0, len(lote), 100):
+            resumenes.aplicar(conexion, lote[i:i + 100])
+    print(f"incremental: {(time.perf_counter() - t0) / len(lote) * 1e6:.1f} µs por evento (lotes de 100)")
+
+    ahora = time.time()
+    medir_consulta(conexion, "año por día", "1d", ahora - AÑO, ahora)
+    medir_consulta(conexion, "año por semana", "1sem", ahora - AÑO, ahora)
+    medir_consulta(conexion, "mes por hora", "1h", ahora - 30 * 86400, ahora)
+    medir_consulta(conexion, "año por hora", "1h", ahora - AÑO, ahora)
+    conexion.close()
@@ -0,0 +1,95 @@
+# benchmarks/bench_arranque.py
+# Cuánto tarda `python app.py` en contestar el primer 200, desde que se
+# lanza el proceso. Para parecerse a los kioscos, la búsqueda de puertos
+# (serial.tools.list_ports.comports) se hace lenta a propósito: `demora`
+# segundos, como un USB que tarda en enumerar.
+# Se mide cada cosa por separado:
+#   /api/estado -> la cuenta en JSON
+#   /ligero     -> la vista ligera
+#   /           -> la página de Dash (mientras carga, contesta 503)
+#   callback    -> el primer update() de Dash con figuras
+#
+# Uso: python benchmarks/bench_arranque.py [demora_s] [repeticiones]
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_procesos import CUERPO_DASH  # noqa: E402
+
+# Lo que corre el proceso hijo: app.py tal cual, pero con comports() lento
+LANZADOR = """
+import runpy, sys, time
+import serial.tools.list_ports as lista
+original = lista.comports
+def lento(*args, **kwargs):
+    time.sleep({demora})
+    return original(*args, **kwargs)
+lista.comports = lento
+sys.argv = ["app.py"]
+runpy.run_path("app.py", run_name="__main__")
+"""
+
+PRUEBAS = {
+    "/api/estado": ("GET", "/api/estado", None),
+    "/ligero": ("GET", "/ligero", None),
+    "/": ("GET", "/", None),
+    "callback": ("POST", "/_dash-update-component", CUERPO_DASH),
+}
+
+
+def primer_200(puerto, metodo, ruta, cuerpo, t0, limite=60):
+    cabeceras = {"Content-Type": "application/json"} if cuerpo else {}
+    while time.perf_counter() - t0 < limite:
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+            conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            conexion.close()
+            if respuesta.status == 200:
+                return time.perf_counter() - t0
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def una_vez(demora, puerto):
+    entorno = dict(os.environ, AFORO_PUERTO_WEB=str(puerto))
+    t0 = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, "-c", LANZADOR.format(demora=demora)], cwd=RAIZ, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    tiempos = {}
+
+    def medir(nombre, prueba):
+        tiempos[nombre] = primer_200(puerto, *prueba, t0)
+
+    hilos = [threading.Thread(target=medir, args=item) for item in PRUEBAS.items()]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    proceso.terminate()
+    proceso.wait()
+    return tiempos
+
+
+if __name__ == "__main__":
+    demora = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    puerto = int(os.environ.get("AFORO_PUERTO_WEB", "8050"))
+
+    print(f"comports() tarda {demora:g} s, {repeticiones} arranques (segundos hasta el primer 200, mediana)")
+    corridas = [una_vez(demora, puerto) for _ in range(repeticiones)]
+    for nombre in PRUEBAS:
+        valores = sorted(c[nombre] for c in corridas if c[nombre] is not None)
+        if len(valores) < repeticiones:
+            print(f"{nombre:<12} no contestó 200 en {len(corridas) - len(valores)} de {repeticiones}")
+            continue
+        print(f"{nombre:<12} {valores[len(valores) // 2]:>6.2f} s  (mín {valores[0]:.2f}, máx {valores[-1]:.2f})")
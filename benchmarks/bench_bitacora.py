@@ -0,0 +1,67 @@
+# benchmarks/bench_bitacora.py
+# Cuánto le cuesta al hilo del Arduino anotar un evento en la bitácora y
+# cuánto tarda el arranque en recuperar el estado + historial reciente
+# cuando la bitácora ya tiene meses de eventos.
+# (2 millones ~ 20 mil eventos al día durante 100 días)
+#
+# Uso: python benchmarks/bench_bitacora.py [eventos_previos]
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bitacora import Bitacora, abrir  # noqa: E402
+
+HISTORIAL = 10000
+REGISTROS_VIVO = 20000
+
+
+def precargar(ruta, total):
+    # Escribimos directo en la base (mucho más rápido que pasar por la cola)
+    conexion = abrir(ruta)
+    inicio = time.time() - total * 0.5
+    lote = 100_000
+    with conexion:
+        for base in range(0, total, lote):
+            filas = []
+            for i in range(base, min(total, base + lote)):
+                personas = i % 50
+                filas.append((inicio + i * 0.5, "ENTRADA" if i % 2 else "SALIDA", personas, 50, f"ENTRADA AFORO: {personas}"))
+            conexion.executemany("INSERT INTO eventos (ts, tipo, personas, aforo, linea) VALUES (?, ?, ?, ?, ?)", filas)
+        ultimo = filas[-1]
+        conexion.execute(
+            "INSERT OR REPLACE INTO estado (id, ultimo_id, ts, personas, aforo) VALUES (1, ?, ?, ?, ?)",
+            (total, ultimo[0], ultimo[2], ultimo[3]),
+        )
+    conexion.close()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    ruta = os.path.join(tempfile.mkdtemp(), "bench_aforo.db")
+    bitacora = Bitacora(ruta)
+
+    t0 = time.perf_counter()
+    precargar(ruta, total)
+    print(f"Precarga de {total:,} eventos: {time.perf_counter() - t0:.1f} s "
+          f"({os.path.getsize(ruta) / 1024 / 1024:.0f} MB)")
+
+    # Costo para el hilo del Arduino: solo encolar
+    t0 = time.perf_counter()
+    for i in range(REGISTROS_VIVO):
+        bitacora.registrar("ENTRADA", i % 50, 50, f"ENTRADA AFORO: {i % 50}")
+    t_registrar = (time.perf_counter() - t0) / REGISTROS_VIVO * 1e6
+    t0 = time.perf_counter()
+    bitacora.cerrar()
+    print(f"registrar(): {t_registrar:.2f} µs por evento en el hilo lector; "
+          f"el escritor vació {REGISTROS_VIVO:,} eventos en {time.perf_counter() - t0:.2f} s")
+
+    # Arranque: foto + últimos HISTORIAL eventos
+    for intento in range(3):
+        t0 = time.perf_counter()
+        datos = Bitacora(ruta).restaurar(HISTORIAL)
+        print(f"restaurar() #{intento + 1}: {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"({datos['personas']} personas, {len(datos['eventos'])} eventos)")
@@ -0,0 +1,97 @@
+# benchmarks/bench_exportar.py
+# Exportar la bitácora (exportar.py): filas por segundo y memoria máxima de
+# cada formato, contra leer el rango entero de una (fetchall + csv). La
+# memoria de Python se mide con tracemalloc; la de Arrow (Parquet), con el
+# pool de pyarrow. También mide cuánto cuesta una página de la tabla de
+# "Últimos Movimientos" al principio, al medio y al final de un historial lleno.
+#
+# Uso: python benchmarks/bench_exportar.py [eventos] [capacidad_historial]
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import exportar  # noqa: E402
+from bench_analitica import AÑO, generar  # noqa: E402
+from bitacora import Bitacora, abrir  # noqa: E402
+
+
+# Lo de antes de exportar.py: todo el rango a memoria y recién ahí el CSV
+def todo_junto(ruta, desde, hasta):
+    conexion = abrir(ruta)
+    filas = conexion.execute("SELECT id, ts, tipo, personas, aforo, linea FROM eventos WHERE ts >= ? AND ts < ? ORDER BY ts",
+                             (desde, hasta)).fetchall()
+    conexion.close()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(exportar.con_fecha(filas))
+    return [buffer.getvalue().encode()]
+
+
+def partes(ruta, formato, desde, hasta):
+    if formato == "todo junto":
+        return todo_junto(ruta, desde, hasta)
+    return exportar.exportar(ruta, formato, desde, hasta)[1]
+
+
+# Dos pasadas: una para el tiempo y otra con tracemalloc para la memoria
+# (tracemalloc anota cada reserva y hace todo varias veces más lento)
+def medir(ruta, formato, desde, hasta, eventos):
+    t0 = time.perf_counter()
+    total = sum(len(parte) for parte in partes(ruta, formato, desde, hasta))
+    segundos = time.perf_counter() - t0
+
+    tracemalloc.start()
+    for _ in partes(ruta, formato, desde, hasta):
+        pass
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    extra = ""
+    if formato == "parquet":
+        import pyarrow
+        extra = f"  + Arrow {pyarrow.default_memory_pool().max_memory() / 1e6:.1f} MB"
+    print(f"{formato:<12} {segundos:6.2f} s  {eventos / segundos:>10,.0f} filas/s  {total / 1e6:7.1f} MB  "
+          f"pico {pico / 1e6:6.1f} MB{extra}")
+
+
+def bench_paginas(capacidad):
+    os.environ["AFORO_CAPACIDAD_HISTORIAL"] = str(capacidad)
+    os.environ["AFORO_BITACORA"] = ""
+    import nucleo
+    for i in range(capacidad):
+        nucleo.historial.agregar(i, i % 60, 50, 0)
+    ultima = (capacidad - 1) // 15
+    for pagina in (0, ultima // 2, ultima):
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            nucleo.leer_pagina(pagina, 15)
+        print(f"página {pagina:>7,} de {ultima:,}: {(time.perf_counter() - t0) * 1000:.1f} µs")
+
+
+if __name__ == "__main__":
+    eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    capacidad = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    ruta = os.path.join(tempfile.mkdtemp(), "bench_exportar.db")
+    Bitacora(ruta).cerrar()  # Crea las tablas y el índice
+    inicio = time.time() - AÑO
+    conexion = abrir(ruta)
+    with conexion:
+        conexion.executemany("INSERT INTO eventos (ts, tipo, personas, aforo, linea) VALUES (?, ?, ?, ?, ?)",
+                             ((ts, tipo, p, a, f"[puerta1] {tipo}") for ts, tipo, p, a, _ in generar(eventos, inicio)))
+    conexion.close()
+    desde, hasta = inicio, time.time()
+
+    print(f"{eventos:,} eventos (un año), lotes de {exportar.LOTE:,}")
+    for formato in ("todo junto", "csv", "ndjson", "parquet"):
+        try:
+            medir(ruta, formato, desde, hasta, eventos)
+        except ImportError:
+            print(f"{formato:<12} (falta pyarrow)")
+
+    print(f"\nTabla paginada sobre un historial de {capacidad:,} registros (1000 lecturas por página):")
+    bench_paginas(capacidad)
@@ -0,0 +1,76 @@
+# benchmarks/bench_figuras.py
+# Latencia del callback principal (update + serializar como Dash) ANTES y
+# DESPUÉS del cache de figuras. "Antes" arma el medidor y la tendencia desde
+# cero en cada tick, igual que el update() original; "después" es app.update
+# con el dcc.Store de la pestaña, que devuelve no_update / Patch / cache.
+# Cada EVENTO_CADA ticks entra una línea del Arduino (cambia el estado).
+#
+# Uso: python benchmarks/bench_figuras.py [ticks]
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+import plotly.graph_objs as go  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+import app as aforo  # noqa: E402
+import nucleo  # noqa: E402
+
+# Los eventos los mete el benchmark: nada de puerto serial de por medio
+nucleo.pasar_a_simulado()
+
+EVENTO_CADA = 10
+colors = aforo.colors
+
+
+def update_sin_cache():
+    # Copia de lo que hacía update() en cada tick antes del cache
+    porc = nucleo.porcentaje_ocupacion()
+    estado_col = aforo.COLORES_ESTADO[nucleo.calcular_estado()]
+    cols, _ = nucleo.leer_historial(aforo.PUNTOS_TENDENCIA)
+    gauge = go.Figure(go.Indicator(
+        mode="gauge+number", value=porc, number={'suffix': "%"},
+        gauge={"axis": {"range": [0, 100]}, "bar": {"color": estado_col}, "steps": [{"range": [0, 100], "color": "#1E293B"}]}
+    ))
+    gauge.update_layout(paper_bgcolor=colors["tarjeta"], font={"color": colors["texto"]}, margin=dict(t=30, b=20, l=30, r=30), height=250)
+    line = go.Figure()
+    line.add_trace(go.Scatter(x=aforo.horas(cols), y=cols["personas"], line=dict(color=colors["acento"], width=3)))
+    line.update_layout(paper_bgcolor=colors["tarjeta"], plot_bgcolor=colors["tarjeta"], font={"color": colors["texto"]}, margin=dict(t=30, b=40, l=40, r=20), title="Tendencia", height=250)
+    return to_json_plotly((nucleo.foto_actual().personas, gauge, line, aforo.filas_tabla(cols)))
+
+
+def update_con_cache(n, claves):
+    salida = aforo.update(n, None, claves[0])
+    claves[0] = salida[-2]  # figuras-clave (la última salida es la tabla por puerta)
+    return to_json_plotly(salida)
+
+
+def medir(nombre, funcion, ticks):
+    tiempos = []
+    for n in range(ticks):
+        if n % EVENTO_CADA == 0:
+            nucleo.procesar_linea(f"ENTRADA AFORO: {n // EVENTO_CADA % 40}")
+            nucleo.publicar_estado()
+        t0 = time.perf_counter()
+        funcion(n)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    p99 = tiempos[min(len(tiempos) - 1, int(0.99 * len(tiempos)))]
+    print(f"{nombre:<12} p50={statistics.median(tiempos):7.3f} ms   p99={p99:7.3f} ms")
+
+
+if __name__ == "__main__":
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    # Llenamos el historial para que la tendencia tenga sus 100 puntos
+    for i in range(aforo.PUNTOS_TENDENCIA):
+        nucleo.procesar_linea(f"ENTRADA AFORO: {i % 40}")
+        nucleo.publicar_estado()
+
+    claves = [None]
+    medir("sin cache", lambda n: update_sin_cache(), ticks)
+    medir("con cache", lambda n: update_con_cache(n, claves), ticks)
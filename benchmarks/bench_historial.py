@@ -0,0 +1,81 @@
+# benchmarks/bench_historial.py
+# Memoria y tiempo del historial viejo (lista de dicts recortada con
+# historial[-N:] y re-proyectada a listas en cada tick) contra el historial
+# circular por columnas (historial.py), con capacidad de 100, 10k y 1M.
+#   agregar: costo promedio de meter un registro con el historial lleno
+#   leer:    últimos 100 puntos para la tendencia + 15 filas para la tabla
+#
+# Uso: python benchmarks/bench_historial.py
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from historial import HistorialCircular  # noqa: E402
+
+AGREGADOS = 20000
+LECTURAS = 2000
+
+
+class HistorialLista:
+    # Lo que hacía app.py antes: lista de dicts con la hora ya formateada
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.datos = []
+
+    def agregar(self, ts, personas, aforo, estado):
+        self.datos.append({"hora": datetime.fromtimestamp(ts).strftime("%H:%M:%S"), "evento": estado, "personas": personas, "ocupacion": f"{personas / aforo * 100:.1f}%"})
+        if len(self.datos) > self.capacidad:
+            self.datos = self.datos[-self.capacidad:]
+
+    def leer(self):
+        x = [h["hora"] for h in self.datos]
+        y = [h["personas"] for h in self.datos]
+        return x, y, self.datos[-15:][::-1]
+
+
+class HistorialColumnas(HistorialCircular):
+    def leer(self):
+        cols = self.ultimos(100)
+        return cols.ts.tolist(), cols.personas.tolist(), self.ultimos(15).personas.tolist()[::-1]
+
+
+def llenar(h, n):
+    ts = time.time()
+    for i in range(n):
+        h.agregar(ts + i, i % 60, 50, i % 3)
+
+
+def medir(clase, capacidad):
+    tracemalloc.start()
+    h = clase(capacidad)
+    llenar(h, capacidad)
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    agregados = min(AGREGADOS, max(capacidad, 1000))
+    # Con 1M la lista vieja copia un millón de referencias en cada agregado
+    if clase is HistorialLista and capacidad >= 1_000_000:
+        agregados = 50
+    t0 = time.perf_counter()
+    llenar(h, agregados)
+    t_agregar = (time.perf_counter() - t0) / agregados * 1e6
+
+    lecturas = LECTURAS if capacidad < 1_000_000 or clase is HistorialColumnas else 20
+    t0 = time.perf_counter()
+    for _ in range(lecturas):
+        h.leer()
+    t_leer = (time.perf_counter() - t0) / lecturas * 1e6
+
+    print(f"{clase.__name__:<18} {capacidad:>9} {memoria / 1024 / 1024:>10.2f} {t_agregar:>12.2f} {t_leer:>12.2f}")
+
+
+if __name__ == "__main__":
+    print(f"{'historial':<18} {'capacidad':>9} {'MB':>10} {'agregar µs':>12} {'leer µs':>12}")
+    for capacidad in (100, 10_000, 1_000_000):
+        medir(HistorialLista, capacidad)
+        medir(HistorialColumnas, capacidad)
@@ -0,0 +1,59 @@
+# benchmarks/bench_ingesta.py
+# Prueba de aguante de toda la ingesta (pty -> puertas.py -> protocolo.py ->
+# nucleo.py) con el simulador (simulador.py) mandando a un ritmo que ninguna
+# puerta de verdad alcanza. Al final la cuenta de la app tiene que ser
+# igual a la gente que el simulador sabe que quedó adentro.
+#
+# Uso: python benchmarks/bench_ingesta.py [puertas] [lineas_por_segundo] [segundos]
+import os
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import nucleo  # noqa: E402
+from simulador import ArduinoSimulado, PuertoPty, Simulador  # noqa: E402
+
+
+def esperar_cuenta(esperada, limite=15):
+    fin = time.time() + limite
+    while time.time() < fin and nucleo.foto_actual().personas != esperada:
+        time.sleep(0.01)
+    return nucleo.foto_actual().personas == esperada
+
+
+if __name__ == "__main__":
+    n_puertas = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    por_segundo = float(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    segundos = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    puertos = [PuertoPty() for _ in range(n_puertas)]
+    arduinos = [ArduinoSimulado(p) for p in puertos]
+    if not nucleo.conectar([p.nombre for p in puertos]):
+        sys.exit("No se pudieron abrir las pty")
+    threading.Thread(target=nucleo.leer_arduino, daemon=True).start()
+
+    # Cada persona genera una entrada y una salida: la mitad de las líneas son llegadas
+    tasa = por_segundo / 2 / n_puertas * 60
+    simulador = Simulador(arduinos, tasa=tasa, estadia=0.05, prob_cola=0.0, semilla=1)
+    hilo = threading.Thread(target=simulador.correr, args=(segundos,))
+
+    cola_max = 0
+    c0, t0 = time.process_time(), time.perf_counter()
+    hilo.start()
+    while hilo.is_alive():
+        cola_max = max(cola_max, nucleo._eventos.qsize())
+        time.sleep(0.01)
+    ok = esperar_cuenta(simulador.adentro)
+    dt = time.perf_counter() - t0
+    cpu = (time.process_time() - c0) / dt * 100
+    lineas = sum(a.enviadas for a in arduinos)
+
+    print(f"{n_puertas} puertas, {lineas:,} líneas en {dt:.1f} s ({lineas / dt:,.0f}/s pedidas {por_segundo:,.0f}/s)")
+    print(f"CPU {cpu:.0f} % (simulador + app en el mismo proceso), cola máx. {cola_max} lotes, "
+          f"perdidas {sum(p.perdidas for p in puertos)}")
+    print(f"adentro según el simulador {simulador.adentro}, según la app {nucleo.foto_actual().personas} "
+          f"-> {'OK' if ok else 'MAL'}")
+    nucleo.desconectar()
@@ -0,0 +1,108 @@
+# benchmarks/bench_lectura.py
+# Lectura del puerto serial, antes y ahora:
+#   antes -> readline() (de a un byte), decode + "AFORO:" in + split(":") por
+#            línea y un time.sleep(0.02) después de cada vuelta
+#   ahora -> read() de todo lo que haya, líneas armadas en un bytearray y
+#            una sola regex compilada por línea (protocolo.py)
+# Mide cuántas líneas por segundo se interpretan y la latencia de punta a
+# punta: desde que el byte sale del "Arduino" (una pty) hasta que la cuenta
+# cambió en nucleo.py.
+#
+# Uso: python benchmarks/bench_lectura.py [muestras_de_latencia]
+import os
+import statistics
+import sys
+import threading
+import time
+
+import serial
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import nucleo  # noqa: E402
+from protocolo import LectorLineas  # noqa: E402
+
+LINEAS = [b"ENTRADA AFORO: 7\r\n", b"COLA\r\n", b"SALIDA AFORO: 6\r\n", b"ruido\r\n"]
+
+
+# Lo que hacía leer_arduino() con cada línea antes de este cambio
+def interpretar_viejo(crudo):
+    linea = crudo.decode("utf-8", errors="ignore").strip()
+    valor = tipo = None
+    if "AFORO:" in linea:
+        partes = linea.split(":")
+        if len(partes) > 1:
+            try:
+                valor = int(partes[1].strip())
+                tipo = "ENTRADA" if "ENTRADA" in linea else "SALIDA"
+            except ValueError:
+                pass
+    if "COLA" in linea:
+        tipo = "COLA"
+    return tipo, valor
+
+
+def medir_parser(total=400_000):
+    lineas = (LINEAS * (total // len(LINEAS)))[:total]
+    t0 = time.perf_counter()
+    for crudo in lineas:
+        interpretar_viejo(crudo)
+    viejo = total / (time.perf_counter() - t0)
+
+    datos = b"".join(lineas)
+    lector = LectorLineas()
+    t0 = time.perf_counter()
+    for i in range(0, len(datos), 4096):  # Pedazos como los que devuelve read()
+        lector.alimentar(datos[i:i + 4096])
+    nuevo = total / (time.perf_counter() - t0)
+    print(f"parser viejo (str):    {viejo:>12,.0f} líneas/s")
+    print(f"parser nuevo (bytes):  {nuevo:>12,.0f} líneas/s  ({nuevo / viejo:.1f}x)")
+
+
+# El lazo de antes, tal cual, para comparar la latencia
+def lazo_viejo(ser):
+    while ser.is_open:
+        try:
+            linea = ser.readline().decode("utf-8", errors="ignore").strip()
+        except Exception:
+            return
+        nucleo.procesar_linea(linea)
+        nucleo.publicar_estado()
+        time.sleep(0.02)
+
+
+def medir_latencia(nombre, maestro, muestras):
+    latencias = []
+    for i in range(muestras):
+        antes = nucleo.foto_actual().personas
+        linea = "ENTRADA AFORO: 1\r\n" if i % 2 == 0 else "SALIDA AFORO: 0\r\n"
+        t0 = time.perf_counter()
+        os.write(maestro, linea.encode())
+        while nucleo.foto_actual().personas == antes and time.perf_counter() - t0 < 2:
+            time.sleep(0.0001)
+        latencias.append(time.perf_counter() - t0)
+        time.sleep(0.005 + (i % 7) * 0.003)  # Llegadas a destiempo, como la gente
+    latencias.sort()
+    ms = [x * 1000 for x in latencias]
+    print(f"latencia {nombre:<6} p50 {statistics.median(ms):6.2f} ms   p99 {ms[int(0.99 * len(ms))]:6.2f} ms   máx {ms[-1]:6.2f} ms")
+
+
+if __name__ == "__main__":
+    muestras = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    medir_parser()
+
+    # Antes: un puerto, readline + sleep de 20 ms
+    maestro, esclavo = os.openpty()
+    ser = serial.Serial(os.ttyname(esclavo), 9600, timeout=1)
+    threading.Thread(target=lazo_viejo, args=(ser,), daemon=True).start()
+    medir_latencia("antes", maestro, muestras)
+    ser.close()
+
+    # Ahora: la puerta de nucleo.py (lectura en bloque + cola + hilo de ingesta)
+    maestro, esclavo = os.openpty()
+    nucleo.ocupacion.cambiar(personas=0)
+    nucleo.conectar([os.ttyname(esclavo)])
+    threading.Thread(target=nucleo.leer_arduino, daemon=True).start()
+    medir_latencia("ahora", maestro, muestras)
+    nucleo.desconectar()
@@ -0,0 +1,104 @@
+# benchmarks/bench_ligero.py
+# Prueba de carga del servidor ligero (servidor_ligero.py) con clientes
+# Socket.IO simulados: mide la latencia de conexión y el tiempo de reparto
+# (fan-out) de cada "actualizacion" hasta que TODOS los clientes la reciben.
+# Los eventos entran por el mismo camino que una línea real del Arduino.
+#
+# Uso: python benchmarks/bench_ligero.py [clientes ...]
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+import socketio as sio_cliente  # python-socketio (cliente)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+import nucleo  # noqa: E402
+import servidor_ligero  # noqa: E402
+from tiempo_real import socketio  # noqa: E402
+
+PUERTO_WEB = 8061
+URL = f"http://127.0.0.1:{PUERTO_WEB}"
+RONDAS = 50
+
+
+def levantar_servidor():
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # Sin una línea por request
+    server = servidor_ligero.crear_app()
+    hilo = threading.Thread(
+        target=lambda: socketio.run(server, port=PUERTO_WEB, allow_unsafe_werkzeug=True, log_output=False),
+        daemon=True,
+    )
+    hilo.start()
+    for _ in range(100):
+        try:
+            requests.get(URL, timeout=0.5)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError("El servidor ligero no arrancó")
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p / 100 * len(valores)))]
+
+
+def probar(n_clientes):
+    recibidos = [dict() for _ in range(n_clientes)]  # version -> hora de llegada
+    clientes = []
+    latencias_conexion = []
+
+    for i in range(n_clientes):
+        c = sio_cliente.Client()
+
+        def al_recibir(delta, i=i):
+            recibidos[i][delta.get("version")] = time.perf_counter()
+
+        c.on("actualizacion", al_recibir)
+        t0 = time.perf_counter()
+        c.connect(URL, wait_timeout=10)
+        latencias_conexion.append(time.perf_counter() - t0)
+        clientes.append(c)
+
+    repartos = []
+    for ronda in range(RONDAS):
+        t0 = time.perf_counter()
+        nucleo.procesar_linea(f"ENTRADA AFORO: {ronda % 40 + 1}")
+        delta = nucleo.publicar_estado()
+        if not delta:
+            continue
+        version = delta["version"]
+        limite = t0 + 5
+        while time.perf_counter() < limite and not all(version in r for r in recibidos):
+            time.sleep(0.0005)
+        llegadas = [r[version] for r in recibidos if version in r]
+        if len(llegadas) == n_clientes:
+            repartos.append(max(llegadas) - t0)
+        time.sleep(0.02)
+
+    for c in clientes:
+        c.disconnect()
+
+    ms = lambda s: s * 1000  # noqa: E731
+    print(
+        f"{n_clientes:>8} "
+        f"{ms(statistics.median(latencias_conexion)):>10.1f} {ms(percentil(latencias_conexion, 99)):>10.1f} "
+        f"{ms(statistics.median(repartos)) if repartos else float('nan'):>10.1f} "
+        f"{ms(percentil(repartos, 99)) if repartos else float('nan'):>10.1f} "
+        f"{len(repartos):>6}/{RONDAS}"
+    )
+
+
+if __name__ == "__main__":
+    cantidades = [int(x) for x in sys.argv[1:]] or [1, 10, 50, 100]
+    levantar_servidor()
+    print(f"{'clientes':>8} {'conex p50':>10} {'conex p99':>10} {'fanout p50':>10} {'fanout p99':>10} {'rondas':>10}")
+    for n in cantidades:
+        probar(n)
@@ -0,0 +1,104 @@
+# benchmarks/bench_metricas.py
+# Cuánto cuesta medir. Corre lo mismo tres veces, cada una en un proceso
+# aparte (las variables se leen al importar metricas.py):
+#   apagado    -> solo los contadores de siempre (/metrics los lee al pedirlo)
+#   tiempos    -> AFORO_METRICAS_TIEMPOS=1 (histogramas por etapa)
+#   perfilador -> tiempos + AFORO_PERFILADOR=1 (muestreo cada 5 ms)
+# En cada una: N lecturas pasan por parseo -> cola -> estado -> publicar
+# (sin serial de por medio, para que se vea solo el costo de medir), y
+# después se pide /metrics varias veces con 20 puertas anotadas.
+# Con una sola corrida por modo el ruido de la máquina pesa más que lo que
+# se quiere medir: se hacen varias rondas intercaladas y se muestra la
+# mediana (y entre corchetes la menor y la mayor).
+#
+# Uso: python benchmarks/bench_metricas.py [lecturas] [rondas]
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MODOS = {
+    "apagado": {},
+    "tiempos": {"AFORO_METRICAS_TIEMPOS": "1"},
+    "perfilador": {"AFORO_METRICAS_TIEMPOS": "1", "AFORO_PERFILADOR": "1"},
+}
+
+
+def medir(lecturas):
+    import metricas
+    import nucleo
+    import servidor_ligero
+    from flask import Flask
+
+    nucleo.pasar_a_simulado()
+    nucleo.modo_simulado = False  # Que nadie más toque la cuenta mientras medimos
+    metricas.perfilar_hilo()
+
+    class PuertaFalsa(nucleo.Puerta):
+        def __init__(self, nombre):
+            super().__init__(nombre, nucleo.BAUDIOS)
+            self.activa = True
+
+    falsas = [PuertaFalsa(f"/dev/falsa{i}") for i in range(20)]
+    nucleo.puertas = {p.nombre: p for p in falsas}
+    puerta = falsas[0]
+    lineas = [b"ENTRADA AFORO: 1\r\n", b"SALIDA AFORO: 0\r\n"]
+
+    t0 = time.perf_counter()
+    for i in range(lecturas):
+        # Lo mismo que hacen Puerta._leer() y leer_arduino() por cada lectura
+        pedazo = lineas[i & 1]
+        puerta.bytes_leidos += len(pedazo)
+        if metricas.TIEMPOS:
+            tp = time.perf_counter()
+            eventos = puerta.lector.alimentar(pedazo)
+            metricas.etapa("parseo", tp)
+        else:
+            eventos = puerta.lector.alimentar(pedazo)
+        if metricas.TIEMPOS:
+            te = time.perf_counter()
+        nucleo.atender_eventos(time.time(), puerta, eventos)
+        if metricas.TIEMPOS:
+            metricas.etapa("estado", te)
+        nucleo.publicar_estado()
+    us = (time.perf_counter() - t0) / lecturas * 1e6
+
+    server = Flask(__name__)
+    servidor_ligero.registrar(server)
+    cliente = server.test_client()
+    t0 = time.perf_counter()
+    for _ in range(200):
+        texto = cliente.get("/metrics").get_data()
+    ms = (time.perf_counter() - t0) / 200 * 1000
+    print(f"{us:.2f} {ms:.3f} {len(texto)}")
+
+
+if __name__ == "__main__":
+    lecturas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    if len(sys.argv) > 2 and sys.argv[2] == "--hijo":
+        medir(lecturas)
+        sys.exit()
+
+    rondas = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    resultados = {modo: [] for modo in MODOS}
+    for _ in range(rondas):
+        for modo, extra in MODOS.items():
+            entorno = dict(os.environ, AFORO_BITACORA="", **extra)
+            salida = subprocess.run([sys.executable, __file__, str(lecturas), "--hijo"], env=entorno,
+                                    capture_output=True, text=True, check=True).stdout.split("\n")
+            us, ms, tam = salida[-2].split()
+            resultados[modo].append((float(us), float(ms), int(tam)))
+
+    print(f"{lecturas:,} lecturas por modo, mediana de {rondas} rondas")
+    print(f"{'modo':<11} {'µs/lectura':>10} {'[menor - mayor]':>17} {'extra':>7} {'/metrics ms':>12} {'bytes':>7}")
+    base = None
+    for modo, filas in resultados.items():
+        us = statistics.median(f[0] for f in filas)
+        base = base or us
+        rango = f"[{min(f[0] for f in filas):.1f} - {max(f[0] for f in filas):.1f}]"
+        print(f"{modo:<11} {us:>10.2f} {rango:>17} {(us / base - 1) * 100:>6.1f}% "
+              f"{statistics.median(f[1] for f in filas):>12.3f} {filas[-1][2]:>7,}")
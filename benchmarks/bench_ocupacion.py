@@ -0,0 +1,123 @@
+# benchmarks/bench_ocupacion.py
+# Prueba de estrés del estado: UN hilo escribiendo eventos lo más rápido que
+# puede (entra uno, sale uno, entra uno...) y muchos hilos leyendo a la vez,
+# como harían los callbacks de Dash y las peticiones de Flask.
+# Cada lector revisa que lo que ve sea coherente: si hay 1 persona, el último
+# aviso tiene que ser de ENTRADA; si hay 0, de SALIDA.
+#   antes -> variables sueltas que se escriben de a una (como era nucleo.py)
+#   ahora -> nucleo.procesar_evento() + nucleo.foto_actual() (ocupacion.py)
+#
+# Ojo con las escrituras/s: con lectores que leen sin parar el escritor
+# cae mucho (16 lectores: ~1/17 de lo que hace solo), pero NO porque lo
+# frenen: leer no toma ningún candado. Es el GIL: 17 hilos que quieren CPU
+# todo el tiempo se la reparten, y al escritor le toca su parte. Se ve en
+# que "antes" (sin nada de sincronización) cae igual. Por eso también se
+# mide con lectores que leen hasta 1000 veces por segundo cada uno (ya es
+# mucho más que cualquier dashboard): ahí el escritor conserva más de la
+# mitad, y lo que pierde se va en despertar y turnar a los 16 hilos.
+#
+# Uso: python benchmarks/bench_ocupacion.py [lectores] [segundos]
+import os
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import nucleo  # noqa: E402
+from protocolo import interpretar_texto  # noqa: E402
+
+EVENTOS = [interpretar_texto("ENTRADA AFORO: 1"), interpretar_texto("SALIDA AFORO: 0")]
+
+
+# Así eran las cosas antes: cada campo por su lado
+class EstadoSuelto:
+    personas_actuales = 0
+    mensaje_notificacion = "🔙 SALIDA DETECTADA"
+    tipo_evento = "salida"
+    ultimo_cambio_ts = 0
+
+
+def escribir_suelto(estado, evento):
+    # Mismo orden que el procesar_linea() de antes: primero el aviso, al final la cuenta
+    if evento.tipo == "ENTRADA":
+        estado.mensaje_notificacion = "🚶 ENTRADA DETECTADA"
+        estado.tipo_evento = "entrada"
+    else:
+        estado.mensaje_notificacion = "🔙 SALIDA DETECTADA"
+        estado.tipo_evento = "salida"
+    estado.ultimo_cambio_ts = time.time()
+    estado.personas_actuales = evento.contador
+
+
+def leer_suelto(estado):
+    return estado.personas_actuales, estado.tipo_evento, estado.mensaje_notificacion, None
+
+
+def leer_foto(_):
+    foto = nucleo.foto_actual()
+    return foto.personas, foto.tipo_evento, foto.mensaje, foto.version
+
+
+def coherente(personas, tipo_evento, mensaje):
+    if personas == 1:
+        return tipo_evento == "entrada" and "ENTRADA" in mensaje
+    return tipo_evento == "salida" and "SALIDA" in mensaje
+
+
+def correr(nombre, escribir, leer, estado, n_lectores, segundos, pausa=0.0, solo=None):
+    fin = time.perf_counter() + segundos
+    escrituras = [0]
+    lecturas = [0] * n_lectores
+    rotas = [0] * n_lectores
+    retrocesos = [0] * n_lectores
+
+    def escritor():
+        i = 0
+        while time.perf_counter() < fin:
+            escribir(estado, EVENTOS[i & 1])
+            i += 1
+        escrituras[0] = i
+
+    def lector(k):
+        ultima = -1
+        while time.perf_counter() < fin:
+            personas, tipo_evento, mensaje, version = leer(estado)
+            if not coherente(personas, tipo_evento, mensaje):
+                rotas[k] += 1
+            if version is not None:
+                if version < ultima:
+                    retrocesos[k] += 1
+                ultima = version
+            lecturas[k] += 1
+            if pausa:
+                time.sleep(pausa)
+
+    hilos = [threading.Thread(target=escritor)] + [threading.Thread(target=lector, args=(k,)) for k in range(n_lectores)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    por_segundo = escrituras[0] / segundos
+    if solo is not None:
+        print(f"{nombre:<15} {por_segundo:>12,.0f} {por_segundo / solo:>8.0%} {sum(lecturas) / segundos:>12,.0f} "
+              f"{sum(rotas):>10,} {sum(retrocesos):>11,}")
+    return por_segundo
+
+
+if __name__ == "__main__":
+    n_lectores = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sys.setswitchinterval(1e-5)  # Que los hilos se turnen seguido, para que salten los problemas
+
+    nucleo.procesar_evento(EVENTOS[1])  # Arranca coherente: 0 personas, aviso de salida
+    print(f"{n_lectores} lectores, {segundos:g} s (% = escrituras/s contra el escritor solo, sin lectores)")
+    print(f"{'':<15} {'escrituras/s':>12} {'%':>8} {'lecturas/s':>12} {'rotas':>10} {'ver. atrás':>11}")
+    ahora = lambda _, evento: nucleo.procesar_evento(evento)
+    solo = correr("antes", escribir_suelto, leer_suelto, EstadoSuelto(), 0, segundos)
+    correr("antes", escribir_suelto, leer_suelto, EstadoSuelto(), n_lectores, segundos, solo=solo)
+    solo = correr("ahora", ahora, leer_foto, None, 0, segundos)
+    correr("ahora", ahora, leer_foto, None, n_lectores, segundos, solo=solo)
+    correr("ahora, 1000/s", ahora, leer_foto, None, n_lectores, segundos, pausa=0.001, solo=solo)
@@ -0,0 +1,172 @@
+# benchmarks/bench_procesos.py
+# Peticiones por segundo según cuántos procesos web sirven el dashboard.
+#   1 proceso       -> AFORO_ROL=todo: la app de siempre (ingesta + web juntas)
+#   ingesta + N web -> python ingesta.py + N procesos AFORO_ROL=web (compartido.py)
+# Todos escuchan en el mismo socket (como gunicorn -w N) y el simulador
+# (simulador.py) manda tráfico por pty todo el tiempo, así la cuenta cambia
+# mientras se mide. Se pide /api/estado (JSON chico) y el callback principal
+# de Dash (el que arma medidor, tendencia y tablas). Al final se revisa que
+# todos los procesos den la misma cuenta que el simulador, con el mismo ETag.
+# Solo Linux/macOS (pty y fork).
+#
+# Uso: python benchmarks/bench_procesos.py [max_procesos_web] [segundos] [clientes]
+import http.client
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import Pool
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from simulador import ArduinoSimulado, PuertoPty, Simulador  # noqa: E402
+
+SALIDAS = [("personas-actuales", "children"), ("porcentaje-ocupacion", "children"), ("porcentaje-ocupacion", "style"),
+           ("grafico-ocupacion", "figure"), ("grafico-tiempo", "figure"), ("tabla-historial", "data"),
+           ("estado-actual-texto", "children"), ("estado-actual-texto", "style"), ("notificacion-popup", "children"),
+           ("notificacion-popup", "style"), ("estado-conexion", "children"), ("tabla-historial", "page_count"),
+           ("pronostico-titulo", "children"), ("pronostico-detalle", "children"),
+           ("figuras-clave", "data"), ("tabla-puertas", "data")]
+# Lo mismo que manda una pestaña nueva (sin claves: le toca todo completo)
+CUERPO_DASH = json.dumps({
+    "output": ".." + "...".join(f"{i}.{p}" for i, p in SALIDAS) + "..",
+    "outputs": [{"id": i, "property": p} for i, p in SALIDAS],
+    "inputs": [{"id": "intervalo", "property": "n_intervals", "value": 1},
+               {"id": "push-version", "property": "data", "value": None},
+               {"id": "tabla-historial", "property": "page_current", "value": 0}],
+    "changedPropIds": ["intervalo.n_intervals"],
+    "state": [{"id": "figuras-clave", "property": "data", "value": None}],
+})
+
+
+# --- Un proceso web (se llama a sí mismo con --web) ---
+def servir(fd):
+    from werkzeug.serving import make_server
+    import app
+    make_server("127.0.0.1", 0, app.server, threaded=True, fd=fd).serve_forever()
+
+
+# --- Los clientes (cada uno en su proceso, para que el GIL no los frene) ---
+def pedir(puerto, metodo, ruta, cuerpo=None):
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+    cabeceras = {"Content-Type": "application/json"} if cuerpo else {}
+    conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    datos = respuesta.read()
+    conexion.close()
+    return respuesta, datos
+
+
+def cliente(args):
+    puerto, ruta, segundos = args
+    metodo, cuerpo = ("POST", CUERPO_DASH) if ruta.startswith("/_dash") else ("GET", None)
+    fin = time.perf_counter() + segundos
+    hechas = errores = 0
+    while time.perf_counter() < fin:
+        try:
+            respuesta, _ = pedir(puerto, metodo, ruta, cuerpo)
+            if respuesta.status == 200:
+                hechas += 1
+            else:
+                errores += 1
+        except OSError:
+            errores += 1
+    return hechas, errores
+
+
+def esperar_listo(puerto, limite=60):
+    fin = time.time() + limite
+    while time.time() < fin:
+        try:
+            respuesta, datos = pedir(puerto, "GET", "/api/estado")
+            if respuesta.status == 200 and json.loads(datos).get("personas") is not None:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def correr(nombre, n_web, puertos_pty, segundos, clientes):
+    oyente = socket.socket()
+    oyente.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    oyente.bind(("127.0.0.1", 0))
+    oyente.listen(512)
+    puerto = oyente.getsockname()[1]
+
+    base = dict(os.environ, AFORO_PUERTOS=",".join(p.nombre for p in puertos_pty), AFORO_BITACORA="",
+                AFORO_PIZARRA=f"bench{os.getpid()}", AFORO_CLAVE_ORDENES=secrets.token_hex(16))
+    procesos = []
+    if n_web == 0:
+        entorno = dict(base, AFORO_ROL="todo")
+        n_web = 1
+    else:
+        procesos.append(subprocess.Popen([sys.executable, os.path.join(RAIZ, "ingesta.py")], env=base, cwd=RAIZ,
+                                         stdout=subprocess.DEVNULL))
+        entorno = dict(base, AFORO_ROL="web")
+    for _ in range(n_web):
+        procesos.append(subprocess.Popen([sys.executable, __file__, "--web", str(oyente.fileno())], env=entorno, cwd=RAIZ,
+                                         pass_fds=[oyente.fileno()], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    try:
+        if not esperar_listo(puerto):
+            print(f"{nombre}: no levantó")
+            return
+        time.sleep(1) # Que todos los procesos web terminen de importar Dash
+
+        # 4 puertas, ~20 líneas/s entre todas: la cuenta cambia seguido
+        simulador = Simulador([ArduinoSimulado(p) for p in puertos_pty], tasa=150, estadia=2, prob_cola=0.0, semilla=1)
+        hilo = threading.Thread(target=simulador.correr, daemon=True)
+        hilo.start()
+
+        resultados = []
+        for ruta in ("/api/estado", "/_dash-update-component"):
+            with Pool(clientes) as pool:
+                partes = pool.map(cliente, [(puerto, ruta, segundos)] * clientes)
+            hechas = sum(h for h, _ in partes)
+            errores = sum(e for _, e in partes)
+            resultados.append((hechas / segundos, errores))
+
+        # ¿Todos dicen lo mismo? Con el simulador parado la cuenta se queda quieta
+        simulador.detener()
+        hilo.join()
+        time.sleep(1.5)
+        vistos = set()
+        for _ in range(30):
+            respuesta, datos = pedir(puerto, "GET", "/api/estado")
+            vistos.add((json.loads(datos)["personas"], respuesta.getheader("ETag")))
+        cuentas = {p for p, _ in vistos}
+        ok = len(vistos) == 1 and cuentas == {simulador.adentro}
+
+        (estado, e1), (dash, e2) = resultados
+        print(f"{nombre:<16} {estado:>12,.0f} {dash:>12,.0f} {e1 + e2:>8} "
+              f"{'OK' if ok else 'MAL'} (cuenta {sorted(cuentas)}, simulador {simulador.adentro}, {len(vistos)} ETag)")
+    finally:
+        for p in procesos:
+            p.terminate()
+        for p in procesos:
+            p.wait()
+        oyente.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--web":
+        servir(int(sys.argv[2]))
+        sys.exit()
+
+    max_web = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    clientes = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    puertos = [PuertoPty() for _ in range(4)]
+    print(f"{os.cpu_count()} CPU, {clientes} clientes, {segundos:g} s por medición")
+    print(f"{'':<16} {'/api/estado/s':>12} {'dash/s':>12} {'errores':>8} coherencia")
+    correr("1 proceso", 0, puertos, segundos, clientes)
+    n = 1
+    while n <= max_web:
+        correr(f"ingesta + {n} web", n, puertos, segundos, clientes)
+        n *= 2
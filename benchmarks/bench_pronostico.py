@@ -0,0 +1,144 @@
+# benchmarks/bench_pronostico.py
+# Backtest del pronóstico (pronostico.py) sobre meses de eventos inventados
+# con forma de local de verdad: abre de 9 a 22, picos al mediodía y a la
+# noche, fines de semana más movidos, días que vienen más o menos llenos que
+# lo normal y gente que se queda ~45 min. Las primeras semanas se aprenden
+# de una (aprender(), como al arrancar con la bitácora); el resto se anota
+# evento por evento y cada 5 min se pronostica, comparando contra lo que
+# pasó de verdad:
+#   - error medio de la gente adentro a 15 / 30 / 60 min, contra "igual que
+#     ahora", "la tasa de ahora" (sin perfil) y "solo el perfil" (sin lo de hoy)
+#   - "se llena en": de las veces que se llenó en la hora siguiente, cuántas
+#     se avisaron; de los avisos, cuántos fueron ciertos; y el error en minutos
+#   - cuánto cuesta: µs por evento anotado y por pronóstico
+#
+# Uso: python benchmarks/bench_pronostico.py [dias] [entradas_por_dia] [dias_aprendizaje]
+import os
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from analitica import inicio_balde  # noqa: E402
+from pronostico import MINUTOS, Pronostico, desplazamiento  # noqa: E402
+
+CADA = 300 # Un pronóstico cada 5 min
+SEMANA = np.array([0.8, 0.8, 0.9, 1.0, 1.3, 1.6, 1.2]) # De lunes a domingo
+
+
+# (ts, +1/-1) ordenados. Todo con NumPy: llegadas de Poisson minuto a minuto
+def generar(dias, por_dia, semilla=3):
+    azar = np.random.default_rng(semilla)
+    hoy = inicio_balde(time.time(), 86400)
+    inicio = hoy - dias * 86400
+    minutos = np.arange(dias * 1440)
+    hora = (minutos % 1440) / 60
+    forma = np.where((hora >= 9) & (hora < 22),
+                     0.3 + np.exp(-((hora - 13) / 1.5) ** 2) + 1.3 * np.exp(-((hora - 20) / 1.5) ** 2), 0.0)
+    dia = minutos // 1440
+    lunes = int((inicio + desplazamiento(inicio)) // 86400 + 3) % 7 # 1970-01-01 fue jueves
+    humor = azar.lognormal(0, 0.25, dias) # Hay días más movidos que otros
+    tasa = por_dia * forma / forma[:1440].sum() * SEMANA[(dia + lunes) % 7] * humor[dia]
+
+    llegadas = np.repeat(inicio + minutos * 60.0, azar.poisson(tasa))
+    llegadas += azar.uniform(0, 60, len(llegadas))
+    salidas = llegadas + 300 + azar.exponential(2400, len(llegadas))
+    ts = np.concatenate((llegadas, salidas))
+    signo = np.concatenate((np.ones(len(llegadas), np.int64), -np.ones(len(salidas), np.int64)))
+    orden = np.argsort(ts, kind="stable")
+    return ts[orden], signo[orden], inicio
+
+
+def backtest(ts, signo, inicio, dias, dias_aprendizaje):
+    gente = np.cumsum(signo)
+    adentro = lambda t: np.where(t < ts[0], 0, gente[np.maximum(np.searchsorted(ts, t, side="right") - 1, 0)])
+
+    # Aforo: que se llene más o menos 4 de cada 10 días
+    picos = np.zeros(dias + 1, np.int64)
+    np.maximum.at(picos, ((ts - inicio) // 86400).astype(np.int64), gente)
+    aforo = int(np.percentile(picos[dias_aprendizaje:dias], 60))
+
+    corte = inicio + dias_aprendizaje * 86400
+    n = int(np.searchsorted(ts, corte))
+    entradas, salidas = (signo > 0).astype(np.int64), (signo < 0).astype(np.int64)
+    modelo = Pronostico()
+    solo_perfil = Pronostico(mezcla=1e-9) # Sin "hoy viene más movido"
+    t0 = time.perf_counter()
+    modelo.aprender(ts[:n], entradas[:n], salidas[:n], gente[:n])
+    t_aprender = time.perf_counter() - t0
+    solo_perfil.aprender(ts[:n], entradas[:n], salidas[:n], gente[:n])
+
+    momentos = np.arange(corte, ts[-1] - 3600, CADA)
+    hasta = np.searchsorted(ts, momentos, side="right")
+    ahora = adentro(momentos)
+    pasos = [int(m * 60 / modelo.paso) - 1 for m in MINUTOS]
+    pronostico = np.zeros((len(momentos), len(MINUTOS)))
+    tasa_ahora = np.zeros((len(momentos), len(MINUTOS)))
+    perfil = np.zeros((len(momentos), len(MINUTOS)))
+    lleno = np.full(len(momentos), np.inf)
+
+    lista = list(zip(ts.tolist(), entradas.tolist(), salidas.tolist(), gente.tolist()))
+    t_anotar = t_pronosticar = 0.0
+    i = n
+    for k, t in enumerate(momentos.tolist()):
+        t0 = time.perf_counter()
+        for evento in lista[i:hasta[k]]:
+            modelo.anotar(*evento)
+        t1 = time.perf_counter()
+        camino, alta = modelo.trayectoria(t, int(ahora[k]))
+        en = modelo.lleno_en(int(ahora[k]), aforo, alta)
+        t_pronosticar += time.perf_counter() - t1
+        t_anotar += t1 - t0
+
+        pronostico[k] = camino[pasos]
+        if en is not None:
+            lleno[k] = en
+        e, s = modelo.tasas(t)
+        tasa_ahora[k] = np.maximum(0, ahora[k] + (e - s) * modelo.pasos[pasos])
+        for evento in lista[i:hasta[k]]:
+            solo_perfil.anotar(*evento)
+        perfil[k] = solo_perfil.trayectoria(t, int(ahora[k]))[0][pasos]
+        i = hasta[k]
+
+    eventos = len(ts) - n
+    print(f"{dias} días, {len(ts):,} eventos, aforo {aforo}. Aprendidos {dias_aprendizaje} días "
+          f"({n:,} eventos) de una en {t_aprender * 1000:.0f} ms; el resto evento por evento")
+    print(f"anotar: {t_anotar / eventos * 1e6:.2f} µs por evento   pronosticar: "
+          f"{t_pronosticar / len(momentos) * 1e6:.0f} µs ({len(momentos):,} pronósticos)   "
+          f"total {t_aprender + t_anotar + t_pronosticar:.2f} s")
+
+    # Error medio de la gente adentro (solo mientras hay movimiento: de noche acierta cualquiera)
+    verdad = np.stack([adentro(momentos + m * 60) for m in MINUTOS], axis=1)
+    abierto = (ahora > 0) | (verdad.max(axis=1) > 0)
+    print(f"\nerror medio de gente adentro ({abierto.sum():,} momentos con gente)")
+    print(f"{'':<16}" + "".join(f"{f'{m} min':>9}" for m in MINUTOS))
+    for nombre, valores in (("igual que ahora", np.repeat(ahora[:, None], len(MINUTOS), axis=1)),
+                            ("tasa de ahora", tasa_ahora), ("solo el perfil", perfil), ("pronóstico", pronostico)):
+        errores = np.abs(valores - verdad)[abierto].mean(axis=0)
+        print(f"{nombre:<16}" + "".join(f"{e:>9.1f}" for e in errores))
+
+    # Se llena en la hora siguiente?
+    llenos = ts[gente >= aforo]
+    siguiente = np.searchsorted(llenos, momentos, side="right")
+    real = np.where(siguiente < len(llenos), llenos[np.minimum(siguiente, len(llenos) - 1)] - momentos, np.inf)
+    vacio = ahora < aforo
+    se_lleno = vacio & (real <= 3600)
+    aviso = vacio & (lleno <= 3600)
+    ambos = se_lleno & aviso
+    print(f"\n\"se llena en\" (la hora siguiente): se llenó {se_lleno.sum()} veces, se avisó en "
+          f"{ambos.sum() / max(1, se_lleno.sum()):.0%}; de {aviso.sum()} avisos, "
+          f"{ambos.sum() / max(1, aviso.sum()):.0%} ciertos; error mediano "
+          f"{np.median(np.abs(lleno[ambos] - real[ambos])) / 60 if ambos.any() else 0:.1f} min")
+
+
+if __name__ == "__main__":
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    por_dia = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+    dias_aprendizaje = int(sys.argv[3]) if len(sys.argv) > 3 else 28
+    t0 = time.perf_counter()
+    ts, signo, inicio = generar(dias, por_dia)
+    print(f"(generar: {time.perf_counter() - t0:.2f} s)")
+    backtest(ts, signo, inicio, dias, dias_aprendizaje)
@@ -0,0 +1,92 @@
+# benchmarks/bench_puertas.py
+# Muchas puertas a la vez, cada una con su "Arduino" de mentira en una
+# pseudo-terminal (pty, solo Linux/macOS). Mide cuánta CPU gasta nucleo.py
+# esperando sin tráfico y con tráfico, y revisa que la cuenta del local dé
+# bien aunque los contadores de cada Arduino se topen con 0 o con 50:
+#   fase 1: por todas las puertas entra gente ("ENTRADA AFORO: n", tope 50)
+#   fase 2: por las puertas impares sale gente (su contador se queda en 0)
+#
+# Uso: python benchmarks/bench_puertas.py [puertas] [eventos_por_puerta]
+import os
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import nucleo  # noqa: E402
+
+
+class ArduinoFalso:
+    def __init__(self):
+        self.maestro, esclavo = os.openpty()
+        self.puerto = os.ttyname(esclavo)
+        self.aforo = 0
+
+    # Igual que Sensores.ino: el contador no pasa de 50 ni baja de 0
+    def entrada(self):
+        self.aforo = min(self.aforo + 1, 50)
+        os.write(self.maestro, f"ENTRADA AFORO: {self.aforo}\r\n".encode())
+
+    def salida(self):
+        if self.aforo > 0:
+            self.aforo -= 1
+        os.write(self.maestro, f"SALIDA AFORO: {self.aforo}\r\n".encode())
+
+
+def esperar_cuenta(esperada, limite=30):
+    fin = time.time() + limite
+    while time.time() < fin and nucleo.foto_actual().personas != esperada:
+        time.sleep(0.01)
+    return nucleo.foto_actual().personas == esperada
+
+
+def cpu_durante(segundos):
+    c0, t0 = time.process_time(), time.perf_counter()
+    time.sleep(segundos)
+    return (time.process_time() - c0) / (time.perf_counter() - t0) * 100
+
+
+def fase(arduinos, eventos, accion):
+    hilos = [threading.Thread(target=lambda a=a: [accion(a) for _ in range(eventos)]) for a in arduinos]
+    c0, t0 = time.process_time(), time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return c0, t0
+
+
+if __name__ == "__main__":
+    n_puertas = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    arduinos = [ArduinoFalso() for _ in range(n_puertas)]
+    if not nucleo.conectar([a.puerto for a in arduinos]):
+        sys.exit("No se pudieron abrir las pty")
+    threading.Thread(target=nucleo.leer_arduino, daemon=True).start()
+
+    print(f"{n_puertas} puertas, CPU sin tráfico: {cpu_durante(3):.2f} %")
+
+    # Fase 1: entra gente por todas las puertas
+    c0, t0 = fase(arduinos, eventos, ArduinoFalso.entrada)
+    esperada = n_puertas * eventos
+    ok = esperar_cuenta(esperada)
+    total = n_puertas * eventos
+    dt = time.perf_counter() - t0
+    cpu_us = (time.process_time() - c0) / total * 1e6
+    print(f"entradas: {total} eventos en {dt:.2f} s ({total / dt:,.0f}/s), {cpu_us:.0f} µs de CPU por evento, "
+          f"cuenta {nucleo.foto_actual().personas} (esperada {esperada}) {'OK' if ok else 'MAL'}")
+
+    # Fase 2: sale gente solo por las impares (su contador ya está en 50 y baja hasta 0)
+    impares = arduinos[1::2]
+    salen = min(eventos, 80)
+    fase(impares, salen, ArduinoFalso.salida)
+    esperada -= len(impares) * salen
+    ok = esperar_cuenta(esperada)
+    print(f"salidas por {len(impares)} puertas: cuenta {nucleo.foto_actual().personas} (esperada {esperada}) {'OK' if ok else 'MAL'}")
+
+    for p in nucleo.resumen_puertas()[:4]:
+        print(f"   {p['puerta']}: +{p['entradas']} -{p['salidas']} (contador Arduino {p['contador']})")
+    nucleo.desconectar()
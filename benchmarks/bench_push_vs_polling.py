@@ -0,0 +1,126 @@
+# benchmarks/bench_push_vs_polling.py
+# Compara el costo del modo POLLING (cada pestaña dispara update() cada 300 ms)
+# contra el modo PUSH (Socket.IO manda solo el delta cuando algo cambia)
+# con 1, 10 y 50 clientes. Todo corre en el mismo proceso, sin navegador:
+#   - polling:    N x update() cada 300 ms, serializado como lo haría Dash
+#   - push-dash:  delta por Socket.IO; los números los pone el navegador y
+#                 update() corre como mucho una vez cada ESPERA_PUSH después
+#                 de un aviso (sin el tick de respaldo, que está apagado
+#                 mientras hay socket; el pop-up lo esconde el navegador)
+#   - push-ligero: solo el delta JSON (vista /ligero con Chart.js)
+# Los datos los genera el hilo de simulación de app.py (sin Arduino conectado).
+#
+# Uso: python benchmarks/bench_push_vs_polling.py [segundos_por_prueba]
+import json
+import os
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+import app as aforo  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+# Aunque haya un puerto serial, los datos los pone el hilo de simulación
+aforo.nucleo.pasar_a_simulado()
+
+# Un navegador no pregunta si llegó algo: se entera cuando llega. Para que
+# el bench tampoco gaste CPU revisando a los clientes de gusto, cada emit
+# despierta al bucle de correr_push
+llego = threading.Event()
+_emitir = aforo.socketio.emit
+
+
+def emitir_y_avisar(*args, **kwargs):
+    resultado = _emitir(*args, **kwargs)
+    llego.set()
+    return resultado
+
+
+aforo.socketio.emit = emitir_y_avisar
+
+TICK_POLLING = 0.3
+
+
+viajes_dash = [0] # Cuántas veces corrió update() (un viaje de ida y vuelta a Dash)
+
+
+def tam_respuesta(n, claves):
+    # Dash serializa la salida del callback con el codificador de Plotly.
+    # "claves" es el dcc.Store de cada pestaña (qué figuras ya tiene)
+    viajes_dash[0] += 1
+    salida = aforo.update(n, None, claves[0])
+    claves[0] = salida[-2]  # figuras-clave (la última salida es la tabla por puerta)
+    return len(to_json_plotly(salida))
+
+
+def correr_polling(clientes, segundos):
+    enviados = 0
+    n = 0
+    claves = [[None] for _ in range(clientes)]
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        siguiente = time.perf_counter() + TICK_POLLING
+        for c in claves:
+            enviados += tam_respuesta(n, c)
+        n += 1
+        time.sleep(max(0.0, siguiente - time.perf_counter()))
+    return enviados
+
+
+def correr_push(clientes, segundos, con_dash):
+    conexiones = [aforo.socketio.test_client(aforo.server) for _ in range(clientes)]
+    for c in conexiones:
+        c.get_received()  # Descartamos la foto inicial del connect
+
+    enviados = 0
+    n = 0
+    # Por cliente, lo mismo que SCRIPT_PUSH: último viaje y viaje pendiente
+    claves = {id(c): [None] for c in conexiones}
+    viajes = {id(c): [0.0, None] for c in conexiones}
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        # Dormidos hasta que llegue un aviso o toque un viaje pendiente
+        despertar = min([fin] + [v[1] for v in viajes.values() if v[1] is not None])
+        llego.wait(max(0.0, despertar - time.perf_counter()))
+        llego.clear()
+        ahora = time.perf_counter()
+        for c in conexiones:
+            estado = viajes[id(c)]
+            for paquete in c.get_received():
+                enviados += len(json.dumps(paquete["args"]))
+                if con_dash and estado[1] is None:
+                    estado[1] = max(ahora, estado[0] + aforo.ESPERA_PUSH)
+            if con_dash and estado[1] is not None and ahora >= estado[1]:
+                enviados += tam_respuesta(n, claves[id(c)])
+                estado[0], estado[1] = ahora, None
+                n += 1
+
+    for c in conexiones:
+        c.disconnect()
+    return enviados
+
+
+def medir(nombre, clientes, segundos, funcion):
+    viajes_dash[0] = 0
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    enviados = funcion(clientes, segundos)
+    cpu = time.process_time() - cpu0
+    duracion = time.perf_counter() - t0
+    print(f"{nombre:<12} {clientes:>8} {100 * cpu / duracion:>9.1f}% {enviados / duracion / 1024:>12.1f} {viajes_dash[0] / duracion:>10.1f}")
+
+
+if __name__ == "__main__":
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    correr_polling(1, 1.0)  # Calentamiento: imports perezosos y primeras figuras
+    print(f"{'modo':<12} {'clientes':>8} {'CPU':>10} {'KB/s':>12} {'update()/s':>10}")
+    # Sin nadie mirando: lo que gasta la simulación sola (todos los modos lo pagan)
+    medir("base", 0, segundos, lambda c, s: time.sleep(s) or 0)
+    for clientes in (1, 10, 50):
+        medir("polling", clientes, segundos, correr_polling)
+        medir("push-dash", clientes, segundos, lambda c, s: correr_push(c, s, True))
+        medir("push-ligero", clientes, segundos, lambda c, s: correr_push(c, s, False))
@@ -0,0 +1,89 @@
+# benchmarks/bench_reconexion.py
+# Se desenchufa el Arduino en medio del tráfico y se vuelve a enchufar:
+#   - cuánta CPU gasta la app mientras no está (no tiene que dar vueltas en vacío)
+#   - cuánto tarda en reconectarse sola después de que vuelve
+#   - si la cuenta termina igual que la del simulador. El "Arduino" sigue
+#     contando mientras el cable está cortado (como uno con fuente propia):
+#     en texto eso se pierde; con tramas, la secuencia y el contador lo recuperan
+# El puerto es un enlace simbólico a una pty: desenchufar es cerrar la pty y
+# borrar el enlace; enchufar es una pty nueva con el mismo nombre. Solo Linux/macOS.
+#
+# Uso: python benchmarks/bench_reconexion.py [segundos_desenchufado]
+import os
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+ENLACE = os.path.join(tempfile.mkdtemp(), "arduino")
+os.environ.update(AFORO_PUERTOS=ENLACE, AFORO_BITACORA="", AFORO_INTERVALO_BUSQUEDA="0")
+
+import nucleo  # noqa: E402
+from simulador import ArduinoSimulado, PuertoPty, Simulador  # noqa: E402
+
+
+def enchufar():
+    puerto = PuertoPty()
+    if os.path.lexists(ENLACE):
+        os.remove(ENLACE)
+    os.symlink(puerto.nombre, ENLACE)
+    return puerto
+
+
+def esperar(condicion, limite=60):
+    t0 = time.perf_counter()
+    while not condicion():
+        if time.perf_counter() - t0 > limite:
+            return None
+        time.sleep(0.01)
+    return time.perf_counter() - t0
+
+
+def una_vez(binario, afuera):
+    puerto = enchufar()
+    arduino = ArduinoSimulado(puerto, binario=binario)
+    if not nucleo.conectar([ENLACE]):
+        print("no se pudo conectar")
+        return
+    inicio = nucleo.foto_actual().personas
+    simulador = Simulador([arduino], tasa=120, estadia=0.1, prob_cola=0.0, semilla=4)
+    hilo = threading.Thread(target=simulador.correr, daemon=True)
+    hilo.start()
+    time.sleep(2)
+
+    # Desenchufado: el simulador sigue (lo que manda se pierde)
+    puerto.cerrar()
+    os.remove(ENLACE)
+    puerta = nucleo.puertas[ENLACE]
+    esperar(lambda: not puerta.activa)
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    time.sleep(afuera)
+    cpu = (time.process_time() - cpu0) / (time.perf_counter() - t0)
+
+    # Enchufado de nuevo
+    arduino.puerto = enchufar()
+    demora = esperar(lambda: puerta.activa)
+    time.sleep(2)
+    simulador.detener()
+    hilo.join()
+    time.sleep(1)
+
+    app = nucleo.foto_actual().personas - inicio
+    nombre = "tramas" if binario else "texto"
+    print(f"{nombre:<7} CPU desenchufado {cpu:6.1%}  reconectó {demora:5.2f} s después  "
+          f"cuenta {app:>4} vs simulador {simulador.adentro:>4}  (tramas perdidas vistas: {puerta.perdidas})")
+    nucleo.desconectar()
+    arduino.puerto.cerrar()
+
+
+if __name__ == "__main__":
+    afuera = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    nucleo.modo_simulado = False
+    threading.Thread(target=nucleo.leer_arduino, daemon=True).start()
+    threading.Thread(target=nucleo.vigilar_puertos, daemon=True).start()
+    print(f"Desenchufado {afuera:g} s en medio del tráfico")
+    una_vez(False, afuera)
+    una_vez(True, afuera)
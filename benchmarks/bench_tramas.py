@@ -0,0 +1,129 @@
+# benchmarks/bench_tramas.py
+# Texto ("ENTRADA AFORO: 7", 9600 baudios) contra tramas binarias
+# (PROTOCOLO_BINARIO, 115200 baudios), en tres cosas:
+#   1. cuánto tarda el cable: bytes por evento y eventos por segundo que entran
+#   2. cuánto tarda la PC en interpretar (líneas o tramas por segundo)
+#   3. si la cuenta queda bien cuando el cable pierde o cambia bytes: una
+#      puerta manda una ráfaga de entradas y salidas, el "cable" rompe una
+#      fracción de los bytes, y se compara la cuenta de Puerta.movimiento()
+#      con la de verdad
+#   4. lo mismo en una puerta por la que solo sale gente (su contador se
+#      queda topado en 0), perdiendo eventos enteros en vez de bytes: cada
+#      salida que llega tiene que contar aunque la anterior se haya perdido
+#
+# Uso: python benchmarks/bench_tramas.py [eventos] [semillas]
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from protocolo import LARGO_TRAMA, LectorAuto, LectorLineas, LectorTramas, armar_trama  # noqa: E402
+from puertas import Puerta  # noqa: E402
+
+AFORO_MAXIMO = 50
+LATIDO_CADA = 20 # Eventos entre latidos (en la ráfaga entran ~20 personas por segundo)
+
+
+# Lo que manda una puerta en cada formato. La gente real no pasa los
+# topes de Sensores.ino, así que la cuenta de verdad es la del contador
+def rafaga(eventos, azar):
+    aforo = 0
+    texto, tramas = [], [armar_trama(0, "HOLA", 0, 0)]
+    secuencia = 1
+    for i in range(eventos):
+        if aforo == 0 or (aforo < AFORO_MAXIMO and azar.random() < 0.5):
+            aforo += 1
+            tipo = "ENTRADA"
+        else:
+            aforo -= 1
+            tipo = "SALIDA"
+        texto.append(f"{tipo} AFORO: {aforo}\r\n".encode())
+        tramas.append(armar_trama(secuencia, tipo, aforo, i * 50))
+        secuencia += 1
+        if i % LATIDO_CADA == LATIDO_CADA - 1:
+            tramas.append(armar_trama(secuencia, "LATIDO", aforo, i * 50))
+            secuencia += 1
+    tramas.append(armar_trama(secuencia, "LATIDO", aforo, eventos * 50)) # El latido siguiente a la ráfaga
+    return b"".join(texto), b"".join(tramas), aforo
+
+
+# Cada byte se pierde o se le da vuelta un bit con probabilidad `tasa`
+def cable(datos, tasa, azar):
+    salida = bytearray()
+    for byte in datos:
+        r = azar.random()
+        if r < tasa / 2:
+            continue
+        if r < tasa:
+            byte ^= 1 << azar.randrange(8)
+        salida.append(byte)
+    return bytes(salida)
+
+
+def contar(datos):
+    puerta = Puerta("bench")
+    lector = LectorAuto()
+    neto = 0
+    for i in range(0, len(datos), 64): # De a pedazos, como salen del puerto
+        for evento in lector.alimentar(datos[i:i + 64]):
+            neto += puerta.movimiento(evento)
+    return neto, puerta.perdidas
+
+
+def medir_parser(total=200_000):
+    texto, tramas, _ = rafaga(total, random.Random(1))
+    for nombre, lector, datos in (("texto", LectorLineas(), texto), ("tramas", LectorTramas(), tramas)):
+        t0 = time.perf_counter()
+        for i in range(0, len(datos), 4096):
+            lector.alimentar(datos[i:i + 4096])
+        print(f"parser {nombre:<7} {lector.lineas / (time.perf_counter() - t0):>12,.0f} eventos/s")
+
+
+# Solo salidas con el contador en 0; cada evento (línea o trama) se pierde
+# entero con probabilidad `tasa`. Devuelve los errores de texto y de tramas
+def solo_salida(eventos, tasa, azar):
+    texto, tramas = [], [armar_trama(0, "HOLA", 0, 0)]
+    for i in range(eventos):
+        if azar.random() >= tasa:
+            texto.append(b"SALIDA AFORO: 0\r\n")
+            tramas.append(armar_trama(i + 1, "SALIDA", 0, i * 50))
+    return abs(contar(b"".join(texto))[0] + eventos), abs(contar(b"".join(tramas))[0] + eventos)
+
+
+if __name__ == "__main__":
+    eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    semillas = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    # 8N1: 10 bits por byte en el cable
+    largo_texto = len(b"ENTRADA AFORO: 17\r\n")
+    for nombre, largo, baudios in (("texto", largo_texto, 9600), ("tramas", LARGO_TRAMA, 115200)):
+        ms = largo * 10 / baudios * 1000
+        print(f"cable  {nombre:<7} {largo:>3} bytes a {baudios:>6}: {ms:6.2f} ms por evento, hasta {1000 / ms:>7,.0f} eventos/s")
+    medir_parser()
+
+    print(f"\n{eventos:,} eventos por ráfaga, {semillas} ráfagas por tasa; error = |cuenta - verdad| promedio")
+    print(f"{'bytes rotos':>12} {'error texto':>12} {'error tramas':>13} {'perdidas vistas':>16}")
+    for tasa in (0.0, 0.0001, 0.001, 0.01):
+        errores_texto = errores_tramas = vistas = 0
+        for semilla in range(semillas):
+            azar = random.Random(semilla)
+            texto, tramas, verdad = rafaga(eventos, azar)
+            neto, _ = contar(cable(texto, tasa, azar))
+            errores_texto += abs(neto - verdad)
+            neto, perdidas = contar(cable(tramas, tasa, azar))
+            errores_tramas += abs(neto - verdad)
+            vistas += perdidas
+        print(f"{tasa:>12.2%} {errores_texto / semillas:>12.1f} {errores_tramas / semillas:>13.1f} {vistas / semillas:>16.1f}")
+
+    print(f"\npuerta de solo salida (contador en 0), {eventos:,} salidas; error promedio")
+    print(f"{'eventos perdidos':>16} {'error texto':>12} {'error tramas':>13}")
+    for tasa in (0.0, 0.001, 0.01, 0.1):
+        errores_texto = errores_tramas = 0
+        for semilla in range(semillas):
+            error_texto, error_tramas = solo_salida(eventos, tasa, random.Random(semilla))
+            errores_texto += error_texto
+            errores_tramas += error_tramas
+        print(f"{tasa:>16.1%} {errores_texto / semillas:>12.1f} {errores_tramas / semillas:>13.1f}")
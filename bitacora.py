@@ -0,0 +1,181 @@
+# bitacora.py
+# ==========================================
+# BITÁCORA DE EVENTOS (SQLITE EN MODO WAL)
+# ==========================================
+# Cada ENTRADA / SALIDA / COLA que manda el Arduino (y cada cambio de aforo)
+# se anota en una tabla que solo crece. Así, si la app se reinicia, sabemos
+# cuánta gente había y qué pasó antes, en vez de arrancar de 0.
+#
+# El hilo que lee el puerto NUNCA espera al disco: solo mete el evento en
+# una cola. Un hilo escritor junta lo que llegue en ~200 ms y lo guarda todo
+# en una sola transacción (group commit). En la misma transacción se
+# actualiza la fila "estado" (la foto del último estado), así que arrancar
+# es leer una fila + los últimos N eventos por su índice: cuesta lo mismo
+# con una semana o con meses de datos.
+import queue
+import sqlite3
+import threading
+import time
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    id       INTEGER PRIMARY KEY,
+    ts       REAL    NOT NULL,
+    tipo     TEXT    NOT NULL,
+    personas INTEGER NOT NULL,
+    aforo    INTEGER NOT NULL,
+    linea    TEXT    NOT NULL
+);
+-- Para exportar por rango de fechas sin recorrer la tabla entera
+CREATE INDEX IF NOT EXISTS eventos_ts ON eventos (ts);
+CREATE TABLE IF NOT EXISTS estado (
+    id        INTEGER PRIMARY KEY CHECK (id = 1),
+    ultimo_id INTEGER NOT NULL,
+    ts        REAL    NOT NULL,
+    personas  INTEGER NOT NULL,
+    aforo     INTEGER NOT NULL
+);
+"""
+
+
+def abrir(ruta):
+    conexion = sqlite3.connect(ruta, timeout=10)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    # En WAL, NORMAL no hace fsync en cada commit (solo al hacer checkpoint):
+    # si se corta la luz se pueden perder los últimos ms, pero nunca se corrompe
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    return conexion
+
+
+# Solo lee: sirve también desde otro proceso que no escribe (WAL deja leer
+# mientras el proceso de ingesta sigue guardando)
+def consultar_resumen(ruta, nivel, desde, hasta):
+    from analitica import consultar
+    conexion = abrir(ruta)
+    try:
+        return consultar(conexion, nivel, desde, hasta)
+    finally:
+        conexion.close()
+
+
+# Los eventos con desde <= ts < hasta, en orden, de a `lote` filas. Cada lote
+# es una consulta aparte que sigue desde la última fila leída (por el índice
+# de ts), así no queda una lectura abierta mientras se manda lo anterior
+def leer_eventos(ruta, desde, hasta, lote=10000):
+    conexion = abrir(ruta)
+    try:
+        ultimo = (desde, 0)
+        while True:
+            filas = conexion.execute(
+                "SELECT id, ts, tipo, personas, aforo, linea FROM eventos "
+                "WHERE (ts, id) > (?, ?) AND ts < ? ORDER BY ts, id LIMIT ?",
+                (*ultimo, hasta, lote),
+            ).fetchall()
+            if filas:
+                yield filas
+            if len(filas) < lote:
+                return
+            ultimo = (filas[-1][1], filas[-1][0])
+    finally:
+        conexion.close()
+
+
+class Bitacora:
+    # "resumenes" (opcional, ver analitica.py) se actualiza en la misma
+    # transacción que guarda cada lote de eventos
+    def __init__(self, ruta, espera_lote=0.2, lote_max=1000, resumenes=None):
+        self.ruta = ruta
+        self.espera_lote = espera_lote
+        self.lote_max = lote_max
+        self.resumenes = resumenes
+        self._cola = queue.Queue()
+
+        conexion = abrir(ruta)
+        conexion.executescript(ESQUEMA)
+        if resumenes:
+            resumenes.preparar(conexion)
+        conexion.close()
+
+        self._hilo = threading.Thread(target=self._escribir, daemon=True)
+        self._hilo.start()
+
+    # Eventos esperando a que el escritor los guarde (para /metrics)
+    def pendientes(self):
+        return self._cola.qsize()
+
+    # Lo llama el hilo del Arduino: no toca el disco, solo encola
+    def registrar(self, tipo, personas, aforo, linea, ts=None):
+        self._cola.put((time.time() if ts is None else ts, tipo, personas, aforo, linea))
+
+    def _escribir(self):
+        conexion = abrir(self.ruta)
+        while True:
+            evento = self._cola.get()
+            if evento is None:
+                break
+            # Si hay poquitos esperando, dejamos que se junten más antes de
+            # escribir; si hay atraso, escribimos de una
+            if self._cola.qsize() < self.lote_max:
+                time.sleep(self.espera_lote)
+            lote = [evento]
+            terminar = False
+            while len(lote) < self.lote_max:
+                try:
+                    evento = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if evento is None:
+                    terminar = True
+                    break
+                lote.append(evento)
+
+            self._guardar(conexion, lote)
+            if terminar:
+                break
+        conexion.close()
+
+    def _guardar(self, conexion, lote):
+        try:
+            with conexion:
+                conexion.executemany(
+                    "INSERT INTO eventos (ts, tipo, personas, aforo, linea) VALUES (?, ?, ?, ?, ?)", lote
+                )
+                ultimo_id = conexion.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ts, _, personas, aforo, _ = lote[-1]
+                conexion.execute(
+                    "INSERT OR REPLACE INTO estado (id, ultimo_id, ts, personas, aforo) VALUES (1, ?, ?, ?, ?)",
+                    (ultimo_id, ts, personas, aforo),
+                )
+                if self.resumenes:
+                    self.resumenes.aplicar(conexion, lote)
+        except sqlite3.Error as e:
+            # Que falle el disco no debe tumbar el conteo en vivo
+            print(f"Error guardando en la bitácora: {e}")
+
+    # Foto del último estado + los últimos n eventos (del más viejo al más nuevo).
+    # Devuelve None si la bitácora está vacía.
+    def restaurar(self, n):
+        conexion = abrir(self.ruta)
+        try:
+            foto = conexion.execute("SELECT ultimo_id, ts, personas, aforo FROM estado WHERE id = 1").fetchone()
+            if foto is None:
+                return None
+            ultimo_id, ts, personas, aforo = foto
+            eventos = conexion.execute(
+                "SELECT ts, tipo, personas, aforo FROM eventos WHERE id <= ? ORDER BY id DESC LIMIT ?",
+                (ultimo_id, n),
+            ).fetchall()
+        finally:
+            conexion.close()
+        eventos.reverse()
+        return {"ts": ts, "personas": personas, "aforo": aforo, "eventos": eventos}
+
+    # Resúmenes por intervalo (ver analitica.consultar)
+    def consultar_resumen(self, nivel, desde, hasta):
+        return consultar_resumen(self.ruta, nivel, desde, hasta)
+
+    # Guarda lo que quede en la cola y cierra (se llama al salir de la app)
+    def cerrar(self):
+        if self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join(timeout=5)
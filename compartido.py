@@ -0,0 +1,218 @@
+# compartido.py
+# ==========================================
+# ESTADO COMPARTIDO ENTRE PROCESOS
+# ==========================================
+# Para servir el dashboard con varios procesos web (gunicorn -w 4, etc.)
+# sin que cada uno abra el serial ni lleve su propia cuenta:
+#   - UN proceso de ingesta (python ingesta.py) es dueño de los puertos y,
+#     cada vez que publica, deja la foto en memoria compartida (Pizarra)
+#   - cada proceso web la copia de ahí (nucleo en modo "web") y le manda
+#     los cambios a sus propios clientes de Socket.IO
+#   - lo poco que va al revés (cambiar el aforo, el puerto o el modo) viaja
+#     por un socket local: una línea JSON, firmada con la clave compartida
+#     (AFORO_CLAVE_ORDENES). Solo JSON, nada de pickle: aunque alguien tenga
+#     la clave, lo más que puede hacer es pedir una de esas órdenes
+#
+# La pizarra es un "seqlock": quien escribe pone la secuencia en impar,
+# escribe y la deja en par. Quien lee copia y revisa que la secuencia sea
+# par, que no haya cambiado mientras copiaba y que el CRC cuadre (por si la
+# CPU reordena escrituras); si algo falla, vuelve a intentar. Nadie espera
+# a nadie, y ver si hay algo nuevo cuesta leer 8 bytes.
+import hashlib
+import hmac
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from array import array
+from multiprocessing import shared_memory
+
+from historial import Columnas
+
+# secuencia, largo del JSON, filas de historial, CRC (del JSON y las filas)
+CABECERA = struct.Struct("<QIII")
+# ts (double), personas (int), aforo (int), estado (byte): igual que historial.py
+TIPOS = ("d", "i", "i", "b")
+
+
+class Pizarra:
+    # filas = cuántos registros del historial viajan en cada foto (los más nuevos)
+    def __init__(self, nombre, crear=False, tamano=1 << 20, filas=500):
+        if crear:
+            try:
+                # Si quedó una de una corrida anterior que se cerró mal, la reciclamos
+                vieja = shared_memory.SharedMemory(nombre)
+                vieja.close()
+                vieja.unlink()
+            except FileNotFoundError:
+                pass
+            self.memoria = shared_memory.SharedMemory(nombre, create=True, size=tamano)
+            self.memoria.buf[:CABECERA.size] = bytes(CABECERA.size)
+        else:
+            self.memoria = abrir_sin_rastreo(nombre)
+        self.buf = self.memoria.buf
+        self.filas = filas
+        self.crear = crear
+        self._candado = threading.Lock()  # Por si publican dos hilos del mismo proceso
+        # Dónde empieza cada columna (tamaño fijo) y después el JSON
+        self.columnas = []
+        inicio = CABECERA.size
+        for tipo in TIPOS:
+            self.columnas.append(inicio)
+            inicio += array(tipo).itemsize * filas
+        self.inicio_json = inicio
+        self._ultima = None  # (secuencia, datos, columnas) ya leídas
+
+    # Lo llama SOLO el proceso de ingesta (un escritor)
+    def escribir(self, datos, cols):
+        with self._candado:
+            self._escribir(datos, cols)
+
+    def _escribir(self, datos, cols):
+        texto = json.dumps(datos, separators=(",", ":")).encode()
+        n = min(len(cols.ts), self.filas)
+        if self.inicio_json + len(texto) > len(self.buf):
+            raise ValueError(f"La foto ({len(texto)} bytes) no entra en la memoria compartida")
+
+        crudas = [bytes(col[len(col) - n:]) for col in cols]
+        crc = zlib.crc32(texto)
+        for cruda in crudas:
+            crc = zlib.crc32(cruda, crc)
+
+        secuencia = CABECERA.unpack_from(self.buf)[0] + 1
+        struct.pack_into("<Q", self.buf, 0, secuencia)  # impar: escribiendo
+        for inicio, cruda in zip(self.columnas, crudas):
+            self.buf[inicio:inicio + len(cruda)] = cruda
+        self.buf[self.inicio_json:self.inicio_json + len(texto)] = texto
+        CABECERA.pack_into(self.buf, 0, secuencia + 1, len(texto), n, crc)  # par: listo
+
+    def secuencia(self):
+        return struct.unpack_from("<Q", self.buf)[0]
+
+    # (secuencia, datos, Columnas) de la última foto; None si todavía no hay
+    # ninguna. Si la secuencia no cambió desde la última vez, no decodifica nada.
+    def leer(self, intentos=100):
+        for _ in range(intentos):
+            secuencia, largo, n, crc = CABECERA.unpack_from(self.buf)
+            if secuencia == 0:
+                return None
+            if self._ultima and self._ultima[0] == secuencia:
+                return self._ultima
+            if secuencia & 1:
+                time.sleep(0)  # El escritor está en medio: le damos paso
+                continue
+
+            crudas = []
+            for tipo, inicio in zip(TIPOS, self.columnas):
+                tam = array(tipo).itemsize * n
+                crudas.append(bytes(self.buf[inicio:inicio + tam]))
+            texto = bytes(self.buf[self.inicio_json:self.inicio_json + largo])
+            if self.secuencia() != secuencia:
+                continue
+            revision = zlib.crc32(texto)
+            for cruda in crudas:
+                revision = zlib.crc32(cruda, revision)
+            if revision != crc:
+                continue
+
+            cols = []
+            for tipo, cruda in zip(TIPOS, crudas):
+                col = array(tipo)
+                col.frombytes(cruda)
+                cols.append(col)
+            self._ultima = (secuencia, json.loads(texto), Columnas(*cols))
+            return self._ultima
+        return None
+
+    def cerrar(self):
+        self.buf = None
+        self.memoria.close()
+        if self.crear:
+            self.memoria.unlink()
+
+
+# En Linux, Python < 3.13 anota también las memorias que solo abrimos y las
+# borra cuando este proceso termina (aunque la ingesta la siga usando)
+def abrir_sin_rastreo(nombre):
+    try:
+        return shared_memory.SharedMemory(nombre, track=False)  # Python 3.13+
+    except TypeError:
+        memoria = shared_memory.SharedMemory(nombre)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memoria._name, "shared_memory")
+        except Exception:
+            pass
+        return memoria
+
+
+# ==========================================
+# ÓRDENES (WEB -> INGESTA)
+# ==========================================
+# Quien se conecta recibe un desafío al azar y tiene que devolverlo firmado
+# (HMAC-SHA256 con la clave) junto con la orden: {"orden": "aforo", "args": [60]}.
+# Se contesta {"ok": true, "resultado": ...} o {"ok": false, "error": "..."}.
+LARGO_MAXIMO = 4096 # Una orden es chiquita: más que esto es basura
+
+
+def _firma(clave, desafio):
+    return hmac.new(clave, desafio, hashlib.sha256).hexdigest()
+
+
+def atender_ordenes(direccion, clave, ordenes):
+    if not clave:
+        raise ValueError("Sin clave no se aceptan órdenes (AFORO_CLAVE_ORDENES)")
+    oyente = socket.create_server(direccion)
+
+    def atender(conexion):
+        with conexion, conexion.makefile("rwb") as canal:
+            try:
+                conexion.settimeout(5)
+                desafio = os.urandom(16).hex().encode()
+                canal.write(desafio + b"\n")
+                canal.flush()
+                firma = canal.readline(LARGO_MAXIMO).strip().decode()
+                if not hmac.compare_digest(firma, _firma(clave, desafio)):
+                    print("Orden rechazada: firma equivocada")
+                    return
+                pedido = json.loads(canal.readline(LARGO_MAXIMO))
+                nombre, args = pedido["orden"], pedido.get("args", [])
+                if nombre not in ordenes or not isinstance(args, list):
+                    respuesta = {"ok": False, "error": f"Orden desconocida: {nombre!r}"}
+                else:
+                    respuesta = {"ok": True, "resultado": ordenes[nombre](*args)}
+            except Exception as e:  # Alguien que cortó a la mitad, JSON roto...
+                respuesta = {"ok": False, "error": str(e)}
+            try:
+                canal.write(json.dumps(respuesta).encode() + b"\n")
+                canal.flush()
+            except OSError:
+                pass
+
+    def aceptar():
+        while True:
+            conexion, _ = oyente.accept()
+            threading.Thread(target=atender, args=(conexion,), daemon=True).start()
+
+    threading.Thread(target=aceptar, name="ordenes", daemon=True).start()
+    return oyente
+
+
+def ordenar(direccion, clave, nombre, *args):
+    if not clave:
+        raise RuntimeError("Falta AFORO_CLAVE_ORDENES")
+    with socket.create_connection(direccion, timeout=10) as conexion, conexion.makefile("rwb") as canal:
+        desafio = canal.readline(LARGO_MAXIMO).strip()
+        canal.write(_firma(clave, desafio).encode() + b"\n")
+        canal.write(json.dumps({"orden": nombre, "args": list(args)}).encode() + b"\n")
+        canal.flush()
+        linea = canal.readline(LARGO_MAXIMO)
+    if not linea:
+        raise RuntimeError("La ingesta cortó sin contestar (¿la clave es la misma?)")
+    respuesta = json.loads(linea)
+    if not respuesta["ok"]:
+        raise RuntimeError(respuesta["error"])
+    return respuesta["resultado"]
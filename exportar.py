@@ -0,0 +1,109 @@
+# exportar.py
+# ==========================================
+# EXPORTAR LA BITÁCORA (CSV / NDJSON / PARQUET)
+# ==========================================
+# Para auditorías y reportes de aforo: todos los eventos de un rango de
+# fechas, tal cual se guardaron. Nunca se junta el rango entero en memoria:
+# se lee la bitácora de a LOTE filas (bitacora.leer_eventos) y cada lote se
+# convierte y se manda apenas está listo, así que exportar un año gasta lo
+# mismo que exportar un día.
+import csv
+import io
+import json
+from datetime import datetime
+from bitacora import leer_eventos
+
+LOTE = 10000 # Filas por lectura (y por "row group" en Parquet)
+COLUMNAS = ("id", "ts", "fecha", "tipo", "personas", "aforo", "linea")
+TIPOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def con_fecha(lote):
+    return [(i, ts, datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"), tipo, personas, aforo, linea)
+            for i, ts, tipo, personas, aforo, linea in lote]
+
+
+def a_csv(lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    yield buffer.getvalue().encode()
+    for lote in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(con_fecha(lote))
+        yield buffer.getvalue().encode()
+
+
+def a_ndjson(lotes):
+    for lote in lotes:
+        yield "".join(json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False) + "\n" for fila in con_fecha(lote)).encode()
+
+
+# Lo que va escribiendo ParquetWriter, para mandarlo de a pedazos en vez de a un archivo
+class Tubo:
+    def __init__(self):
+        self.partes = []
+        self.escrito = 0
+        self.closed = False
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.escrito += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.escrito
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def sacar(self):
+        datos = b"".join(self.partes)
+        self.partes = []
+        return datos
+
+
+# Parquet necesita pyarrow (opcional: pip install pyarrow). Se importa acá y
+# no adentro del generador, así si falta se avisa antes de empezar a mandar.
+# En Parquet "fecha" es un timestamp de verdad (en UTC); en CSV/NDJSON es texto en hora local.
+def a_parquet(lotes):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ("id", pa.int64()), ("ts", pa.float64()), ("fecha", pa.timestamp("ms", tz="UTC")), ("tipo", pa.string()),
+        ("personas", pa.int32()), ("aforo", pa.int32()), ("linea", pa.string()),
+    ])
+
+    def generar():
+        tubo = Tubo()
+        escritor = pq.ParquetWriter(tubo, esquema)
+        for lote in lotes:
+            ids, ts, tipos, personas, aforos, lineas = zip(*lote)
+            fechas = pa.array([round(t * 1000) for t in ts], pa.int64()).cast(esquema.field("fecha").type)
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(ids), pa.array(ts), fechas, pa.array(tipos), pa.array(personas, pa.int32()),
+                 pa.array(aforos, pa.int32()), pa.array(lineas)], schema=esquema))
+            yield tubo.sacar()
+        escritor.close() # Acá se escribe el pie del archivo (el índice de los row groups)
+        yield tubo.sacar()
+    return generar()
+
+
+FORMATOS = {"csv": a_csv, "ndjson": a_ndjson, "parquet": a_parquet}
+
+
+# (tipo MIME, generador de bytes) con los eventos desde <= ts < hasta.
+# ValueError si el formato no existe; ImportError si es Parquet y no hay pyarrow.
+def exportar(ruta, formato, desde, hasta, lote=LOTE):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato} (csv, ndjson o parquet)")
+    return TIPOS[formato], FORMATOS[formato](leer_eventos(ruta, desde, hasta, lote))
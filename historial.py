@@ -0,0 +1,66 @@
+# historial.py
+# ==========================================
+# HISTORIAL CIRCULAR POR COLUMNAS
+# ==========================================
+# En vez de una lista de dicts que se recorta copiándola (historial[-100:])
+# y se vuelve a recorrer en cada tick para sacar horas y personas, guardamos
+# cada dato en arreglos de tamaño fijo, uno por columna:
+#   ts       -> hora del registro (segundos epoch, float)
+#   personas -> gente adentro en ese momento
+#   aforo    -> aforo máximo vigente (para calcular el % de ese momento)
+#   estado   -> código del estado (0 normal, 1 cola, 2 lleno)
+# Agregar es O(1) y nunca crece la memoria, sin importar la capacidad.
+from array import array
+from collections import namedtuple
+
+Columnas = namedtuple("Columnas", ["ts", "personas", "aforo", "estado"])
+
+
+class HistorialCircular:
+    def __init__(self, capacidad=10000):
+        if capacidad < 1:
+            raise ValueError("La capacidad del historial debe ser mayor a 0")
+        self.capacidad = capacidad
+        # Cada dato se escribe DOS veces (en i y en i + capacidad): así los
+        # últimos N siempre quedan seguiditos en memoria y se pueden leer
+        # con un memoryview, sin copiar nada
+        doble = 2 * capacidad
+        self.ts = array("d", [0.0]) * doble
+        self.personas = array("i", [0]) * doble
+        self.aforo = array("i", [0]) * doble
+        self.estado = array("b", [0]) * doble
+        self.version = 0  # Total de registros agregados desde que arrancó
+        self.desde = 0    # Versión del primer registro que vale (ver reiniciar)
+
+    def __len__(self):
+        return min(self.version - self.desde, self.capacidad)
+
+    # Vacío, pero numerando desde `version` (lo usa el modo "web" de nucleo.py
+    # para seguir la misma numeración que el proceso de ingesta). Lo que
+    # quedó en los arreglos ya no cuenta: si la ingesta manda menos filas que
+    # las que teníamos, no se mezclan con registros viejos ni con ceros
+    def reiniciar(self, version=0):
+        self.version = self.desde = version
+
+    def agregar(self, ts, personas, aforo, estado):
+        i = self.version % self.capacidad
+        j = i + self.capacidad
+        self.ts[i] = self.ts[j] = ts
+        self.personas[i] = self.personas[j] = personas
+        self.aforo[i] = self.aforo[j] = aforo
+        self.estado[i] = self.estado[j] = estado
+        self.version += 1
+
+    # Vista (sin copia) de los últimos n registros, del más viejo al más nuevo.
+    # Ojo: la vista apunta al buffer; si el hilo de ingesta sigue agregando,
+    # hay que leerla (o convertirla con .tolist()) bajo el mismo candado.
+    def ultimos(self, n):
+        n = max(0, min(n, len(self)))
+        fin = self.version % self.capacidad + self.capacidad
+        inicio = fin - n
+        return Columnas(
+            memoryview(self.ts)[inicio:fin],
+            memoryview(self.personas)[inicio:fin],
+            memoryview(self.aforo)[inicio:fin],
+            memoryview(self.estado)[inicio:fin],
+        )
@@ -0,0 +1,32 @@
+# ingesta.py
+# ==========================================
+# PROCESO DE INGESTA (PARA VARIOS PROCESOS WEB)
+# ==========================================
+# Es el ÚNICO que abre los Arduinos, lleva la cuenta y escribe la bitácora.
+# Cada foto queda en memoria compartida (ver compartido.py) y los procesos
+# web (AFORO_ROL=web) la leen de ahí, así se pueden levantar varios:
+#   export AFORO_CLAVE_ORDENES=...   (la misma para todos)
+#   python ingesta.py
+#   AFORO_ROL=web gunicorn -w 4 --threads 50 app:server
+import signal
+import sys
+import time
+import nucleo
+
+if __name__ == "__main__":
+    if not nucleo.CLAVE_ORDENES:
+        # Sin clave cualquiera en la máquina podría cambiar el aforo o el modo
+        sys.exit("Falta AFORO_CLAVE_ORDENES (la misma en la ingesta y en los procesos web), "
+                 "ej: AFORO_CLAVE_ORDENES=$(python -c 'import secrets; print(secrets.token_hex(16))')")
+    nucleo.ROL = "ingesta"
+    # Con SIGTERM (systemd, docker stop...) también se cierra bien: así corren
+    # los atexit, que guardan lo pendiente de la bitácora y sueltan la memoria
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    nucleo.iniciar()
+    print(f"Ingesta lista: memoria '{nucleo.NOMBRE_PIZARRA}', órdenes en "
+          f"{nucleo.DIRECCION_ORDENES[0]}:{nucleo.DIRECCION_ORDENES[1]}")
+    try:
+        while True:
+            time.sleep(3600) # El trabajo lo hacen los hilos de nucleo
+    except KeyboardInterrupt:
+        pass
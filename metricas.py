@@ -0,0 +1,256 @@
+# metricas.py
+# ==========================================
+# MÉTRICAS (/metrics) Y PERFILADOR
+# ==========================================
+# Para ver POR QUÉ se atrasa el dashboard: cuántas líneas llegan por
+# puerta, cuántas son basura, cuánto espera cada evento en la cola, cuánto
+# tarda update(), cuántos bytes se mandan, cuántos clientes hay...
+# Se expone en formato texto de Prometheus en /metrics (sin dependencias).
+#
+# Casi todo se lee recién cuando alguien pide /metrics (de los contadores
+# que ya llevan puertas.py, nucleo.py, tiempo_real.py...), así que medir no
+# le cuesta nada al camino caliente. Lo que sí cuesta algo es opcional:
+#   AFORO_METRICAS_TIEMPOS=1 -> histogramas de tiempo por etapa:
+#       parseo -> espera_cola -> estado -> publicar -> callback -> respuesta_dash
+#   AFORO_PERFILADOR=1 -> cada 5 ms mira en qué función está el hilo de
+#       ingesta, el de cada puerta y quien esté en update(); se lee en
+#       /debug/perfil (formato "pilas colapsadas" para flamegraph/speedscope)
+# Apagados, los decoradores devuelven la función tal cual: costo cero.
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+TIEMPOS = os.environ.get("AFORO_METRICAS_TIEMPOS", "") == "1"
+PERFILADOR = os.environ.get("AFORO_PERFILADOR", "") == "1"
+
+
+# ==========================================
+# 1. HISTOGRAMAS
+# ==========================================
+class Histograma:
+    # Segundos: de 50 µs a 2.5 s
+    LIMITES = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self, nombre, ayuda, etiqueta, limites=LIMITES):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiqueta = etiqueta
+        self.limites = limites
+        self._series = {}  # valor de la etiqueta -> [cubetas..., +Inf, suma]
+        self._candado = threading.Lock()
+
+    def observar(self, valor, etiqueta):
+        with self._candado:
+            serie = self._series.get(etiqueta)
+            if serie is None:
+                serie = self._series[etiqueta] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[bisect_left(self.limites, valor)] += 1
+            serie[-1] += valor
+
+    def lineas(self):
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} histogram"
+        with self._candado:
+            series = {k: list(v) for k, v in self._series.items()}
+        for valor, serie in sorted(series.items()):
+            etiqueta = f'{self.etiqueta}="{valor}"'
+            acumulado = 0
+            for limite, n in zip(self.limites + ("+Inf",), serie):
+                acumulado += n
+                yield f'{self.nombre}_bucket{{{etiqueta},le="{limite}"}} {acumulado}'
+            yield f"{self.nombre}_sum{{{etiqueta}}} {serie[-1]:.6f}"
+            yield f"{self.nombre}_count{{{etiqueta}}} {acumulado}"
+
+
+etapas = Histograma("aforo_etapa_segundos", "Tiempo por etapa (serial -> estado -> web)", "etapa")
+tam_respuestas = Histograma("aforo_dash_respuesta_bytes", "Tamaño de cada respuesta de callback de Dash", "ruta",
+                            limites=(256, 1024, 4096, 16384, 65536, 262144, 1048576))
+
+
+# Anota cuánto tardó una etapa que empezó en `desde` (time.perf_counter()).
+# Quien la llama revisa TIEMPOS antes, para no gastar ni en el perf_counter().
+def etapa(nombre, desde):
+    etapas.observar(time.perf_counter() - desde, nombre)
+
+
+# Decorador: mide cada llamada como la etapa `nombre` (si TIEMPOS está apagado, no hace nada)
+def medir(nombre):
+    def decorador(funcion):
+        if not TIEMPOS:
+            return funcion
+
+        @functools.wraps(funcion)
+        def medida(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                etapas.observar(time.perf_counter() - t0, nombre)
+        return medida
+    return decorador
+
+
+# ==========================================
+# 2. LO QUE SE LEE AL PEDIR /metrics
+# ==========================================
+# Cada módulo registra una función que devuelve una lista de
+# (nombre, tipo, ayuda, [(etiquetas, valor), ...]). Se llama solo al exponer.
+_recolectores = []
+
+
+def registrar(recolector):
+    _recolectores.append(recolector)
+    return recolector
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    partes = []
+    for clave, valor in etiquetas.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"')
+        partes.append(f'{clave}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+# Todo en formato texto de Prometheus (version=0.0.4)
+def exponer():
+    lineas = []
+    for recolector in _recolectores:
+        try:
+            familias = recolector()
+        except Exception as e:
+            lineas.append(f"# error en {recolector.__name__}: {e}")
+            continue
+        for nombre, tipo, ayuda, muestras in familias:
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in muestras:
+                lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+    if TIEMPOS:
+        lineas.extend(etapas.lineas())
+        lineas.extend(tam_respuestas.lineas())
+    return "\n".join(lineas) + "\n"
+
+
+# Respuestas de Dash: cuántas, cuántos bytes y (con TIEMPOS) cuánto tardó cada
+# una entera, o sea callback + pasarlo a JSON + mandarlo
+_dash = {"respuestas": 0, "bytes": 0}
+
+
+@registrar
+def _recolectar_dash():
+    return [
+        ("aforo_dash_respuestas_total", "counter", "Respuestas de callbacks de Dash", [({}, _dash["respuestas"])]),
+        ("aforo_dash_bytes_total", "counter", "Bytes mandados por callbacks de Dash", [({}, _dash["bytes"])]),
+    ]
+
+
+def instrumentar_flask(server, rutas=("/_dash-update-component",)):
+    from flask import g, request
+
+    @server.before_request
+    def _inicio():
+        if TIEMPOS and request.path in rutas:
+            g.metricas_t0 = time.perf_counter()
+
+    @server.after_request
+    def _fin(respuesta):
+        if request.path in rutas:
+            tam = respuesta.calculate_content_length() or 0
+            _dash["respuestas"] += 1
+            _dash["bytes"] += tam
+            if TIEMPOS and "metricas_t0" in g:
+                etapa("respuesta_dash", g.metricas_t0)
+                tam_respuestas.observar(tam, request.path)
+        return respuesta
+
+
+# ==========================================
+# 3. PERFILADOR POR MUESTREO (opcional)
+# ==========================================
+# Cada `intervalo` segundos copia la pila de los hilos anotados y cuenta
+# cuántas veces se vio cada pila. No frena a nadie: solo mira.
+class Perfilador:
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self.hilos = Counter()  # ident del hilo -> cuántas veces está anotado ahora
+        self.pilas = Counter()
+        self.muestras = 0
+        self._candado = threading.Lock()
+        threading.Thread(target=self._muestrear, name="perfilador", daemon=True).start()
+
+    def _muestrear(self):
+        while True:
+            time.sleep(self.intervalo)
+            marcos = sys._current_frames()
+            with self._candado:
+                self.muestras += 1
+                for ident in list(self.hilos):
+                    marco = marcos.get(ident)
+                    if marco is None:
+                        # El hilo terminó (ej. el lector de una puerta que se
+                        # desenchufó): se deja de muestrear
+                        del self.hilos[ident]
+                    else:
+                        self.pilas[colapsar(marco)] += 1
+
+    def anotar(self, ident):
+        with self._candado:
+            self.hilos[ident] += 1
+
+    def quitar(self, ident):
+        with self._candado:
+            self.hilos[ident] -= 1
+            if self.hilos[ident] <= 0:
+                del self.hilos[ident]
+
+    # "archivo:funcion;archivo:funcion N" por pila (de afuera hacia adentro),
+    # la más vista primero. Sin el nombre del hilo: Flask abre uno por
+    # petición y cada pila saldría repartida en cientos de renglones
+    def texto(self, reiniciar=False):
+        with self._candado:
+            pilas = self.pilas.most_common()
+            if reiniciar:
+                self.pilas.clear()
+        return "".join(f"{pila} {n}\n" for pila, n in pilas)
+
+
+def colapsar(marco):
+    partes = []
+    while marco is not None:
+        codigo = marco.f_code
+        partes.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        marco = marco.f_back
+    partes.reverse()
+    return ";".join(partes)
+
+
+perfilador = Perfilador() if PERFILADOR else None
+
+
+# Decorador: mientras la función corre, su hilo entra en el muestreo
+def perfilar(funcion):
+    if perfilador is None:
+        return funcion
+
+    @functools.wraps(funcion)
+    def perfilada(*args, **kwargs):
+        ident = threading.get_ident()
+        perfilador.anotar(ident)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            perfilador.quitar(ident)
+    return perfilada
+
+
+# Para hilos que viven hasta que se cierran (ingesta, lectores de puertas):
+# cuando terminan, el perfilador los saca solo
+def perfilar_hilo():
+    if perfilador is not None:
+        perfilador.anotar(threading.get_ident())
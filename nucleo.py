@@ -0,0 +1,837 @@
+# nucleo.py
+# ==========================================
+# EL NÚCLEO: CONEXIÓN, ESTADO Y LECTURA DEL ARDUINO
+# ==========================================
+# Todo lo que NO es dibujar: buscar el Arduino, escucharlo (o simularlo),
+# llevar la cuenta y avisar los cambios. Lo usan el dashboard de Dash
+# (app.py) y el servidor ligero (servidor_ligero.py), así que aquí no se
+# importa ni Dash ni Plotly.
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+import metricas
+import alertas as reglas_alertas
+# Ojo: numpy (analitica) se importa acá y no en el hilo de arranque. Si se
+# importa en un hilo mientras Plotly lo busca en otro, Plotly lo ve a medio cargar.
+from analitica import Resumenes
+from bitacora import Bitacora, consultar_resumen
+from compartido import Pizarra, atender_ordenes, ordenar
+from historial import HistorialCircular
+from ocupacion import EstadoOcupacion, Foto, ESTADO_NORMAL, ESTADO_COLA, ESTADO_LLENO
+from pronostico import DIAS, Pronostico, leer_movimientos
+from protocolo import interpretar_texto
+from puertas import Puerta
+from tiempo_real import publicar, avisar
+
+# Quién hace qué (ver compartido.py e ingesta.py):
+#   "todo"    -> un solo proceso lee los Arduinos y sirve la web (como siempre)
+#   "ingesta" -> solo lee los Arduinos y deja cada foto en memoria compartida
+#   "web"     -> solo sirve: copia la foto de la memoria compartida y le pasa
+#                las órdenes (aforo, puerto, modo) al proceso de ingesta.
+#                Puede haber todos los procesos "web" que hagan falta.
+ROL = os.environ.get("AFORO_ROL", "todo")
+NOMBRE_PIZARRA = os.environ.get("AFORO_PIZARRA", "aforo")
+DIRECCION_ORDENES = ("127.0.0.1", int(os.environ.get("AFORO_PUERTO_ORDENES", "8049")))
+# Sin valor por defecto: la ingesta no arranca sin clave (ver ingesta.py), y
+# los procesos web tienen que tener la misma
+CLAVE_ORDENES = os.environ.get("AFORO_CLAVE_ORDENES", "").encode()
+FILAS_COMPARTIDAS = 500   # Registros del historial que viajan en cada foto
+INTERVALO_ESPEJO = 0.02   # Cada cuánto mira un proceso "web" si hay foto nueva
+# Con varios procesos web, cada pestaña tiene que hablar siempre con el
+# mismo: sin "sticky sessions" solo sirve WebSocket directo (sin long-polling)
+OPCIONES_SOCKET = '{transports: ["websocket"]}' if ROL == "web" else ""
+pizarra = None
+_puertas_remotas = []     # Desglose por puerta tal como lo mandó la ingesta
+
+# Velocidades a probar en cada puerto, en orden: 9600 es Sensores.ino en
+# texto, 115200 con PROTOCOLO_BINARIO (ver puertas.py y protocolo.py)
+BAUDIOS = [int(b) for b in os.environ.get("AFORO_BAUDIOS", "9600,115200").split(",")]
+modo_simulado = True      # Asumimos simulado hasta demostrar lo contrario
+# La cuenta de verdad (la restaurada de la bitácora o la última del modo
+# real) mientras se simula: la simulación juega con ocupacion.foto y al
+# volver a modo real se pone esta de nuevo
+_cuenta_real = 0
+# Mientras se simula, cada cuántos segundos se vuelve a buscar un Arduino
+# (si aparece uno, se pasa solo a modo real). Se apaga si alguien elige
+# "Modo Simulado" a mano, y se vuelve a prender con "Modo Real".
+# 0 = buscar solo al arrancar.
+INTERVALO_BUSQUEDA = float(os.environ.get("AFORO_INTERVALO_BUSQUEDA", "5"))
+buscar_solo = True
+_arranque = None          # El hilo que arranca todo (ver iniciar)
+# Conectar/desconectar lo pueden pedir la web y la búsqueda de fondo a la vez
+_candado_conexion = threading.RLock()
+_despertar = threading.Event() # Despierta a vigilar_puertos (ej. se desenchufó una puerta)
+ESPERA_VIGILANCIA = 60    # Lo más que duerme vigilar_puertos sin revisar nada
+# Una Puerta (ver puertas.py) por cada Arduino: puerto -> Puerta. Se reemplaza
+# entero al conectar, así quien lo recorre nunca lo ve a medio cambiar
+puertas = {}
+_eventos = queue.Queue()   # (hora, puerta, [eventos]) de TODAS las puertas, en orden de llegada
+cambios_puertas = 0       # Sube cuando cambia el desglose por puerta (así la web no lo redibuja de gusto)
+# Puertos elegidos a mano (tienen prioridad sobre la búsqueda). Varios van
+# separados por coma: AFORO_PUERTOS=COM3,COM4 o "COM3, COM4" desde la web
+puerto_configurado = os.environ.get("AFORO_PUERTOS") or None
+
+# El estado del sistema (gente, aforo, alerta de cola, pop-up) vive en una
+# Foto inmutable con versión (ver ocupacion.py). Para leerlo: foto_actual()
+# UNA vez y usar esa foto; para cambiarlo: ocupacion.cambiar(...)
+COLA_TIMEOUT = float(os.environ.get("AFORO_COLA_TIMEOUT", "1.5"))
+ocupacion = EstadoOcupacion(COLA_TIMEOUT, personas=0, aforo=50)
+
+# Aquí guardamos la data para la gráfica y la tabla. Cuántos registros caben
+# se puede subir (ej. horas de datos) sin que cada tick cueste más.
+# historial.version sube en 1 con cada registro (sirve para saber qué le falta a cada pestaña)
+CAPACIDAD_HISTORIAL = int(os.environ.get("AFORO_CAPACIDAD_HISTORIAL", "10000"))
+historial = HistorialCircular(CAPACIDAD_HISTORIAL)
+_candado_historial = threading.Lock()
+
+# Bitácora en disco para no perder la cuenta al reiniciar ("" = desactivada)
+RUTA_BITACORA = os.environ.get("AFORO_BITACORA", "aforo.db")
+bitacora = None
+
+# Pronóstico de ocupación y "se llena en" (ver pronostico.py). Lo alimenta
+# la ingesta con cada entrada/salida real; al arrancar aprende de la bitácora.
+pronostico = Pronostico()
+INTERVALO_PRONOSTICO = 5  # Aunque no pase nada, cada 5 s se pronostica de nuevo (el reloj avanza)
+_pronostico = (0, None, None) # (cuándo, (gente, aforo), último pronóstico)
+_pronostico_remoto = None  # En el modo "web": el que mandó la ingesta
+cambios_pronostico = 0    # Sube cuando cambia el pronóstico (va en el ETag de /api/estado)
+_candado_pronostico = threading.Lock() # Que dos peticiones no lo recalculen a la vez
+
+# Alertas (ver alertas.py): las reglas se revisan acá, con cada evento que
+# llega, y no en la web. Solo existen en la ingesta ("todo" o "ingesta").
+# Si no existe el archivo se usan las reglas de siempre; vacío = sin alertas.
+RUTA_ALERTAS = os.environ.get("AFORO_ALERTAS", "alertas.json")
+alertas = None            # El Motor (lo arma arrancar)
+despachador = None        # El hilo que manda los avisos
+
+# Lo último que se publicó: (versión de la foto, cambios de puertas,
+# pronóstico). Si no cambió nada, no hace falta ni armar el delta.
+_publicado = None
+
+# Nombres que usa la vista ligera (templates/index.html) para cada estado
+ESTADOS_LIGERO = {ESTADO_NORMAL: "Normal", ESTADO_COLA: "Moderado", ESTADO_LLENO: "Crítico"}
+
+# El historial guarda el estado como número: 0 normal, 1 cola, 2 lleno
+ESTADOS_POR_CODIGO = (ESTADO_NORMAL, ESTADO_COLA, ESTADO_LLENO)
+CODIGO_DE_ESTADO = {texto: codigo for codigo, texto in enumerate(ESTADOS_POR_CODIGO)}
+
+# ==========================================
+# 1. BUSCAR Y CONECTAR EL ARDUINO
+# ==========================================
+# Función para jugar al detective y encontrar los Arduinos (uno por puerta).
+# Con cualquiera=True, si nada suena a Arduino, prueba el primer puerto que haya.
+# En Windows/USB lento comports() puede tardar segundos: nunca se llama desde la web.
+def buscar_puertos_arduino(cualquiera=True, en_silencio=False):
+    import serial.tools.list_ports # Se importa recién aquí (pip install pyserial)
+    if not en_silencio:
+        print("Buscando Arduinos conectados...")
+    puertos = list(serial.tools.list_ports.comports())
+
+    # Palabras clave comunes en los drivers de Arduino/Clones
+    identificadores = ["Arduino", "CH340", "USB SERIAL", "USB-SERIAL"]
+
+    encontrados = []
+    for p in puertos:
+        # Imprimimos qué encontramos para depurar
+        if not en_silencio:
+            print(f"   -> Encontrado: {p.device} - {p.description}")
+
+        # Si la descripción suena a Arduino, nos lo quedamos
+        if any(ident.lower() in p.description.lower() for ident in identificadores):
+            encontrados.append(p.device)
+
+    # Si no encontramos nada obvio, pero hay puertos, probamos el primero (a suerte o verdad)
+    if cualquiera and not encontrados and puertos:
+        encontrados.append(puertos[0].device)
+
+    return encontrados
+
+# "COM3, COM4" o ["COM3", "COM4"] -> ["COM3", "COM4"]
+def lista_puertos(puertos):
+    if not puertos:
+        return []
+    if isinstance(puertos, str):
+        puertos = puertos.split(",")
+    return [p.strip() for p in puertos if p and p.strip()]
+
+def puertos_conectados():
+    return [nombre for nombre, puerta in puertas.items() if puerta.activa]
+
+# Para la barra lateral y la vista ligera: "simulado", "conectado",
+# "reconectando" (se perdió alguna puerta) o "desconectado" (todas).
+# Sale del resumen por puerta, así en el modo "web" da lo mismo que en la ingesta.
+def estado_conexion():
+    if modo_simulado:
+        return "simulado"
+    lista = resumen_puertas()
+    vivas = sum(1 for p in lista if p["conectada"])
+    if lista and vivas == len(lista):
+        return "conectado"
+    return "reconectando" if vivas else "desconectado"
+
+# Abre cada puerto pedido (los que ya estaban abiertos se quedan como están,
+# con su cuenta) y cierra los que ya no se piden. Si no se pudo abrir
+# ninguno, deja todo como estaba.
+def conectar(puertos):
+    with _candado_conexion:
+        return _conectar(puertos)
+
+def _conectar(puertos):
+    global puertas, modo_simulado, cambios_puertas
+    pedidas = {}
+    for nombre in lista_puertos(puertos):
+        puerta = puertas.get(nombre) or Puerta(nombre, BAUDIOS)
+        if not puerta.activa:
+            try:
+                puerta.abrir()
+            except Exception as e:
+                print(f"Se encontró el puerto {nombre} pero no pude entrar. (Error: {e})")
+                avisar("serial_error", {"port": nombre, "error": str(e)})
+                continue
+        pedidas[nombre] = puerta
+
+    if not pedidas:
+        return False
+
+    for nombre, puerta in puertas.items():
+        if nombre not in pedidas:
+            puerta.cerrar()
+            if alertas:
+                alertas.olvidar(nombre)
+    for nombre, puerta in pedidas.items():
+        if not puerta.activa:
+            if alertas:
+                # El silencio se cuenta desde que se abrió (aunque nunca mande nada)
+                alertas.actividad(time.time(), nombre)
+            puerta.escuchar(_eventos)
+            print(f"¡Éxito! Conectado al {nombre}")
+            avisar("serial_status", {"connected": True, "port": nombre})
+    puertas = pedidas
+    with ocupacion.escribiendo():
+        if modo_simulado:
+            # Lo que inventó la simulación no cuenta: se sigue con la cuenta real
+            ocupacion.cambiar(personas=_cuenta_real, ts_cola=0)
+        modo_simulado = False
+    cambios_puertas += 1
+    publicar_estado()
+    return True
+
+def desconectar():
+    global cambios_puertas
+    for puerta in puertas.values():
+        puerta.cerrar()
+        if alertas:
+            alertas.olvidar(puerta.nombre)
+    cambios_puertas += 1
+
+# Elegir simulado apaga la búsqueda de fondo (si no, volvería solo a modo real)
+def pasar_a_simulado():
+    global modo_simulado, buscar_solo, _cuenta_real
+    with _candado_conexion:
+        desconectar()
+        with ocupacion.escribiendo() as foto:
+            if not modo_simulado:
+                _cuenta_real = foto.personas
+            modo_simulado = True
+        buscar_solo = False
+    avisar("serial_status", {"connected": False})
+    publicar_estado()
+
+# "Real" intenta conectar (puertos elegidos a mano o los que encuentre el detective)
+def cambiar_modo(modo):
+    global buscar_solo
+    if ROL == "web":
+        return bool(ordenar_ingesta("modo", modo))
+    if modo != "Real":
+        pasar_a_simulado()
+        return True
+    buscar_solo = True # Si ahora no hay ninguno, se sigue buscando de fondo
+    _despertar.set()
+    puertos = lista_puertos(puerto_configurado) or buscar_puertos_arduino()
+    if not puertos:
+        print("No se encontró ningún Arduino conectado.")
+        avisar("serial_error", {"error": "No se encontró ningún Arduino"})
+        return False
+    return conectar(puertos)
+
+# Guardar los puertos elegidos desde la web ("COM3" o "COM3, COM4"; None = volver a buscar solito)
+def configurar_puerto(puerto):
+    global puerto_configurado
+    if puerto is not None and not isinstance(puerto, str):
+        raise ValueError(f"El puerto debe ser un texto (llegó {puerto!r})")
+    if ROL == "web":
+        return bool(ordenar_ingesta("puerto", puerto))
+    puerto_configurado = puerto
+    _despertar.set() # Con None, vigilar_puertos vuelve a buscar solo
+    if puerto and not modo_simulado:
+        return conectar(puerto)
+    return True
+
+# Devuelve el aforo que quedó vigente. Se revisa acá y no en cada entrada:
+# puede venir de la web, de la API o de un proceso web por JSON
+def cambiar_aforo(nuevo):
+    if isinstance(nuevo, bool) or not isinstance(nuevo, int) or nuevo < 1:
+        raise ValueError(f"El aforo debe ser un entero mayor a 0 (llegó {nuevo!r})")
+    if ROL == "web":
+        return ordenar_ingesta("aforo", nuevo) or ocupacion.foto.aforo
+    foto = ocupacion.cambiar(aforo=nuevo)
+    if bitacora:
+        # En simulación la bitácora se queda con la cuenta real, no con la inventada
+        personas = _cuenta_real if modo_simulado else foto.personas
+        bitacora.registrar("AFORO", personas, nuevo, f"AFORO_MAXIMO: {nuevo}")
+    if alertas and not modo_simulado:
+        alertas.ocupacion(time.time(), foto.personas, foto.aforo)
+    publicar_estado()
+    return foto.aforo
+
+# ==========================================
+# 2. CALCULAR Y PUBLICAR EL ESTADO
+# ==========================================
+# La foto vigente: quien lee la toma una vez y usa esa (sin candado)
+def foto_actual():
+    return ocupacion.foto
+
+# Estado (Verde, Amarillo, Rojo); lo mantiene al día quien escribe
+def calcular_estado(foto=None):
+    return (foto or ocupacion.foto).estado
+
+def porcentaje_ocupacion(foto=None):
+    foto = foto or ocupacion.foto
+    return (foto.personas / foto.aforo) * 100 if foto.aforo > 0 else 0
+
+# Entradas / salidas / neto de cada puerta
+def resumen_puertas():
+    if ROL == "web":
+        return _puertas_remotas
+    return [puerta.resumen() for puerta in puertas.values()]
+
+# Foto del estado que viaja por Socket.IO
+def estado_publico(foto=None):
+    foto = foto or ocupacion.foto
+    return {
+        "personas": foto.personas,
+        "aforo_maximo": foto.aforo,
+        "porcentaje": round(porcentaje_ocupacion(foto), 1),
+        "estado": ESTADOS_LIGERO[foto.estado],
+        "modo": "Simulado" if modo_simulado else "Real",
+        "serial_port": "" if modo_simulado else ", ".join(puertos_conectados()),
+        "conexion": estado_conexion(),
+        "puertas": resumen_puertas(),
+        "pronostico": pronostico_vigente(foto),
+    }
+
+# Sirve de ETag: si no cambió, el estado público es el mismo
+def version_publica(foto=None):
+    return f"{(foto or ocupacion.foto).version}-{cambios_puertas}-{cambios_pronostico}"
+
+# Gente en 15 / 30 / 60 min, entradas y salidas por minuto y minutos hasta
+# llenarse (ver Pronostico.pronosticar). None en simulación o si todavía no
+# hubo ningún evento real. Se rearma si cambió la gente o el aforo (como
+# mucho una vez por segundo: con mucho tráfico no se pronostica en cada
+# lote) o cada INTERVALO_PRONOSTICO segundos.
+def pronostico_vigente(foto=None):
+    global _pronostico, cambios_pronostico
+    if ROL == "web":
+        return _pronostico_remoto
+    if modo_simulado:
+        return None
+    foto = foto or ocupacion.foto
+    # Se publica como una tupla nueva (igual que las Fotos): quien solo lee
+    # no espera; el candado es para no recalcular ni contar cambios dos veces
+    with _candado_pronostico:
+        ahora = time.time()
+        cuando, clave, anterior = _pronostico
+        if ahora - cuando >= INTERVALO_PRONOSTICO or (ahora - cuando >= 1 and clave != (foto.personas, foto.aforo)):
+            nuevo = pronostico.pronosticar(ahora, foto.personas, foto.aforo)
+            if nuevo != anterior:
+                cambios_pronostico += 1
+            _pronostico = (ahora, (foto.personas, foto.aforo), nuevo)
+        return _pronostico[2]
+
+def anotar_historial(foto):
+    with _candado_historial:
+        historial.agregar(time.time(), foto.personas, foto.aforo, CODIGO_DE_ESTADO[foto.estado])
+
+# Los últimos n registros (columnas como listas) junto con la versión,
+# leídos a la vez sin que el hilo de ingesta meta un registro entre medio
+def leer_historial(n):
+    with _candado_historial:
+        cols = historial.ultimos(n)
+        return {nombre: vista.tolist() for nombre, vista in cols._asdict().items()}, historial.version
+
+# Una página del historial para la tabla: la 0 son los últimos `tam`
+# registros, la 1 los `tam` anteriores, etc. (cada una del más viejo al más
+# nuevo). Solo se copian esas filas. Devuelve (columnas, total de registros).
+def leer_pagina(pagina, tam):
+    with _candado_historial:
+        total = len(historial)
+        hasta = min((pagina + 1) * tam, total)
+        fin = max(0, hasta - pagina * tam)
+        cols = historial.ultimos(hasta)
+        return {nombre: vista[:fin].tolist() for nombre, vista in cols._asdict().items()}, total
+
+# Publica los cambios y, si cambió la gente o el estado, lo anota en el historial.
+# Se llama desde el hilo de ingesta, así el historial no se duplica por pestaña.
+@metricas.medir("publicar")
+def publicar_estado():
+    global _publicado
+    foto = ocupacion.refrescar() # Por si la alerta de COLA ya caducó
+    pronostico_vigente(foto)
+    marca = (foto.version, cambios_puertas, cambios_pronostico)
+    if marca == _publicado:
+        return None # Nada nuevo: ni siquiera se arma el delta
+    _publicado = marca
+    delta = publicar(estado_publico(foto))
+    if delta and ("personas" in delta or "estado" in delta):
+        anotar_historial(foto)
+    if pizarra:
+        compartir(foto)
+    return delta
+
+# ==========================================
+# 2b. VARIOS PROCESOS (ver compartido.py)
+# ==========================================
+# Proceso de ingesta: deja la foto, el desglose por puerta y lo último del
+# historial en la memoria compartida para los procesos "web"
+def compartir(foto):
+    datos = {
+        "foto": list(foto),
+        "puertas": resumen_puertas(),
+        "cambios_puertas": cambios_puertas,
+        "pronostico": pronostico_vigente(foto),
+        "cambios_pronostico": cambios_pronostico,
+        "modo_simulado": modo_simulado,
+        "puerto_configurado": puerto_configurado,
+    }
+    with _candado_historial:
+        datos["historial"] = historial.version
+        pizarra.escribir(datos, historial.ultimos(FILAS_COMPARTIDAS))
+
+# Proceso "web": copia la última foto de la pizarra a las variables de este
+# proceso (así el resto de la app no se entera de que vive en otro lado) y
+# le avisa a sus clientes de Socket.IO. Devuelve la secuencia copiada.
+def copiar_pizarra():
+    global cambios_puertas, modo_simulado, puerto_configurado, _puertas_remotas, _pronostico_remoto, cambios_pronostico
+    leida = pizarra.leer()
+    if leida is None:
+        return None
+    secuencia, datos, cols = leida
+    with _candado_historial:
+        n = len(cols.ts)
+        nuevos = datos["historial"] - historial.version
+        if nuevos < 0 or nuevos > n:
+            # Recién arrancamos, nos quedamos muy atrás o la ingesta se reinició
+            historial.reiniciar(datos["historial"] - n)
+            nuevos = n
+        for fila in zip(*(col[n - nuevos:] for col in cols)):
+            historial.agregar(*fila)
+    _puertas_remotas = datos["puertas"]
+    cambios_puertas = datos["cambios_puertas"]
+    _pronostico_remoto = datos["pronostico"]
+    cambios_pronostico = datos["cambios_pronostico"]
+    modo_simulado = datos["modo_simulado"]
+    puerto_configurado = datos["puerto_configurado"]
+    # La misma versión que en la ingesta: el ETag de /api/estado da igual en todos los procesos
+    foto = ocupacion.reemplazar(Foto(*datos["foto"]))
+    publicar(estado_publico(foto))
+    return secuencia
+
+def espejar():
+    global pizarra
+    while pizarra is None:
+        try:
+            pizarra = Pizarra(NOMBRE_PIZARRA)
+        except FileNotFoundError:
+            print(f"Esperando al proceso de ingesta (memoria '{NOMBRE_PIZARRA}')...")
+            time.sleep(1)
+    copiada = None
+    while True:
+        try:
+            # Mirar la secuencia son 8 bytes: solo se copia si hay algo nuevo
+            if pizarra.secuencia() != copiada:
+                copiada = copiar_pizarra() or copiada
+        except Exception as e:
+            print(f"Error copiando la foto compartida: {e}")
+        time.sleep(INTERVALO_ESPEJO)
+
+# Lo que un proceso "web" le pide a la ingesta. None si no contestó.
+def ordenar_ingesta(nombre, *args):
+    try:
+        return ordenar(DIRECCION_ORDENES, CLAVE_ORDENES, nombre, *args)
+    except Exception as e:
+        print(f"No se pudo hablar con el proceso de ingesta ({nombre}): {e}")
+        return None
+
+# ==========================================
+# 3. EL CEREBRO QUE ESCUCHA (HILO DE FONDO)
+# ==========================================
+# Aplica un evento del Arduino (ver protocolo.py) al estado.
+# Con puerta, el evento mueve la cuenta del local en +1 / -1 (ver puertas.py);
+# sin puerta (una sola fuente, como en los benchmarks) el número ES la cuenta.
+# Devuelve qué fue ("ENTRADA", "SALIDA", "COLA") o None si no cambió nada.
+def procesar_evento(evento, puerta=None):
+    tipo = None
+    cambios = {}
+
+    with ocupacion.escribiendo() as foto:
+        if puerta is not None:
+            paso = puerta.movimiento(evento)
+            nuevo_valor = max(0, foto.personas + paso) if paso else None
+        else:
+            nuevo_valor = evento.contador
+
+        # --- CASO A: El Arduino nos dice que alguien entró o salió ---
+        if nuevo_valor is not None:
+            es_entrada = evento.tipo == "ENTRADA" or (evento.tipo != "SALIDA" and nuevo_valor > foto.personas)
+            tipo = "ENTRADA" if es_entrada else "SALIDA"
+
+            # Si el número cambió, preparamos la notificación
+            if nuevo_valor != foto.personas:
+                if es_entrada:
+                    # Si avanza la COLA, reseteamos la alerta de cola
+                    cambios.update(mensaje="🚶 ENTRADA DETECTADA", tipo_evento="entrada", ts_cola=0)
+                else:
+                    cambios.update(mensaje="🔙 SALIDA DETECTADA", tipo_evento="salida")
+                cambios["ts_cambio"] = time.time() # ¡Hora exacta del suceso!
+                cambios["personas"] = nuevo_valor
+
+        # --- CASO B: El sensor detecta que alguien se quedó parado (COLA) ---
+        if evento.tipo == "COLA":
+            cambios["ts_cola"] = time.time()
+            tipo = "COLA"
+
+        # Todo de una: nadie ve la cuenta nueva con el aviso viejo
+        if cambios:
+            ocupacion.cambiar(**cambios)
+
+    return tipo
+
+# Lo mismo, para una línea de texto ("ENTRADA AFORO: 7"); None si era basura
+def procesar_linea(linea, puerta=None):
+    evento = interpretar_texto(linea)
+    if evento is None:
+        return None
+    return procesar_evento(evento, puerta)
+
+# Sin Arduino inventamos datos aquí (y no en el callback de la web), así la
+# simulación avanza igual con 0 o con 50 pestañas abiertas
+def simular_paso():
+    with ocupacion.escribiendo() as foto:
+        if not modo_simulado:
+            return # Justo se pasó a modo real (ver _conectar)
+        prev = foto.personas
+        # Hacemos que sea más probable que NO pase nada (más ceros) para estabilizar
+        cambio = random.choice([-1, 0, 0, 0, 0, 0, 0, 0, 1])
+        personas = max(0, min(foto.aforo + 5, prev + cambio))
+
+        # Simulamos eventos de notificación
+        if personas > prev:
+            ocupacion.cambiar(personas=personas, ts_cambio=time.time(), mensaje="🚶 ENTRADA SIMULADA", tipo_evento="entrada", ts_cola=0)
+        elif personas < prev:
+            ocupacion.cambiar(personas=personas, ts_cambio=time.time(), mensaje="🔙 SALIDA SIMULADA", tipo_evento="salida")
+        elif random.random() > 0.98:
+            # A veces simulamos que hay cola
+            ocupacion.cambiar(ts_cola=time.time())
+
+# Lo que dejó el hilo de alguna puerta (eventos None = esa puerta se desenchufó)
+def atender_eventos(ts, puerta, eventos):
+    global cambios_puertas
+    if eventos is None:
+        print(f"Se perdió la conexión con {puerta.nombre} (se reintenta en {puerta.reintento_en - time.time():.0f} s)")
+        avisar("serial_status", {"connected": False, "port": puerta.nombre})
+        cambios_puertas += 1
+        _despertar.set() # Que vigilar_puertos se ocupe de reconectarla
+        return
+
+    if metricas.TIEMPOS:
+        # Desde que el hilo de la puerta leyó los bytes hasta que llegamos acá
+        metricas.etapas.observar(time.time() - ts, "espera_cola")
+    if alertas:
+        alertas.actividad(ts, puerta.nombre)
+    for evento in eventos:
+        antes = ocupacion.foto.personas
+        tipo = procesar_evento(evento, puerta)
+        if tipo:
+            cambios_puertas += 1
+            # Solo cuentan los eventos reales (la simulación no ensucia ni la
+            # bitácora ni el pronóstico)
+            foto = ocupacion.foto
+            if tipo != "COLA":
+                pronostico.anotar(ts, max(0, foto.personas - antes), max(0, antes - foto.personas), foto.personas)
+            if alertas:
+                if tipo == "COLA":
+                    alertas.cola(ts)
+                elif foto.personas != antes:
+                    alertas.ocupacion(ts, foto.personas, foto.aforo)
+            if bitacora:
+                bitacora.registrar(tipo, foto.personas, foto.aforo, f"[{puerta.nombre}] {evento.linea}", ts=ts)
+
+# Este hilo corre separado de la web para no congelarla mientras espera datos.
+# Es el ÚNICO que cambia la cuenta: las puertas solo le pasan líneas por la cola.
+# Se puede pasar de simulado a real (y al revés) sin reiniciar.
+def leer_arduino():
+    metricas.perfilar_hilo()
+    while True:
+        if modo_simulado:
+            simular_paso()
+            publicar_estado()
+            time.sleep(0.3) # Mismo ritmo que tenía el viejo intervalo de la web
+            continue
+
+        try:
+            # Dormido hasta que alguna puerta mande algo. Como mucho 0.5 s, así
+            # también se publica cuando la alerta de COLA caduca sola.
+            pendiente = _eventos.get(timeout=0.5)
+        except queue.Empty:
+            publicar_estado()
+            if alertas:
+                alertas.revisar(time.time()) # Lo que vence sin que llegue nada (ej. un sensor mudo)
+            continue
+
+        try:
+            if metricas.TIEMPOS:
+                t0 = time.perf_counter()
+            atender_eventos(*pendiente)
+            # Si llegaron varias de golpe (muchas puertas a la vez), las
+            # atendemos todas y avisamos a los clientes una sola vez
+            while True:
+                try:
+                    pendiente = _eventos.get_nowait()
+                except queue.Empty:
+                    break
+                atender_eventos(*pendiente)
+            if metricas.TIEMPOS:
+                metricas.etapa("estado", t0)
+
+            # Avisamos a los clientes (solo se manda algo si cambió)
+            publicar_estado()
+            if alertas:
+                alertas.revisar(time.time())
+
+        except Exception as e:
+            print(f"Error procesando eventos: {e}")
+
+# Lo que se ve en /metrics (ver metricas.py). Se arma solo cuando alguien lo pide.
+@metricas.registrar
+def _recolectar():
+    foto = ocupacion.foto
+    lista = list(puertas.values())
+    por_puerta = lambda valor: [({"puerta": p.nombre}, valor(p)) for p in lista]
+    return [
+        ("aforo_personas", "gauge", "Personas adentro", [({}, foto.personas)]),
+        ("aforo_capacidad", "gauge", "Aforo máximo configurado", [({}, foto.aforo)]),
+        ("aforo_estado_version", "counter", "Versión de la foto de ocupación", [({}, foto.version)]),
+        ("aforo_modo_simulado", "gauge", "1 si se está simulando", [({}, int(modo_simulado))]),
+        ("aforo_cola_eventos", "gauge", "Lecturas esperando al hilo de ingesta", [({}, _eventos.qsize())]),
+        ("aforo_historial_registros_total", "counter", "Registros agregados al historial", [({}, historial.version)]),
+        ("aforo_bitacora_pendientes", "gauge", "Eventos esperando a guardarse en la bitácora",
+         [({}, bitacora.pendientes() if bitacora else 0)]),
+        ("aforo_puerta_conectada", "gauge", "1 si la puerta está leyendo", por_puerta(lambda p: int(p.activa))),
+        ("aforo_puerta_bytes_total", "counter", "Bytes leídos del serial", por_puerta(lambda p: p.bytes_leidos)),
+        ("aforo_puerta_lineas_total", "counter", "Líneas (o tramas) completas recibidas", por_puerta(lambda p: p.lector.lineas)),
+        ("aforo_puerta_descartadas_total", "counter", "Líneas que no se entendieron (o tramas con el CRC mal)",
+         por_puerta(lambda p: p.lector.descartadas)),
+        ("aforo_puerta_tramas_perdidas_total", "counter", "Tramas que no llegaron (saltos en la secuencia)",
+         por_puerta(lambda p: p.perdidas)),
+        ("aforo_puerta_entradas_total", "counter", "Entradas contadas", por_puerta(lambda p: p.entradas)),
+        ("aforo_puerta_salidas_total", "counter", "Salidas contadas", por_puerta(lambda p: p.salidas)),
+        ("aforo_puerta_colas_total", "counter", "Avisos de COLA", por_puerta(lambda p: p.colas)),
+        ("aforo_puerta_desconexiones_total", "counter", "Veces que se perdió el serial",
+         por_puerta(lambda p: p.desconexiones)),
+        ("aforo_alertas_disparadas_total", "counter", "Alertas disparadas por regla",
+         [({"regla": r.nombre}, alertas.disparadas[r.nombre]) for r in alertas.reglas] if alertas else []),
+        ("aforo_alertas_activas", "gauge", "Alertas disparadas que todavía no se resolvieron",
+         [({}, alertas.activas() if alertas else 0)]),
+        ("aforo_alertas_enviadas_total", "counter", "Avisos que salieron bien, por destino",
+         [({"destino": d}, n) for d, n in despachador.enviadas.items()] if despachador else []),
+        ("aforo_alertas_fallidas_total", "counter", "Avisos que no se pudieron mandar, por destino",
+         [({"destino": d}, n) for d, n in despachador.fallidas.items()] if despachador else []),
+    ]
+
+# La bitácora que se puede leer desde este proceso (None si no hay)
+def ruta_bitacora():
+    if bitacora:
+        return bitacora.ruta
+    if ROL == "web" and RUTA_BITACORA and os.path.exists(RUTA_BITACORA):
+        # La bitácora la escribe la ingesta; desde acá solo se lee
+        return RUTA_BITACORA
+    return None
+
+# Picos, promedios, entradas/salidas, cola y lleno por intervalo (ver analitica.py).
+# Devuelve (nivel usado, filas); sin bitácora no hay nada que consultar.
+def consultar_analitica(nivel, desde, hasta):
+    ruta = ruta_bitacora()
+    if ruta is None:
+        return nivel, []
+    return consultar_resumen(ruta, nivel, desde, hasta)
+
+# Recupera la cuenta, el aforo y el historial reciente de la bitácora
+def restaurar_bitacora():
+    global bitacora, _cuenta_real
+    if not RUTA_BITACORA:
+        return
+    t0 = time.perf_counter()
+    # Los resúmenes (1 min ... 1 día) se van armando a medida que se guarda cada lote
+    bitacora = Bitacora(RUTA_BITACORA, resumenes=Resumenes(COLA_TIMEOUT))
+    atexit.register(bitacora.cerrar) # Que no se pierda lo que quedó en la cola al cerrar
+
+    datos = bitacora.restaurar(CAPACIDAD_HISTORIAL)
+    if not datos:
+        return
+    foto = ocupacion.cambiar(personas=datos["personas"], aforo=datos["aforo"])
+    _cuenta_real = foto.personas
+    with _candado_historial:
+        for ts, tipo, personas, aforo in datos["eventos"]:
+            if personas >= aforo:
+                codigo = CODIGO_DE_ESTADO[ESTADO_LLENO]
+            elif tipo == "COLA":
+                codigo = CODIGO_DE_ESTADO[ESTADO_COLA]
+            else:
+                codigo = CODIGO_DE_ESTADO[ESTADO_NORMAL]
+            historial.agregar(ts, personas, aforo, codigo)
+    print(f"Bitácora restaurada: {foto.personas} personas, aforo {foto.aforo}, "
+          f"{len(datos['eventos'])} eventos en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    # El pronóstico arranca sabiendo cómo es cada hora (las últimas ~4 semanas, de una)
+    t0 = time.perf_counter()
+    movimientos = leer_movimientos(RUTA_BITACORA, time.time() - DIAS * 86400)
+    pronostico.aprender(*movimientos)
+    print(f"Pronóstico: aprendió de {len(movimientos[0])} movimientos en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+# Arranca todo SIN frenar a quien llama (la web tiene que contestar ya):
+# la bitácora, la búsqueda de Arduinos y la conexión corren en un hilo
+# aparte. Mientras tanto se simula; si aparece un Arduino, se pasa solo a
+# modo real. Llamarla otra vez no hace nada.
+def iniciar():
+    global _arranque, historial
+    if _arranque:
+        return _arranque
+    if ROL == "web":
+        # Ni serial ni bitácora: todo viene del proceso de ingesta
+        historial = HistorialCircular(FILAS_COMPARTIDAS)
+        _arranque = threading.Thread(target=espejar, daemon=True)
+    else:
+        _arranque = threading.Thread(target=arrancar, daemon=True)
+    _arranque.start()
+    return _arranque
+
+# Arma el motor de alertas con la cuenta ya restaurada (si ya estaba lleno, avisa)
+def iniciar_alertas():
+    global alertas, despachador
+    if not RUTA_ALERTAS:
+        print("Alertas apagadas (AFORO_ALERTAS vacío)")
+        return
+    try:
+        motor, despachador = reglas_alertas.cargar(RUTA_ALERTAS, COLA_TIMEOUT)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"No se pudieron cargar las alertas de {RUTA_ALERTAS}: {e}")
+        return
+    atexit.register(despachador.cerrar) # Que salgan los avisos que quedaron en la cola
+    foto = ocupacion.foto
+    motor.ocupacion(time.time(), foto.personas, foto.aforo)
+    alertas = motor
+    print(f"Alertas: {len(motor.reglas)} reglas, {len(despachador.destinos)} destinos")
+
+def arrancar():
+    global pizarra
+    restaurar_bitacora()
+    iniciar_alertas()
+    if ROL == "ingesta":
+        pizarra = Pizarra(NOMBRE_PIZARRA, crear=True, filas=FILAS_COMPARTIDAS)
+        atexit.register(pizarra.cerrar)
+        atender_ordenes(DIRECCION_ORDENES, CLAVE_ORDENES,
+                        {"aforo": cambiar_aforo, "puerto": configurar_puerto, "modo": cambiar_modo})
+        compartir(ocupacion.foto)
+
+    # La cuenta ya está restaurada: ahora sí puede empezar a moverse
+    hilo = threading.Thread(target=leer_arduino)
+    hilo.daemon = True # Esto hace que el hilo muera si cierras la app principal
+    hilo.start()
+    vigilar_puertos()
+
+# Reabre las puertas que se desenchufaron, cada una cuando le toca (ver
+# Puerta.reintentar_despues). Al volver, la cuenta sigue desde donde estaba;
+# con tramas binarias además se recupera lo que pasó mientras no estaba.
+def reconectar_puertas():
+    global cambios_puertas
+    for puerta in list(puertas.values()):
+        if puerta.activa or time.time() < puerta.reintento_en:
+            continue
+        with _candado_conexion:
+            # Mientras tanto pudieron pasar a simulado o cambiar los puertos
+            if modo_simulado or puerta.activa or puertas.get(puerta.nombre) is not puerta:
+                continue
+            try:
+                puerta.abrir()
+            except Exception as e:
+                puerta.reintentar_despues()
+                print(f"No se pudo reabrir {puerta.nombre} ({e}); de nuevo en {puerta.reintento_en - time.time():.0f} s")
+                continue
+            puerta.escuchar(_eventos)
+            cambios_puertas += 1
+        print(f"¡Reconectado al {puerta.nombre}!")
+        avisar("serial_status", {"connected": True, "port": puerta.nombre})
+
+# Hot-plug: si aparece un Arduino nuevo se suma como otra puerta. Las que se
+# habían perdido se dejan de lado (lo más probable es que sea la misma placa
+# con otro nombre, COM5 -> COM6); la cuenta que ya aportaron queda.
+def sumar_puertas_nuevas():
+    nuevos = [p for p in buscar_puertos_arduino(cualquiera=False, en_silencio=True) if p not in puertas]
+    if not nuevos:
+        return
+    with _candado_conexion:
+        if modo_simulado or puerto_configurado:
+            return
+        seguir = [nombre for nombre, puerta in puertas.items() if puerta.activa]
+        if conectar(seguir + nuevos):
+            print(f"Arduino nuevo: {', '.join(nuevos)}")
+
+# El supervisor de la conexión (corre para siempre en el hilo de arranque):
+#   - Mientras se simula, busca Arduinos cada INTERVALO_BUSQUEDA segundos. La
+#     primera vez, si nada suena a Arduino prueba cualquier puerto (como
+#     siempre); después solo se conecta a los elegidos a mano o a los que sí
+#     parecen Arduino.
+#   - En modo real reabre las puertas perdidas y, si nadie eligió los
+#     puertos a mano, suma los Arduinos que se enchufen después.
+# Entre vuelta y vuelta duerme hasta lo próximo que toque (nunca da vueltas
+# en vacío); si se desenchufa algo, atender_eventos lo despierta.
+def vigilar_puertos():
+    primera = True
+    proxima_busqueda = 0
+    while True:
+        ahora = time.time()
+        if modo_simulado:
+            if buscar_solo and ahora >= proxima_busqueda:
+                # Buscar puede tardar: se hace sin el candado, y recién al conectar
+                # se revisa que nadie haya elegido otra cosa mientras tanto
+                puertos = lista_puertos(puerto_configurado) or buscar_puertos_arduino(cualquiera=primera, en_silencio=not primera)
+                conectado = False
+                if puertos:
+                    with _candado_conexion:
+                        if modo_simulado and buscar_solo:
+                            conectado = conectar(puertos)
+                if conectado:
+                    print("   -> Pasando a MODO REAL.")
+                elif primera:
+                    print("No se encontró ningún Arduino conectado." if not puertos else "   -> No se pudo conectar.")
+                    if INTERVALO_BUSQUEDA > 0:
+                        print(f"   -> MODO SIMULADO (se vuelve a buscar cada {INTERVALO_BUSQUEDA:g} s).")
+                proxima_busqueda = ahora + INTERVALO_BUSQUEDA if INTERVALO_BUSQUEDA > 0 else float("inf")
+                primera = False
+        else:
+            reconectar_puertas()
+            if buscar_solo and not puerto_configurado and ahora >= proxima_busqueda:
+                sumar_puertas_nuevas()
+                proxima_busqueda = ahora + INTERVALO_BUSQUEDA if INTERVALO_BUSQUEDA > 0 else float("inf")
+            primera = False
+
+        # Hasta cuándo dormir: la próxima búsqueda o el próximo reintento
+        citas = [puerta.reintento_en for puerta in puertas.values() if not puerta.activa] if not modo_simulado else []
+        if buscar_solo and not (puerto_configurado and not modo_simulado):
+            citas.append(proxima_busqueda)
+        espera = min(citas, default=ahora + ESPERA_VIGILANCIA) - time.time()
+        _despertar.wait(min(max(espera, 0.1), ESPERA_VIGILANCIA))
+        _despertar.clear()
@@ -0,0 +1,81 @@
+# ocupacion.py
+# ==========================================
+# EL ESTADO DE LA OCUPACIÓN (FOTOS INMUTABLES)
+# ==========================================
+# Antes la cuenta, la hora de la última cola, el texto del aviso, etc. eran
+# variables sueltas de nucleo.py: el hilo de ingesta las cambiaba de a una
+# y los hilos de Flask las leían cuando querían, así que podían ver la
+# cuenta nueva con el aviso viejo. Ahora todo junto es una Foto inmutable
+# con número de versión:
+#   - quien escribe arma una Foto nueva y cambia la referencia de una sola
+#     vez (asignar un atributo en Python es atómico)
+#   - quien lee toma `ocupacion.foto` UNA vez y usa esa, sin candado: siempre
+#     ve un estado completo, aunque en ese instante se esté escribiendo otro
+#   - si la versión no cambió, no cambió nada (sirve para no mandar de gusto)
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Textos de cada estado (los colores los pone cada interfaz)
+ESTADO_NORMAL = "🟢 NORMAL"
+ESTADO_COLA = "⚠️ COLA DETECTADA"
+ESTADO_LLENO = "⛔ LLENO"
+
+# ts_cola   -> hora de la última COLA (0 = no hay alerta)
+# ts_cambio -> hora de la última entrada/salida (para el pop-up)
+# mensaje / tipo_evento -> texto y color ("entrada"/"salida") del pop-up
+Foto = namedtuple("Foto", ["version", "personas", "aforo", "estado", "ts_cola", "ts_cambio", "mensaje", "tipo_evento"])
+
+
+class EstadoOcupacion:
+    def __init__(self, cola_timeout=1.5, personas=0, aforo=50):
+        self.cola_timeout = cola_timeout
+        # Solo lo usan los que escriben (la ingesta, cambiar el aforo desde la
+        # web), para no pisarse entre ellos; los que leen nunca lo tocan.
+        # Es reentrante para poder llamar a cambiar() dentro de escribiendo().
+        self._candado = threading.RLock()
+        foto = Foto(0, personas, aforo, ESTADO_NORMAL, 0, 0, "", "")
+        self.foto = foto._replace(estado=self.calcular_estado(foto))
+
+    # Verde, amarillo o rojo según la foto (y la hora, por la alerta de COLA)
+    def calcular_estado(self, foto, ahora=None):
+        if foto.personas >= foto.aforo:
+            return ESTADO_LLENO
+        if ((ahora or time.time()) - foto.ts_cola) < self.cola_timeout:
+            return ESTADO_COLA
+        return ESTADO_NORMAL
+
+    # Para leer-y-cambiar sin que otro escritor se meta en medio:
+    #   with ocupacion.escribiendo() as foto:
+    #       ocupacion.cambiar(personas=foto.personas + 1)
+    @contextmanager
+    def escribiendo(self):
+        with self._candado:
+            yield self.foto
+
+    # Publica una Foto nueva con esos campos cambiados (y el estado al día).
+    # Si al final no cambió nada, la versión no sube. Devuelve la foto vigente.
+    def cambiar(self, **campos):
+        with self._candado:
+            vieja = self.foto
+            nueva = vieja._replace(**campos) if campos else vieja
+            estado = self.calcular_estado(nueva)
+            if estado != nueva.estado:
+                nueva = nueva._replace(estado=estado)
+            if nueva == vieja:
+                return vieja
+            nueva = nueva._replace(version=vieja.version + 1)
+            self.foto = nueva
+            return nueva
+
+    # Pone una foto que ya viene armada, con su versión (el modo "web" de
+    # nucleo.py copia así la del proceso de ingesta)
+    def reemplazar(self, foto):
+        with self._candado:
+            self.foto = foto
+            return foto
+
+    # Solo recalcula el estado (la alerta de COLA se apaga sola con el tiempo)
+    def refrescar(self):
+        return self.cambiar()
@@ -0,0 +1,285 @@
+# pronostico.py
+# ==========================================
+# PRONÓSTICO DE OCUPACIÓN ("SE LLENA EN ...")
+# ==========================================
+# Con las entradas y salidas que ya llegan se estima cuánta gente va a
+# haber en los próximos minutos y cuándo se llenaría el local. Dos piezas:
+#   - tasas EWMA de entradas y salidas por segundo (lo que está pasando
+#     AHORA): cada evento suma 1/tau y lo viejo se va apagando con e^(-dt/tau)
+#   - un perfil por hora del día (lo que pasa NORMALMENTE a esta hora):
+#     entradas por segundo, salidas por segundo y gente promedio adentro. Al
+#     cerrar cada hora se promedia con la misma hora de los días anteriores
+#     (promedio de los primeros DIAS días, después EWMA)
+# Hacia adelante, las entradas son las del perfil por "cuánto más movido
+# que lo normal viene hoy" (la EWMA contra el perfil), y eso se va apagando
+# con el horizonte. Las salidas no se copian del perfil: sale una fracción
+# de los que están adentro (salidas / gente de esa hora), así si hoy entró
+# más gente, también va a salir más.
+#
+# Todo se actualiza evento a evento en O(1) (nada se vuelve a ajustar en
+# cada tick). Pronosticar es vectorizado: un paso por minuto del horizonte
+# en arreglos de NumPy. Para arrancar sabiendo algo, aprender() pasa de una
+# los eventos de la bitácora y deja el mismo estado que si se hubieran
+# anotado uno por uno. Ver benchmarks/bench_pronostico.py (backtest).
+import math
+import time
+
+import numpy as np
+
+HORA = 3600
+TAU = 1800           # Las tasas "de ahora" miran más o menos la última media hora
+MEZCLA = 7200        # Cuánto dura hacia adelante lo de "hoy viene más (o menos) movido"
+RAZON_MAX = 4        # Hoy como mucho 4 veces más (o menos) movido que lo normal
+COLCHON = 1 / HORA   # 1 entrada por hora, para no dividir por casi 0 a la hora de abrir
+DIAS = 28            # El perfil promedia más o menos las últimas 4 semanas
+MIN_EXPUESTO = 600   # Una hora vista menos de 10 min (ej. recién arrancamos) no enseña nada
+HUECO_MAXIMO = 24    # Horas sin eventos que se cuentan como "0 movimientos" (más, la app estaba apagada)
+HORIZONTE = 2 * HORA
+PASO = 60
+DESVIOS = 1.0        # "Se llena en" avisa cuando la gente + 1 desvío llega al aforo
+MINUTOS = (15, 30, 60) # Cuánta gente habrá en estos minutos (van en el estado público)
+CENTROS = np.arange(24) + 0.5 # El perfil vale en el medio de cada hora y se interpola entre medio
+MINUTOS_DIA = np.arange(1440) / 60 + 1 / 120 # Medio de cada minuto del día, en horas
+ENTRADAS, SALIDAS, GENTE = range(3)
+
+
+# Segundos que hay que sumarle a ts para tener la hora local. Se mira en
+# cada ts (no una vez al importar): con el horario de verano cambia, y si no
+# las horas del perfil quedarían corridas una hora medio año. Los cambios de
+# horario caen siempre en un cuarto de hora justo, así que alcanza con
+# preguntar una vez por cuarto de hora (y el último queda guardado).
+CUARTO = 900
+_ultimo_cuarto = (None, 0)
+
+def desplazamiento(ts):
+    global _ultimo_cuarto
+    if isinstance(ts, (int, float)):
+        cuarto = int(ts // CUARTO)
+        guardado, desp = _ultimo_cuarto
+        if cuarto != guardado:
+            desp = time.localtime(cuarto * CUARTO).tm_gmtoff
+            _ultimo_cuarto = (cuarto, desp)
+        return desp
+    ts = np.asarray(ts, dtype=np.float64)
+    primero, ultimo = float(ts.min()), float(ts.max())
+    if ultimo - primero <= 86400 and desplazamiento(primero) == desplazamiento(ultimo):
+        return desplazamiento(primero) # Lo común (ej. el horizonte): no hay cambio de horario en el medio
+    cuartos, cual = np.unique(ts // CUARTO, return_inverse=True)
+    return np.array([time.localtime(c * CUARTO).tm_gmtoff for c in cuartos.tolist()], dtype=np.float64)[cual]
+
+
+def hora_absoluta(ts, desp=None):
+    return int((ts + (desplazamiento(ts) if desp is None else desp)) // HORA)
+
+
+class Pronostico:
+    def __init__(self, tau=TAU, mezcla=MEZCLA, dias=DIAS, horizonte=HORIZONTE, paso=PASO):
+        self.tau = tau
+        self.dias_max = dias
+        self.paso = paso
+        self.pasos = np.arange(paso, horizonte + paso, paso, dtype=np.float64)
+        self.olvido = np.exp(-self.pasos / mezcla) # Cuánto pesa lo de hoy en cada paso
+        self.eventos = 0
+        # Tasas EWMA (por segundo) al momento del último evento
+        self.ultimo = None
+        self.tasa_entradas = 0.0
+        self.tasa_salidas = 0.0
+        # Perfil: entradas/s, salidas/s y gente promedio en cada hora del día
+        self.perfil = np.zeros((3, 24))
+        self.dias = np.zeros(24, dtype=np.int64)
+        self._tabla = None # El perfil interpolado minuto a minuto (se rearma si cambia)
+        # La hora que se está juntando ahora (y el desplazamiento de esa hora)
+        self.hora = None
+        self.desp_hora = 0
+        self.desde = 0.0
+        self.entradas_hora = 0
+        self.salidas_hora = 0
+        self.gente_hora = 0.0 # Personas x segundos
+        self.personas = 0     # Gente adentro después del último evento...
+        self.t_gente = 0.0    # ...y hasta cuándo ya se sumó en gente_hora
+
+    # Un evento: cuántos entraron, cuántos salieron (lo normal es 1 y 0, o 0
+    # y 1) y cuánta gente quedó adentro
+    def anotar(self, ts, entradas, salidas, personas):
+        self.eventos += 1
+        desp = desplazamiento(ts)
+        hora = hora_absoluta(ts, desp)
+        if self.hora is None:
+            self.hora, self.desp_hora, self.desde, self.t_gente = hora, desp, ts, ts
+        elif hora > self.hora:
+            self._cerrar(hora, desp)
+        self.entradas_hora += entradas
+        self.salidas_hora += salidas
+        if ts > self.t_gente:
+            self.gente_hora += self.personas * (ts - self.t_gente)
+            self.t_gente = ts
+        self.personas = personas
+
+        if self.ultimo is not None and ts > self.ultimo:
+            caida = math.exp((self.ultimo - ts) / self.tau)
+            self.tasa_entradas *= caida
+            self.tasa_salidas *= caida
+        if self.ultimo is None or ts > self.ultimo:
+            self.ultimo = ts
+        self.tasa_entradas += entradas / self.tau
+        self.tasa_salidas += salidas / self.tau
+
+    # Cierra la hora que se venía juntando (y las vacías hasta `hora`) y pasa
+    # a `hora`, que tiene desplazamiento `desp`
+    def _cerrar(self, hora, desp):
+        fin = (self.hora + 1) * HORA - self.desp_hora
+        self.gente_hora += self.personas * max(0.0, fin - self.t_gente)
+        self._sumar(self.hora, self.entradas_hora, self.salidas_hora, self.gente_hora, fin - self.desde)
+        for vacia in range(self.hora + 1, min(hora, self.hora + 1 + HUECO_MAXIMO)):
+            self._sumar(vacia, 0, 0, self.personas * HORA, HORA)
+        self.hora, self.desp_hora = hora, desp
+        self.desde = self.t_gente = hora * HORA - desp
+        self.entradas_hora = self.salidas_hora = 0
+        self.gente_hora = 0.0
+
+    def _sumar(self, hora, entradas, salidas, gente, expuesto):
+        if expuesto < MIN_EXPUESTO:
+            return
+        i = hora % 24
+        self.dias[i] = min(self.dias[i] + 1, self.dias_max)
+        peso = 1 / self.dias[i]
+        for fila, valor in ((ENTRADAS, entradas), (SALIDAS, salidas), (GENTE, gente)):
+            self.perfil[fila, i] += peso * (valor / expuesto - self.perfil[fila, i])
+        self._tabla = None
+
+    # Lo mismo que anotar() evento por evento, pero con arreglos (ts ordenado):
+    # se recorre una vez cada hora con eventos, no cada evento
+    def aprender(self, ts, entradas, salidas, personas):
+        if len(ts) == 0:
+            return
+        ts = np.asarray(ts, dtype=np.float64)
+        entradas = np.asarray(entradas, dtype=np.float64)
+        salidas = np.asarray(salidas, dtype=np.float64)
+        personas = np.asarray(personas, dtype=np.float64)
+        desp = np.broadcast_to(desplazamiento(ts), ts.shape) # Puede venir uno solo para todos
+        indice = np.floor((ts + desp) / HORA).astype(np.int64)
+        horas, primero, cual = np.unique(indice, return_index=True, return_inverse=True)
+
+        # Personas x segundos desde el evento anterior (o desde que empezó su hora) hasta cada evento
+        if self.hora is None:
+            self.t_gente = ts[0]
+        antes = np.concatenate(([self.t_gente], ts[:-1]))
+        gente_antes = np.concatenate(([self.personas], personas[:-1]))
+        tramo = gente_antes * np.maximum(0.0, ts - np.maximum(antes, indice * HORA - desp))
+
+        sumas = zip(horas.tolist(), primero.tolist(), np.bincount(cual, weights=entradas).tolist(),
+                    np.bincount(cual, weights=salidas).tolist(), np.bincount(cual, weights=tramo).tolist())
+        for hora, i, e, s, g in sumas:
+            if self.hora is None:
+                self.hora, self.desp_hora, self.desde = hora, float(desp[i]), float(ts[i])
+            elif hora > self.hora:
+                if i > 0: # Lo que dejó el último evento de la hora anterior
+                    self.personas, self.t_gente = float(personas[i - 1]), float(ts[i - 1])
+                self._cerrar(hora, float(desp[i]))
+            self.entradas_hora += e
+            self.salidas_hora += s
+            self.gente_hora += g
+        self.personas = float(personas[-1])
+        self.t_gente = max(self.t_gente, float(ts[-1]))
+
+        # Las EWMA: cada evento pesa e^(-(último - ts)/tau)
+        fin = float(ts[-1])
+        if self.ultimo is not None and fin > self.ultimo:
+            caida = math.exp((self.ultimo - fin) / self.tau)
+            self.tasa_entradas *= caida
+            self.tasa_salidas *= caida
+        pesos = np.exp((ts - fin) / self.tau) / self.tau
+        self.tasa_entradas += float(pesos @ entradas)
+        self.tasa_salidas += float(pesos @ salidas)
+        self.ultimo = max(fin, self.ultimo or fin)
+        self.eventos += len(ts)
+
+    # (entradas, salidas) por segundo a la hora ts
+    def tasas(self, ts):
+        if self.ultimo is None:
+            return 0.0, 0.0
+        caida = math.exp(min(0.0, self.ultimo - ts) / self.tau)
+        return self.tasa_entradas * caida, self.tasa_salidas * caida
+
+    # Lo normal en cada ts: (entradas/s, salidas por persona por segundo,
+    # 1 si esa hora ya se vio alguna vez). La interpolación entre horas se
+    # hace una vez por minuto del día y queda en una tabla hasta que se
+    # cierre otra hora: pronosticar es solo indexar. (Se toma la tabla una
+    # vez: la ingesta la puede tirar mientras un hilo de la web pronostica.)
+    def normal(self, ts):
+        tabla = self._tabla
+        if tabla is None:
+            entradas, salidas, gente = (np.interp(MINUTOS_DIA, CENTROS, fila, period=24) for fila in self.perfil)
+            por_persona = np.divide(salidas, gente, out=np.zeros(1440), where=gente > 0)
+            tabla = self._tabla = np.stack([entradas, por_persona, np.repeat(self.dias > 0, 60)])
+        ts = np.asarray(ts, dtype=np.float64)
+        minutos = ((ts + desplazamiento(ts)) // 60).astype(np.int64) % 1440
+        return tabla[:, minutos]
+
+    # Gente adentro al final de cada paso del horizonte: (esperada, esperada + DESVIOS desvíos)
+    def trayectoria(self, ts, personas):
+        entradas, salidas = self.tasas(ts)
+        llegan, por_persona, visto = self.normal(ts + self.pasos - self.paso / 2)
+        # Hoy contra lo normal: lo normal de lo que miran las EWMA (~tau/2 para atrás)
+        normal_antes, _, visto_antes = self.normal([ts - self.tau / 2])[:, 0]
+        razon = min(max((entradas + COLCHON) / (normal_antes + COLCHON), 1 / RAZON_MAX), RAZON_MAX) if visto_antes else 1.0
+
+        # Las horas que nunca se vieron (ej. el primer día) siguen con las tasas de ahora
+        visto = visto > 0
+        llegan = np.where(visto, llegan * (1 + self.olvido * (razon - 1)), entradas)
+        salen = np.where(visto, 0.0, salidas)
+        # gente[k] = gente[k-1] * (1 - por_persona * paso) + (llegan - salen) * paso, sin recorrer en Python
+        queda = np.cumprod(1 - por_persona * self.paso)
+        gente = np.maximum(0.0, queda * (personas + np.cumsum((llegan - salen) * self.paso / queda)))
+        # Cada entrada o salida es más o menos de Poisson: la varianza es la suma de las tasas
+        desvio = np.sqrt(np.cumsum((llegan + salen + por_persona * gente) * self.paso))
+        return gente, gente + DESVIOS * desvio
+
+    # Segundos hasta llenarse (0 si ya está lleno, None si no se llena en el
+    # horizonte). `alta` es la segunda mitad de trayectoria()
+    def lleno_en(self, personas, aforo, alta):
+        if personas >= aforo:
+            return 0.0
+        i = int(np.argmax(alta >= aforo))
+        if alta[i] < aforo:
+            return None
+        antes = personas if i == 0 else alta[i - 1]
+        return float(self.pasos[i] - self.paso + (aforo - antes) / (alta[i] - antes) * self.paso)
+
+    # Lo que va al estado público (redondeado, así no cambia a cada rato)
+    # o None si todavía no se vio ningún evento
+    def pronosticar(self, ts, personas, aforo):
+        if self.eventos == 0:
+            return None
+        gente, alta = self.trayectoria(ts, personas)
+        entradas, salidas = self.tasas(ts)
+        lleno = self.lleno_en(personas, aforo, alta)
+        datos = {
+            "entradas_min": round(entradas * 60, 1),
+            "salidas_min": round(salidas * 60, 1),
+            "lleno_en_min": None if lleno is None else math.ceil(lleno / 60),
+        }
+        for minutos in MINUTOS:
+            datos[f"en_{minutos}_min"] = round(float(gente[int(minutos * 60 / self.paso) - 1]))
+        return datos
+
+
+# (ts, entradas, salidas, personas) de las ENTRADA/SALIDA guardadas desde
+# `desde`. Se cuentan por la diferencia de personas (una trama puede traer
+# varios de golpe).
+def leer_movimientos(ruta, desde):
+    from bitacora import abrir
+    conexion = abrir(ruta)
+    try:
+        filas = conexion.execute(
+            "SELECT ts, CASE tipo WHEN 'ENTRADA' THEN 1 ELSE -1 END, personas FROM eventos "
+            "WHERE ts >= ? AND tipo IN ('ENTRADA', 'SALIDA') ORDER BY ts, id",
+            (desde,),
+        ).fetchall()
+    finally:
+        conexion.close()
+    if not filas:
+        return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+    ts, signo, personas = np.array(filas, dtype=np.float64).T
+    cambio = np.diff(personas, prepend=personas[0] - signo[0])
+    return ts, np.maximum(cambio, 0), np.maximum(-cambio, 0), personas
@@ -0,0 +1,211 @@
+# protocolo.py
+# ==========================================
+# QUÉ DICE EL ARDUINO (BYTES -> EVENTOS)
+# ==========================================
+# Sensores.ino manda líneas de texto:
+#   "ENTRADA AFORO: 7"  -> entró alguien, su contador va en 7
+#   "SALIDA AFORO: 6"   -> salió alguien
+#   "COLA"              -> alguien se quedó parado en el primer sensor
+# En vez de decodificar cada línea a str y buscarle "AFORO:", "COLA" y
+# hacerle split(":"), los bytes se van juntando en un bytearray a medida
+# que llegan (de a pedazos, como salgan del puerto) y cada línea completa
+# pasa por UNA expresión regular ya compilada que devuelve un Evento.
+# Como el Arduino repite siempre las mismas ~100 líneas ("ENTRADA AFORO: 0"
+# a "... 50", "COLA"...), lo ya interpretado se guarda y la próxima vez es
+# solo buscarlo en un dict.
+#
+# Con PROTOCOLO_BINARIO en Sensores.ino, en vez de líneas manda tramas
+# binarias numeradas (ver TRAMAS más abajo). LectorAuto se da cuenta solo
+# de cuál de los dos está hablando el Arduino.
+import re
+import struct
+from collections import namedtuple
+
+# tipo: "ENTRADA", "SALIDA", "COLA" o None (trae número pero no dice qué fue);
+#       en tramas también "HOLA" (el Arduino recién arrancó) y "LATIDO"
+# contador: el número que manda el Arduino (None si la línea no trae)
+# linea: la línea tal cual, para la bitácora
+# secuencia, millis: solo en tramas (número de trama y millis() del Arduino)
+Evento = namedtuple("Evento", ["tipo", "contador", "linea", "secuencia", "millis"], defaults=(None, None))
+
+_LINEA = re.compile(rb"(?:(ENTRADA|SALIDA)\s*)?AFORO:\s*(-?\d+)|(COLA)")
+LARGO_MAXIMO = 256  # Una línea más larga que esto es basura (ruido o baudios equivocados)
+MAX_CONOCIDAS = 1024 # Tope de líneas recordadas (por si llega mucho ruido distinto)
+_conocidas = {}
+
+
+def interpretar(crudo):
+    try:
+        return _conocidas[crudo]
+    except KeyError:
+        pass
+    evento = _interpretar(crudo)
+    if len(_conocidas) >= MAX_CONOCIDAS:
+        _conocidas.clear()
+    _conocidas[crudo] = evento
+    return evento
+
+
+def _interpretar(crudo):
+    m = _LINEA.search(crudo)
+    if m is None:
+        return None
+    palabra, numero, cola = m.groups()
+    linea = crudo.strip().decode("utf-8", errors="ignore")
+    if cola:
+        return Evento("COLA", None, linea)
+    return Evento(palabra.decode() if palabra else None, int(numero), linea)
+
+
+# Lo mismo para una línea que ya es texto (pruebas, benchmarks, la web)
+def interpretar_texto(linea):
+    return interpretar(linea.encode("utf-8", errors="ignore"))
+
+
+class LectorLineas:
+    modo = "texto"
+
+    def __init__(self):
+        self.pendiente = bytearray()  # Lo que llegó después del último "\n"
+        self.lineas = 0               # Líneas completas que llegaron (para /metrics)
+        self.descartadas = 0          # Líneas que no se entendieron (para depurar)
+
+    # Recibe un pedazo de bytes (puede traer media línea o varias) y
+    # devuelve los eventos de las líneas que quedaron completas
+    def alimentar(self, pedazo):
+        buf = self.pendiente
+        buf += pedazo
+        fin = buf.rfind(b"\n")
+        if fin < 0:
+            if len(buf) > LARGO_MAXIMO:
+                del buf[:]
+                self.descartadas += 1
+            return []
+
+        eventos = []
+        conocidas = _conocidas
+        lineas = bytes(buf[:fin]).split(b"\n")
+        self.lineas += len(lineas)
+        for crudo in lineas:
+            evento = conocidas.get(crudo) or interpretar(crudo)
+            if evento is not None:
+                eventos.append(evento)
+            elif crudo.strip():
+                self.descartadas += 1
+        del buf[:fin + 1]
+        return eventos
+
+
+# ==========================================
+# TRAMAS BINARIAS (PROTOCOLO_BINARIO = 1)
+# ==========================================
+# 10 bytes por evento a 115200 baudios (la línea de texto son ~18 bytes a 9600):
+#   A5 | secuencia (2) | tipo (1) | contador (1) | millis (4) | CRC-8 (1)
+# Todo en little endian, como lo guarda el Arduino en memoria. La secuencia
+# sube de a 1 por trama (después de 65535 vuelve a 0): si salta, se perdieron
+# tramas en el camino (ver Puerta.movimiento). El CRC-8 (polinomio 0x07)
+# cubre los 9 bytes anteriores; si no da, ese A5 no era el inicio de una
+# trama y se busca el siguiente, así un byte perdido o cambiado solo se lleva
+# esa trama y no desordena las que siguen.
+INICIO = 0xA5
+TRAMA = struct.Struct("<BHBBI")
+LARGO_TRAMA = TRAMA.size + 1
+TIPOS_TRAMA = {0: "HOLA", 1: "ENTRADA", 2: "SALIDA", 3: "COLA", 4: "LATIDO"}
+CODIGOS_TRAMA = {tipo: codigo for codigo, tipo in TIPOS_TRAMA.items()}
+
+
+def _tabla_crc8():
+    tabla = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        tabla.append(crc)
+    return bytes(tabla)
+
+
+_CRC8 = _tabla_crc8()
+
+
+def crc8(datos):
+    crc = 0
+    for byte in datos:
+        crc = _CRC8[crc ^ byte]
+    return crc
+
+
+# La trama de un evento (la usan el simulador y los benchmarks)
+def armar_trama(secuencia, tipo, contador, millis):
+    cuerpo = TRAMA.pack(INICIO, secuencia & 0xFFFF, CODIGOS_TRAMA[tipo], contador & 0xFF, millis & 0xFFFFFFFF)
+    return cuerpo + bytes([crc8(cuerpo)])
+
+
+def leer_trama(trama):
+    _, secuencia, codigo, contador, millis = TRAMA.unpack_from(trama)
+    tipo = TIPOS_TRAMA.get(codigo)
+    if tipo is None:
+        return None
+    # Para la bitácora, en el mismo formato que el texto (así se puede reproducir igual)
+    linea = f"COLA #{secuencia}" if tipo == "COLA" else f"{tipo} AFORO: {contador} #{secuencia}"
+    return Evento(tipo, None if tipo == "COLA" else contador, linea, secuencia, millis)
+
+
+class LectorTramas:
+    modo = "binario"
+
+    def __init__(self):
+        self.pendiente = bytearray()
+        self.lineas = 0       # Tramas buenas (mismo nombre que en LectorLineas, para /metrics)
+        self.descartadas = 0  # Tramas con el CRC mal (o de un tipo que no existe)
+
+    def alimentar(self, pedazo):
+        buf = self.pendiente
+        buf += pedazo
+        eventos = []
+        i = 0
+        while True:
+            i = buf.find(INICIO, i)
+            if i < 0:
+                i = len(buf) # Todo basura: no hay ni un inicio de trama
+                break
+            if len(buf) - i < LARGO_TRAMA:
+                break # Media trama: el resto llega en el próximo pedazo
+            trama = bytes(buf[i:i + LARGO_TRAMA])
+            evento = leer_trama(trama) if crc8(trama[:-1]) == trama[-1] else None
+            if evento is None:
+                self.descartadas += 1
+                i += 1 # Resincronizar: probar desde el próximo A5
+                continue
+            eventos.append(evento)
+            self.lineas += 1
+            i += LARGO_TRAMA
+        del buf[:i]
+        return eventos
+
+
+# ==========================================
+# ¿TEXTO O TRAMAS?
+# ==========================================
+# Mientras no se sabe, los mismos bytes pasan por los dos lectores; el
+# primero que saca un evento válido se queda (Puerta lo cambia por ese, así
+# después no hay ni un "if" de más). Las tramas van primero: el texto nunca
+# trae un A5 (es ASCII) y el CRC hace casi imposible confundirse al revés.
+class LectorAuto:
+    modo = None
+
+    def __init__(self):
+        self.candidatos = (LectorTramas(), LectorLineas())
+        self.elegido = None
+        self.lineas = 0
+        self.descartadas = 0
+
+    def alimentar(self, pedazo):
+        if self.elegido:
+            return self.elegido.alimentar(pedazo)
+        for lector in self.candidatos:
+            eventos = lector.alimentar(pedazo)
+            if eventos:
+                self.elegido = lector
+                return eventos
+        self.descartadas = sum(lector.descartadas for lector in self.candidatos)
+        return []
@@ -0,0 +1,224 @@
+# puertas.py
+# ==========================================
+# VARIAS PUERTAS, UN SOLO AFORO
+# ==========================================
+# Cada entrada del local tiene su propio Arduino con Sensores.ino y su
+# propio puerto serial. Cada puerta tiene un hilo que se queda esperando
+# bytes del puerto (bloqueado, sin gastar CPU), los lee de a pedazos, los
+# convierte en eventos (ver protocolo.py) y los deja en UNA cola
+# compartida; el hilo de ingesta de nucleo.py las atiende de a una, en el
+# orden en que llegaron, así no hay dos hilos tocando la cuenta a la vez.
+#
+# Ojo con los contadores: cada Arduino lleva SU cuenta ("ENTRADA AFORO: 7"),
+# que arranca en 0 al prenderse y no baja de 0 ni pasa de 50. Si por la
+# puerta A entra gente y sale por la B, el contador de B se queda en 0
+# aunque salga gente. Por eso la cuenta del local no se copia del número:
+# cada línea suma +1 o -1 según diga ENTRADA o SALIDA, y el número solo se
+# usa para notar si se perdieron líneas en el camino.
+#
+# El Arduino puede hablar texto (9600 baudios) o tramas binarias numeradas
+# (115200, ver protocolo.py). No hace falta decirle a la app cuál: si llegan
+# bytes (al menos BASURA_BAUDIOS) pero en ESPERA_BAUDIOS segundos no se
+# entendió nada, se prueba la próxima velocidad de la lista, y el protocolo
+# lo reconoce LectorAuto.
+import os
+import threading
+import time
+import serial # pip install pyserial
+import metricas
+from protocolo import LectorAuto
+
+ESPERA_BAUDIOS = 3.0 # Segundos de bytes sin sentido antes de probar otra velocidad
+BASURA_BAUDIOS = 64  # ...y cuántos bytes como mínimo (un pedazo de trama no alcanza)
+# Si se desenchufa, se vuelve a probar a los 1 s, 2 s, 4 s... hasta RECONEXION_MAX
+RECONEXION_MIN = 1.0
+RECONEXION_MAX = float(os.environ.get("AFORO_RECONEXION_MAX", "10"))
+TOPE_CONTADOR = 50 # AFORO_MAXIMO de Sensores.ino: el contador del Arduino no pasa de ahí
+
+
+class Puerta:
+    # baudios: una velocidad o varias para probar en orden (ej. [9600, 115200])
+    def __init__(self, nombre, baudios=9600):
+        self.nombre = nombre      # El puerto (COM3, /dev/ttyUSB0...)
+        self.velocidades = [baudios] if isinstance(baudios, int) else list(baudios)
+        self.baudios = self.velocidades[0]
+        self.ser = None
+        self.hilo = None
+        self.activa = False
+        self.contador = None      # Último número que mandó su Arduino (None = todavía no sabemos)
+        self.entradas = 0
+        self.salidas = 0
+        self.colas = 0
+        self.ultimo_evento = 0    # Hora de la última línea con algo
+        self.secuencia = None     # Número de la última trama (solo con tramas binarias)
+        # Para /metrics (ver metricas.py)
+        self.lector = LectorAuto()
+        self.bytes_leidos = 0
+        self.desconexiones = 0
+        self.perdidas = 0         # Tramas que no llegaron (saltos en la secuencia)
+        # Reconexión (la hace nucleo.vigilar_puertos)
+        self.espera = RECONEXION_MIN
+        self.reintento_en = 0     # Hora desde la que se puede volver a probar
+
+    # Abre el puerto (puede lanzar excepción si no se puede)
+    def abrir(self):
+        # En texto, al abrir el puerto el Arduino se reinicia y su cuenta vuelve
+        # a 0: se empieza de nuevo. Con tramas no hace falta adivinar: si se
+        # reinició manda HOLA, y si no (se cortó el cable pero siguió contando)
+        # la secuencia dice cuánto se perdió y su contador corrige la cuenta.
+        if self.lector.modo != "binario":
+            self.contador = None
+            self.secuencia = None
+        self.ser = serial.Serial(self.nombre, self.baudios, timeout=1)
+        # Limpiamos buffer por si quedó basura de antes
+        self.ser.reset_input_buffer()
+
+    # Arranca el hilo que lee esta puerta y deja (hora, puerta, [eventos]) en la cola.
+    # Si se desenchufa, deja (hora, puerta, None) para avisar.
+    def escuchar(self, cola):
+        self.activa = True
+        self.espera = RECONEXION_MIN
+        self.hilo = threading.Thread(target=self._leer, args=(cola,), name=f"puerta-{self.nombre}", daemon=True)
+        self.hilo.start()
+
+    # Cada hilo es de UNA sesión (el self.ser que abrió abrir()). Si se
+    # desconecta y se vuelve a conectar rápido, el hilo viejo puede seguir
+    # vivo un rato: ese ya no toca nada (ni cierra la sesión nueva ni avisa)
+    def _vigente(self, puerto):
+        return self.activa and puerto is self.ser
+
+    def _leer(self, cola):
+        metricas.perfilar_hilo()
+        lector = self.lector = LectorAuto()
+        puerto = self.ser
+        probando_desde = time.time()
+        basura = 0
+        while self._vigente(puerto):
+            try:
+                # Si ya hay bytes esperando se leen todos de una; si no, se
+                # queda dormido hasta que llegue el primero (máximo 1 s).
+                # Nada de readline(), que pide los bytes de a uno.
+                pedazo = puerto.read(puerto.in_waiting or 1)
+            except Exception as e:
+                if self._vigente(puerto): # Si la cerramos nosotros, no es error
+                    print(f"Error leyendo {self.nombre}: {e}")
+                    self.cerrar()
+                    self.desconexiones += 1
+                    self.reintentar_despues()
+                    cola.put((time.time(), self, None))
+                return
+            if pedazo and puerto is self.ser:
+                self.bytes_leidos += len(pedazo)
+                if metricas.TIEMPOS:
+                    t0 = time.perf_counter()
+                    eventos = lector.alimentar(pedazo)
+                    metricas.etapa("parseo", t0)
+                else:
+                    eventos = lector.alimentar(pedazo)
+                if eventos:
+                    cola.put((time.time(), self, eventos))
+                    if lector.modo is None:
+                        # Ya se sabe qué habla: de acá en más, directo con ese lector
+                        lector = self.lector = lector.elegido
+                        print(f"{self.nombre}: protocolo {lector.modo} a {self.baudios} baudios")
+                elif lector.modo is None and len(self.velocidades) > 1:
+                    basura += len(pedazo)
+                    if basura > BASURA_BAUDIOS and time.time() - probando_desde > ESPERA_BAUDIOS:
+                        lector = self._otra_velocidad()
+                        probando_desde = time.time()
+                        basura = 0
+
+    # Llega basura: probablemente el Arduino habla a otra velocidad
+    def _otra_velocidad(self):
+        i = self.velocidades.index(self.baudios)
+        self.baudios = self.velocidades[(i + 1) % len(self.velocidades)]
+        try:
+            self.ser.baudrate = self.baudios
+            self.ser.reset_input_buffer()
+        except Exception as e:
+            print(f"No se pudo cambiar {self.nombre} a {self.baudios} baudios: {e}")
+        self.lector = LectorAuto()
+        return self.lector
+
+    # Cuándo volver a probar después de perderlo (o de no poder reabrirlo):
+    # cada vez el doble de espera, así un cable roto no gasta CPU ni llena la consola
+    def reintentar_despues(self):
+        self.reintento_en = time.time() + self.espera
+        self.espera = min(self.espera * 2, RECONEXION_MAX)
+
+    def cerrar(self):
+        self.activa = False
+        if self.ser:
+            try:
+                self.ser.close()
+            except Exception:
+                pass # Si ya estaba cerrado o desenchufado, da igual
+
+    # Cuánto cambia la gente adentro por este evento: +1, -1, 0, o más si se
+    # perdieron líneas (el contador saltó de 5 a 8 con ENTRADA = +3)
+    def movimiento(self, evento):
+        # Con tramas se SABE si se perdió algo: la secuencia saltó
+        hueco = 0
+        if evento.secuencia is not None:
+            if evento.tipo == "HOLA":
+                # El Arduino arrancó de nuevo: su cuenta y su secuencia vuelven a empezar
+                self.secuencia = evento.secuencia
+                self.contador = evento.contador
+                return 0
+            if self.secuencia is not None:
+                hueco = (evento.secuencia - self.secuencia - 1) & 0xFFFF
+                if hueco >= 0x8000:
+                    # La secuencia volvió para atrás: se reinició y el HOLA no llegó
+                    hueco = 0
+                    self.contador = None
+                self.perdidas += hueco
+            self.secuencia = evento.secuencia
+
+        if evento.tipo == "ENTRADA":
+            paso = 1
+        elif evento.tipo == "SALIDA":
+            paso = -1
+        else:
+            paso = 0
+
+        valor = evento.contador
+        if valor is not None:
+            if self.contador is not None:
+                diferencia = valor - self.contador
+                # Sin palabra, confiamos en el número. Con palabra, el número solo
+                # manda si saltó más de 1 en el mismo sentido: si va al revés es
+                # que el Arduino se reinició o se topó con 0 / 50.
+                # Si se perdieron tramas, la trama que SÍ llegó trae su propio
+                # +1/-1 y el número suma lo que hicieron las perdidas, salvo que
+                # el contador esté topado (SALIDA en 0, ENTRADA en 50): ahí no
+                # se sabe cuánto se comió el tope y queda solo el paso. Es lo
+                # normal en una puerta por la que solo sale gente.
+                if paso == 0:
+                    paso = diferencia
+                elif hueco:
+                    if valor != (0 if paso < 0 else TOPE_CONTADOR):
+                        paso = diferencia
+                elif diferencia * paso > 1:
+                    paso = diferencia
+            self.contador = valor
+
+        if paso > 0:
+            self.entradas += paso
+        elif paso < 0:
+            self.salidas -= paso
+        if evento.tipo == "COLA":
+            self.colas += 1
+        if paso or evento.tipo == "COLA":
+            self.ultimo_evento = time.time()
+        return paso
+
+    # Lo que se muestra de cada puerta en la web
+    def resumen(self):
+        return {
+            "puerta": self.nombre,
+            "entradas": self.entradas,
+            "salidas": self.salidas,
+            "neto": self.entradas - self.salidas,
+            "contador": self.contador,
+            "conectada": self.activa,
+        }
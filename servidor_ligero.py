@@ -0,0 +1,145 @@
+# servidor_ligero.py
+# ==========================================
+# BACKEND LIVIANO PARA templates/index.html
+# ==========================================
+# Flask + Socket.IO, sin Dash ni Plotly: el navegador dibuja con Chart.js
+# y el servidor solo manda deltas JSON chiquitos. Sirve para muchas
+# pantallas mirando la misma puerta. Se monta dentro de app.py (/ligero)
+# o se corre solo, en lugar del dashboard:
+#   python servidor_ligero.py   -> http://127.0.0.1:8060/
+import os
+import time
+from datetime import datetime
+from flask import Flask, Response, jsonify, render_template, request
+import exportar
+import metricas
+import nucleo
+from tiempo_real import socketio
+
+
+def vista_ligera():
+    return render_template("index.html", opciones_socket=nucleo.OPCIONES_SOCKET)
+
+
+# POST {"port": "COM3"} -> guarda el puerto elegido ("" = volver a buscar solito)
+def api_set_serial():
+    datos = request.get_json(silent=True) or {}
+    puerto = str(datos.get("port") or "").strip()
+    ok = nucleo.configurar_puerto(puerto or None)
+    return jsonify({"ok": ok, "port": puerto})
+
+
+# POST {"aforo": 50} -> nuevo límite de aforo
+def api_set_aforo():
+    datos = request.get_json(silent=True) or {}
+    try:
+        aforo = int(datos.get("aforo"))
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "El aforo debe ser un número"}), 400
+    if aforo < 1:
+        return jsonify({"ok": False, "error": "El aforo debe ser mayor a 0"}), 400
+
+    return jsonify({"ok": True, "aforo": nucleo.cambiar_aforo(aforo)})
+
+
+# GET /api/estado -> lo mismo que viaja por Socket.IO, para quien no usa WebSocket.
+# Va con ETag: si el cliente manda If-None-Match y nada cambió, recibe un 304 vacío.
+def api_estado():
+    foto = nucleo.foto_actual()
+    version = nucleo.version_publica(foto)
+    if request.if_none_match.contains(version):
+        return Response(status=304, headers={"ETag": f'"{version}"'})
+    respuesta = jsonify(dict(nucleo.estado_publico(foto), ok=True, version=version))
+    respuesta.set_etag(version)
+    return respuesta
+
+
+# Acepta segundos epoch o fechas ISO ("2026-10-01", "2026-10-01T08:00")
+def leer_fecha(texto, por_defecto):
+    if not texto:
+        return por_defecto
+    try:
+        return float(texto)
+    except ValueError:
+        return datetime.fromisoformat(texto).timestamp()
+
+
+# GET /api/analitica?nivel=1h&desde=2026-10-01&hasta=2026-10-08
+# nivel: 1min, 15min, 1h, 1d o 1sem (por defecto, los últimos 7 días por hora)
+def api_analitica():
+    ahora = time.time()
+    try:
+        desde = leer_fecha(request.args.get("desde"), ahora - 7 * 86400)
+        hasta = leer_fecha(request.args.get("hasta"), ahora)
+        nivel, filas = nucleo.consultar_analitica(request.args.get("nivel", "1h"), desde, hasta)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, "nivel": nivel, "desde": desde, "hasta": hasta, "filas": filas})
+
+
+# GET /api/exportar?formato=csv&desde=2026-10-01&hasta=2026-10-08
+# Los eventos crudos de la bitácora como descarga (por defecto, los últimos
+# 7 días en CSV). formato: csv, ndjson o parquet (este último con pyarrow).
+# Se va mandando de a pedazos mientras se lee (ver exportar.py).
+def api_exportar():
+    ruta = nucleo.ruta_bitacora()
+    if ruta is None:
+        return jsonify({"ok": False, "error": "No hay bitácora para exportar (AFORO_BITACORA)"}), 404
+    ahora = time.time()
+    formato = request.args.get("formato", "csv").lower()
+    try:
+        desde = leer_fecha(request.args.get("desde"), ahora - 7 * 86400)
+        hasta = leer_fecha(request.args.get("hasta"), ahora)
+        tipo, partes = exportar.exportar(ruta, formato, desde, hasta)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except ImportError:
+        return jsonify({"ok": False, "error": "Para exportar en Parquet hace falta pyarrow (pip install pyarrow)"}), 501
+    nombre = f"aforo_{datetime.fromtimestamp(desde):%Y%m%d-%H%M}_{datetime.fromtimestamp(hasta):%Y%m%d-%H%M}.{formato}"
+    return Response(partes, mimetype=tipo, headers={"Content-Disposition": f'attachment; filename="{nombre}"'})
+
+
+# GET /metrics -> contadores y tiempos en formato Prometheus (ver metricas.py)
+def api_metricas():
+    return Response(metricas.exponer(), mimetype="text/plain; version=0.0.4")
+
+
+# GET /debug/perfil -> pilas colapsadas del perfilador (solo con AFORO_PERFILADOR=1)
+# ?reiniciar=1 lo deja en cero después de leerlo
+def api_perfil():
+    if metricas.perfilador is None:
+        return Response("Perfilador apagado (AFORO_PERFILADOR=1 para prenderlo)\n", status=404, mimetype="text/plain")
+    reiniciar = request.args.get("reiniciar") == "1"
+    return Response(metricas.perfilador.texto(reiniciar), mimetype="text/plain")
+
+
+# Los botones "Modo Simulado" / "Modo Real" de la página
+@socketio.on("cambiar_modo")
+def al_cambiar_modo(datos):
+    nucleo.cambiar_modo((datos or {}).get("modo", "Simulado"))
+
+
+# Engancha la página y la API a un Flask que ya existe (el de Dash, por ejemplo)
+def registrar(server, ruta="/"):
+    server.add_url_rule(ruta, "vista_ligera", vista_ligera)
+    server.add_url_rule("/api/set_serial", "api_set_serial", api_set_serial, methods=["POST"])
+    server.add_url_rule("/api/set_aforo", "api_set_aforo", api_set_aforo, methods=["POST"])
+    server.add_url_rule("/api/estado", "api_estado", api_estado)
+    server.add_url_rule("/api/analitica", "api_analitica", api_analitica)
+    server.add_url_rule("/api/exportar", "api_exportar", api_exportar)
+    server.add_url_rule("/metrics", "api_metricas", api_metricas)
+    server.add_url_rule("/debug/perfil", "api_perfil", api_perfil)
+
+
+def crear_app():
+    server = Flask(__name__)
+    socketio.init_app(server)
+    registrar(server)
+    return server
+
+
+if __name__ == "__main__":
+    server = crear_app()
+    nucleo.iniciar()
+    puerto_web = int(os.environ.get("AFORO_PUERTO_WEB", "8060"))
+    socketio.run(server, host="0.0.0.0", port=puerto_web, allow_unsafe_werkzeug=True)
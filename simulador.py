@@ -0,0 +1,358 @@
+# simulador.py
+# ==========================================
+# ARDUINOS DE MENTIRA (Y REPRODUCTOR DE BITÁCORAS)
+# ==========================================
+# Corre aparte de la app y se hace pasar por uno o varios Arduinos con
+# Sensores.ino: abre una pseudo-terminal (pty) por puerta, o escribe en un
+# puerto que ya existe (ej. un par virtual com0com en Windows), y manda
+# exactamente lo mismo que el Arduino:
+#   "ENTRADA AFORO: n", "SALIDA AFORO: n" (el contador de cada puerta no
+#   baja de 0 ni pasa de 50) y "COLA" cada 800 ms mientras alguien espera.
+# La gente llega al azar (Poisson) a cada puerta, se queda un rato y sale
+# por cualquier puerta, así que hay puertas que se quedan en 0 aunque salga
+# gente, como en la vida real. También puede reproducir una bitácora
+# (aforo.db) o una grabación suya, de 1x a 1000x o sin pausas.
+#
+# Uso:
+#   python simulador.py --puertas 3 --tasa 12             (12 personas/min por puerta)
+#   python simulador.py --rafagas 300:30:10               (cada 5 min, 30 s con 10x de gente)
+#   python simulador.py --reproducir aforo.db --velocidad 100
+#   python simulador.py --puerto COM8                     (en vez de pty, un puerto que ya existe)
+#   python simulador.py --binario                         (tramas de PROTOCOLO_BINARIO en vez de texto)
+# y en otra terminal, con los puertos que imprime:
+#   AFORO_PUERTOS=/dev/pts/5,/dev/pts/6 python app.py
+import argparse
+import heapq
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from protocolo import armar_trama, interpretar_texto
+
+AFORO_MAXIMO = 50          # Igual que en Sensores.ino
+COLA_CADA = 0.8            # COLA_PRINT_INTERVAL de Sensores.ino (segundos)
+LATIDO_CADA = 1.0          # LATIDO_INTERVAL de Sensores.ino (segundos, solo tramas)
+_PUERTA_EN_LINEA = re.compile(r"^\[(.+?)\] (.*)$") # "[COM3] ENTRADA AFORO: 5" (ver nucleo.atender_eventos)
+
+
+# ==========================================
+# 1. A DÓNDE SE ESCRIBE
+# ==========================================
+# Una pty: la app abre `nombre` como si fuera el puerto del Arduino
+class PuertoPty:
+    def __init__(self):
+        self.maestro, self._esclavo = os.openpty()
+        self.nombre = os.ttyname(self._esclavo)
+        # Si nadie lee, el Arduino de verdad pierde lo que manda; aquí igual
+        # (sin esto, con la pty llena el simulador se quedaría trabado)
+        os.set_blocking(self.maestro, False)
+        self.perdidas = 0
+
+    def escribir(self, datos):
+        try:
+            os.write(self.maestro, datos)
+        except (BlockingIOError, OSError):
+            self.perdidas += 1
+
+    def cerrar(self):
+        os.close(self.maestro)
+        os.close(self._esclavo)
+
+
+# Un puerto que ya existe (par virtual, adaptador USB-serial cruzado, etc.)
+class PuertoSerie:
+    def __init__(self, nombre, baudios=9600):
+        import serial # pip install pyserial (solo hace falta para este caso)
+        self.nombre = nombre
+        self.ser = serial.Serial(nombre, baudios, write_timeout=0)
+        self.perdidas = 0
+
+    def escribir(self, datos):
+        try:
+            self.ser.write(datos)
+        except Exception:
+            self.perdidas += 1
+
+    def cerrar(self):
+        self.ser.close()
+
+
+# ==========================================
+# 2. EL ARDUINO DE CADA PUERTA
+# ==========================================
+# binario: manda tramas (PROTOCOLO_BINARIO = 1) en vez de líneas de texto
+class ArduinoSimulado:
+    def __init__(self, puerto, grabar=None, binario=False):
+        self.puerto = puerto
+        self.aforo = 0     # Su contador, con los mismos topes que el de verdad
+        self.enviadas = 0
+        self.grabar = grabar
+        self.binario = binario
+        self.secuencia = 0
+        self.inicio = time.monotonic() # Para el millis() de las tramas
+
+    def _mandar(self, linea):
+        if self.binario:
+            # Al reproducir, el contador es el de la línea grabada
+            evento = interpretar_texto(linea)
+            if evento is None:
+                return
+            self._trama(evento.tipo or "LATIDO", evento.contador)
+        else:
+            self.puerto.escribir(f"{linea}\r\n".encode())
+        self.enviadas += 1
+        if self.grabar:
+            self.grabar(self.puerto.nombre, linea)
+
+    def _trama(self, tipo, contador=None):
+        millis = int((time.monotonic() - self.inicio) * 1000)
+        self.puerto.escribir(armar_trama(self.secuencia, tipo, self.aforo if contador is None else contador, millis))
+        self.secuencia += 1
+
+    # Solo con tramas: lo que manda al arrancar y cada LATIDO_CADA segundos
+    def hola(self):
+        self._trama("HOLA")
+
+    def latido(self):
+        self._trama("LATIDO")
+
+    def entrada(self):
+        self.aforo = min(self.aforo + 1, AFORO_MAXIMO)
+        self._mandar(f"ENTRADA AFORO: {self.aforo}")
+
+    def salida(self):
+        if self.aforo > 0:
+            self.aforo -= 1
+        self._mandar(f"SALIDA AFORO: {self.aforo}") # Se imprime igual aunque esté en 0
+
+    def cola(self):
+        self._mandar("COLA")
+
+    def linea(self, texto):
+        self._mandar(texto)
+
+
+# ==========================================
+# 3. LA GENTE (LLEGADAS, COLAS, RÁFAGAS Y SALIDAS)
+# ==========================================
+class Simulador:
+    # tasa: personas por minuto que llegan a CADA puerta
+    # estadia: minutos que se queda cada persona en promedio
+    # rafagas: (cada_s, duracion_s, factor) o None
+    # prob_cola: probabilidad de que alguien se quede parado en el primer sensor
+    def __init__(self, arduinos, tasa=6.0, estadia=20.0, rafagas=None, prob_cola=0.1, semilla=None):
+        self.arduinos = arduinos
+        self.tasa = tasa
+        self.estadia = estadia
+        self.rafagas = rafagas
+        self.prob_cola = prob_cola
+        self.azar = random.Random(semilla)
+        self.adentro = 0   # La verdad: cuánta gente hay adentro (para comparar con la app)
+        self.entradas = 0
+        self.salidas = 0
+        self._agenda = []  # (hora, n, qué, puerta): lo que va a pasar, en orden
+        self._n = 0
+        self.activo = False
+
+    def _agendar(self, cuando, que, puerta):
+        self._n += 1
+        heapq.heappush(self._agenda, (cuando, self._n, que, puerta))
+
+    def factor(self, t):
+        if not self.rafagas:
+            return 1.0
+        cada, duracion, factor = self.rafagas
+        return factor if (t % cada) < duracion else 1.0
+
+    # Próxima llegada a una puerta. Con ráfagas la tasa cambia en el tiempo:
+    # se sortea con la tasa más alta y se descarta con la proporción que toca
+    # (así la llegada sigue siendo Poisson con la tasa de cada momento)
+    def _proxima_llegada(self, t, puerta):
+        tope = self.tasa / 60 * (self.rafagas[2] if self.rafagas else 1.0)
+        if tope <= 0:
+            return
+        while True:
+            t += self.azar.expovariate(tope)
+            if self.azar.random() * tope <= self.tasa / 60 * self.factor(t):
+                break
+        self._agendar(t, "llega", puerta)
+
+    def _pasar(self, t, que, puerta):
+        arduino = self.arduinos[puerta]
+        if que == "llega":
+            self._proxima_llegada(t, puerta)
+            if self.azar.random() < self.prob_cola:
+                # Se queda parado en el primer sensor: COLA cada 800 ms y después entra
+                espera = self.azar.uniform(COLA_CADA, 3 * COLA_CADA)
+                k = 0
+                while k * COLA_CADA < espera:
+                    self._agendar(t + k * COLA_CADA, "cola", puerta)
+                    k += 1
+                self._agendar(t + espera, "entra", puerta)
+            else:
+                self._pasar(t, "entra", puerta)
+        elif que == "entra":
+            arduino.entrada()
+            self.adentro += 1
+            self.entradas += 1
+            # Sale después de un rato, por cualquier puerta
+            salida = t + self.azar.expovariate(1 / (self.estadia * 60)) if self.estadia > 0 else t
+            self._agendar(salida, "sale", self.azar.randrange(len(self.arduinos)))
+        elif que == "sale":
+            arduino.salida()
+            self.adentro -= 1
+            self.salidas += 1
+        elif que == "cola":
+            arduino.cola()
+        elif que == "latido":
+            arduino.latido()
+            self._agendar(t + LATIDO_CADA, "latido", puerta)
+
+    # Corre hasta `duracion` segundos (None = para siempre) o hasta detener()
+    def correr(self, duracion=None):
+        self.activo = True
+        inicio = time.perf_counter()
+        for puerta, arduino in enumerate(self.arduinos):
+            self._proxima_llegada(0.0, puerta)
+            if arduino.binario:
+                arduino.hola()
+                self._agendar(LATIDO_CADA, "latido", puerta)
+        while self.activo and self._agenda:
+            ahora = time.perf_counter() - inicio
+            if duracion is not None and ahora >= duracion:
+                break
+            # Todo lo que ya tocaba pasa de una (a tasas altas pueden ser muchos)
+            while self._agenda and self._agenda[0][0] <= ahora:
+                t, _, que, puerta = heapq.heappop(self._agenda)
+                self._pasar(t, que, puerta)
+            if self._agenda:
+                time.sleep(min(max(self._agenda[0][0] - ahora, 0), 0.05))
+        self.activo = False
+
+    def detener(self):
+        self.activo = False
+
+
+# ==========================================
+# 4. REPRODUCIR UNA BITÁCORA O UNA GRABACIÓN
+# ==========================================
+# Devuelve (ts, puerta, línea) en orden. Sirve aforo.db (tabla eventos) o un
+# archivo de texto grabado con --grabar ("ts puerta línea" por renglón).
+def leer_grabacion(ruta):
+    if ruta.endswith(".db"):
+        conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+        filas = conexion.execute("SELECT ts, linea FROM eventos WHERE tipo IN ('ENTRADA', 'SALIDA', 'COLA') ORDER BY id")
+        for ts, linea in filas:
+            m = _PUERTA_EN_LINEA.match(linea or "")
+            if m:
+                yield ts, m.group(1), m.group(2)
+            else:
+                yield ts, "", linea # Bitácoras de antes de las varias puertas
+        conexion.close()
+        return
+
+    with open(ruta, encoding="utf-8") as archivo:
+        for renglon in archivo:
+            partes = renglon.rstrip("\n").split(" ", 2)
+            if len(partes) == 3:
+                yield float(partes[0]), partes[1], partes[2]
+
+
+def puertas_de(ruta):
+    return sorted({puerta for _, puerta, _ in leer_grabacion(ruta)})
+
+
+# velocidad: 1 = tiempo real, 1000 = mil veces más rápido, 0 = sin pausas
+def reproducir(ruta, arduinos_por_puerta, velocidad=1.0, detenido=None):
+    inicio = None
+    enviadas = 0
+    for ts, puerta, linea in leer_grabacion(ruta):
+        if detenido and detenido():
+            break
+        if inicio is None:
+            inicio = (ts, time.perf_counter())
+        if velocidad > 0:
+            espera = inicio[1] + (ts - inicio[0]) / velocidad - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+        arduinos_por_puerta[puerta].linea(linea)
+        enviadas += 1
+    return enviadas
+
+
+# ==========================================
+# 5. DESDE LA TERMINAL
+# ==========================================
+def leer_rafagas(texto):
+    cada, duracion, factor = texto.split(":")
+    return float(cada), float(duracion), float(factor)
+
+
+def main(argumentos=None):
+    p = argparse.ArgumentParser(description="Simula uno o varios Arduinos con Sensores.ino")
+    p.add_argument("--puertas", type=int, default=1, help="cuántas puertas (una pty por puerta)")
+    p.add_argument("--puerto", action="append", help="escribir en este puerto en vez de una pty (se puede repetir)")
+    p.add_argument("--tasa", type=float, default=6.0, help="personas por minuto que llegan a cada puerta")
+    p.add_argument("--estadia", type=float, default=20.0, help="minutos que se queda cada persona (promedio)")
+    p.add_argument("--rafagas", type=leer_rafagas, help="cada:duración:factor, en segundos (ej. 300:30:10)")
+    p.add_argument("--prob-cola", type=float, default=0.1, help="probabilidad de que alguien haga cola")
+    p.add_argument("--duracion", type=float, help="segundos a simular (por defecto, hasta Ctrl+C)")
+    p.add_argument("--semilla", type=int, help="para repetir exactamente la misma simulación")
+    p.add_argument("--binario", action="store_true", help="mandar tramas binarias (PROTOCOLO_BINARIO) en vez de texto")
+    p.add_argument("--grabar", help="guardar lo que se manda en este archivo (para reproducirlo después)")
+    p.add_argument("--reproducir", help="aforo.db o un archivo de --grabar")
+    p.add_argument("--velocidad", type=float, default=1.0, help="al reproducir: 1 = tiempo real, 1000 = 1000x, 0 = sin pausas")
+    args = p.parse_args(argumentos)
+
+    grabacion = open(args.grabar, "a", encoding="utf-8") if args.grabar else None
+    grabar = (lambda puerta, linea: grabacion.write(f"{time.time():.3f} {puerta} {linea}\n")) if grabacion else None
+
+    if args.reproducir:
+        originales = puertas_de(args.reproducir)
+        cantidad = len(originales)
+        if args.puerto and len(args.puerto) < cantidad:
+            p.error(f"la grabación tiene {cantidad} puertas: pasa {cantidad} --puerto o ninguno (y se usan pty)")
+    else:
+        originales = None
+        cantidad = len(args.puerto) if args.puerto else args.puertas
+    puertos = [PuertoSerie(n) for n in args.puerto[:cantidad]] if args.puerto else [PuertoPty() for _ in range(cantidad)]
+    arduinos = [ArduinoSimulado(puerto, grabar, args.binario) for puerto in puertos]
+
+    print(f"Simulando {len(arduinos)} puerta(s): {', '.join(puerto.nombre for puerto in puertos)}")
+    print(f"   -> AFORO_PUERTOS={','.join(puerto.nombre for puerto in puertos)} python app.py")
+
+    simulador = None
+    t0 = time.perf_counter()
+    try:
+        if args.reproducir:
+            # Cada puerta de la grabación va a su propio Arduino de mentira
+            por_puerta = dict(zip(originales, arduinos))
+            ritmo = f"a {args.velocidad:g}x" if args.velocidad > 0 else "sin pausas"
+            print(f"Reproduciendo {args.reproducir} {ritmo} ({len(originales)} puerta(s) en la grabación)")
+            enviadas = reproducir(args.reproducir, por_puerta, args.velocidad)
+            print(f"Listo: {enviadas} líneas en {time.perf_counter() - t0:.1f} s")
+        else:
+            simulador = Simulador(arduinos, args.tasa, args.estadia, args.rafagas, args.prob_cola, args.semilla)
+            hilo = threading.Thread(target=simulador.correr, args=(args.duracion,), daemon=True)
+            hilo.start()
+            while hilo.is_alive():
+                hilo.join(5)
+                enviadas = sum(a.enviadas for a in arduinos)
+                print(f"[{time.perf_counter() - t0:7.1f} s] adentro {simulador.adentro:>5}  "
+                      f"entradas {simulador.entradas:>7}  salidas {simulador.salidas:>7}  líneas {enviadas:>8}  "
+                      f"perdidas {sum(puerto.perdidas for puerto in puertos)}")
+    except KeyboardInterrupt:
+        if simulador:
+            simulador.detener()
+    finally:
+        if grabacion:
+            grabacion.close()
+        for puerto in puertos:
+            puerto.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
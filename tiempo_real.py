@@ -0,0 +1,75 @@
+# tiempo_real.py
+# ==========================================
+# CANAL EN VIVO (SOCKET.IO)
+# ==========================================
+# En vez de que cada pestaña pregunte cada 300 ms "¿hay algo nuevo?",
+# el hilo que escucha al Arduino avisa cuando algo cambia y cada cliente
+# recibe SOLO los campos que cambiaron (un delta chiquito en JSON).
+import threading
+from flask_socketio import SocketIO, emit
+import metricas
+
+# "threading" funciona con el servidor de desarrollo de Flask/Dash y usa
+# simple-websocket (ya está en requirements.txt) para el WebSocket
+socketio = SocketIO(async_mode="threading", cors_allowed_origins="*")
+
+_candado = threading.Lock()
+_ultimo_estado = {}  # Lo último que mandamos a los clientes
+_version = 0         # Sube en 1 cada vez que publicamos algo nuevo
+_clientes = 0        # Pestañas conectadas ahora mismo
+
+
+def publicar(estado):
+    global _version
+    # Comparamos campo por campo contra lo último enviado
+    with _candado:
+        delta = {k: v for k, v in estado.items() if _ultimo_estado.get(k) != v}
+        if not delta:
+            return None  # Nada cambió: nadie se entera, nadie gasta CPU
+        _ultimo_estado.update(delta)
+        _version += 1
+        delta["version"] = _version
+
+    # Si todavía no hay servidor web enganchado, solo guardamos el estado
+    if socketio.server is not None:
+        socketio.emit("actualizacion", delta)
+    return delta
+
+
+# Avisos sueltos que no son parte del estado (ej. "serial_status", "serial_error")
+def avisar(evento, datos):
+    if socketio.server is not None:
+        socketio.emit(evento, datos)
+
+
+def estado_completo():
+    with _candado:
+        return dict(_ultimo_estado, version=_version)
+
+
+def version_actual():
+    return _version
+
+
+# Un cliente nuevo no tiene nada todavía: le mandamos la foto completa una vez
+@socketio.on("connect")
+def al_conectar():
+    global _clientes
+    with _candado:
+        _clientes += 1
+    emit("actualizacion", estado_completo())
+
+
+@socketio.on("disconnect")
+def al_desconectar(*_):
+    global _clientes
+    with _candado:
+        _clientes -= 1
+
+
+@metricas.registrar
+def _recolectar():
+    return [
+        ("aforo_publicaciones_total", "counter", "Deltas publicados por Socket.IO", [({}, _version)]),
+        ("aforo_clientes_socketio", "gauge", "Clientes Socket.IO conectados", [({}, _clientes)]),
+    ]